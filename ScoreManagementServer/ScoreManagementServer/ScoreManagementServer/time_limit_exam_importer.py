@@ -5,20 +5,35 @@
 支持导入限时练考试成绩，识别多sheet结构
 """
 
-import openpyxl
 import sqlite3
 import re
 from datetime import datetime
 import os
+import sys
+
+# 公共模块位于上级目录
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_connection import connect
+from import_log import ImportLog, QUIET, VERBOSE
+from import_plan import TimeLimitImportPlan
+from import_progress import ImportCheckpoint, TIME_LIMIT
+from rank_derivation import derive_exam_ranks, DEFAULT_TIES
+from score_staging import TimeLimitStaging
+from xlsx_reader import open_workbook, DEFAULT_BACKEND, WORKBOOK_EXTENSIONS
 
 # 数据库路径 - 使用相对路径
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'StudentData.db')
 
+# 提交方式：'sheet' 每个sheet提交一次，'file' 整个文件一次提交
+COMMIT_MODES = ('sheet', 'file')
+
+# 既没有学号也没有姓名的行在暂存表中的拒绝原因
+EMPTY_ROW_REASON = '学号和姓名均为空'
+
 
 def connect_db():
     """连接数据库"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = connect(DB_PATH, row_factory=sqlite3.Row)
     return conn
 
 
@@ -49,6 +64,14 @@ def parse_exam_name(filename):
     return None, None, None
 
 
+def csv_class_name(file_stem):
+    """CSV导出的限时练成绩（每个班级一个文件，如 ...-学生明细_107班.csv）的班级名；
+    文件名中没有班级时返回None，此时只能按学号匹配学生"""
+    if '_' not in file_stem:
+        return None
+    return file_stem.rsplit('_', 1)[1].strip() or None
+
+
 def find_subject_id(conn, subject_name):
     """查找科目ID"""
     cursor = conn.cursor()
@@ -61,8 +84,11 @@ def find_subject_id(conn, subject_name):
     return None
 
 
-def create_time_limit_exam_if_not_exists(conn, exam_name, subject_name, subject_id, exam_date, grade_name='高一'):
-    """创建限时练考试（如果不存在）"""
+def create_time_limit_exam_if_not_exists(conn, exam_name, subject_name, subject_id, exam_date, grade_name='高一', commit=True):
+    """创建限时练考试（如果不存在）
+
+    commit: 是否立即提交；为False时随调用方的事务一起提交
+    """
     cursor = conn.cursor()
     cursor.execute("SELECT ExamId FROM TimeLimitExams WHERE ExamName = ?", (exam_name,))
     result = cursor.fetchone()
@@ -89,7 +115,8 @@ def create_time_limit_exam_if_not_exists(conn, exam_name, subject_name, subject_
         INSERT INTO TimeLimitExams (ExamName, ExamDate, SubjectName, SubjectId, GradeName, Term, AcademicYear, Description)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?)
     """, (exam_name, exam_date, subject_name, subject_id, grade_name, term, academic_year, f"限时练考试"))
-    conn.commit()
+    if commit:
+        conn.commit()
     return cursor.lastrowid
 
 
@@ -106,16 +133,27 @@ def clean_student_name(name):
 
 def detect_sheet_columns(ws):
     """
-    智能检测Excel表的列位置
+    智能检测Excel表的列位置（读取第2行和第3行的标题）
+    """
+    header_rows = ws.iter_rows(min_row=2, max_row=3, values_only=True)
+    header_row1 = next(header_rows, ())
+    header_row2 = next(header_rows, ())
+    return detect_header_columns(header_row1, header_row2)
+
+
+def detect_header_columns(header_row1, header_row2):
+    """
+    根据两行标题（第2行和第3行的值）检测列位置
     优先级：
     1. 检测学号列（包含"学号"二字）
     2. 如果没有学号，检测姓名列（包含"姓名"二字）
     3. 检测学科成绩列（学科名下方的"成绩"）
     4. 检测排名列（成绩列下方的"班级排名"/"班次"/"年级排名"）
     """
-    # 获取第2行和第3行的标题
-    header_row1 = [ws.cell(2, col).value for col in range(1, ws.max_column + 1)]
-    header_row2 = [ws.cell(3, col).value for col in range(1, ws.max_column + 1)]
+    # 两行标题补齐到相同列数
+    max_column = max(len(header_row1), len(header_row2))
+    header_row1 = list(header_row1) + [None] * (max_column - len(header_row1))
+    header_row2 = list(header_row2) + [None] * (max_column - len(header_row2))
 
     # 列索引（从1开始）
     student_number_col = None
@@ -125,7 +163,7 @@ def detect_sheet_columns(ws):
     grade_rank_col = None
 
     # 1. 优先检测学号列（在第2行或第3行中查找包含"学号"的列）
-    for col_idx in range(1, ws.max_column + 1):
+    for col_idx in range(1, max_column + 1):
         header1 = header_row1[col_idx - 1]
         header2 = header_row2[col_idx - 1]
         if (header1 and '学号' in str(header1)) or (header2 and '学号' in str(header2)):
@@ -134,7 +172,7 @@ def detect_sheet_columns(ws):
 
     # 2. 如果没找到学号，检测姓名列
     if not student_number_col:
-        for col_idx in range(1, ws.max_column + 1):
+        for col_idx in range(1, max_column + 1):
             header1 = header_row1[col_idx - 1]
             header2 = header_row2[col_idx - 1]
             if (header1 and '姓名' in str(header1)) or (header2 and '姓名' in str(header2)):
@@ -143,7 +181,7 @@ def detect_sheet_columns(ws):
 
     # 3. 检测学科成绩列（查找"成绩"字样的列）
     # 查找第3行中包含"成绩"的列
-    for col_idx in range(1, ws.max_column + 1):
+    for col_idx in range(1, max_column + 1):
         header2 = header_row2[col_idx - 1]
         if header2 and '成绩' in str(header2):
             score_col = col_idx
@@ -153,14 +191,14 @@ def detect_sheet_columns(ws):
     # 如果找到了成绩列，检查成绩列附近是否有排名列
     if score_col:
         # 检查成绩列后面几列是否有"班级排名"/"班次"
-        for col_idx in range(score_col + 1, min(score_col + 3, ws.max_column + 1)):
+        for col_idx in range(score_col + 1, min(score_col + 3, max_column + 1)):
             header2 = header_row2[col_idx - 1]
             if header2 and ('班级排名' in str(header2) or '班次' in str(header2)):
                 class_rank_col = col_idx
                 break
 
         # 检查成绩列后面几列是否有"年级排名"
-        for col_idx in range(score_col + 1, min(score_col + 5, ws.max_column + 1)):
+        for col_idx in range(score_col + 1, min(score_col + 5, max_column + 1)):
             header2 = header_row2[col_idx - 1]
             if header2 and '年级排名' in str(header2):
                 grade_rank_col = col_idx
@@ -169,64 +207,113 @@ def detect_sheet_columns(ws):
     return student_number_col, student_name_col, score_col, class_rank_col, grade_rank_col
 
 
-def import_time_limit_sheet(conn, ws, exam_id, subject_id, class_name):
-    """导入一个sheet的数据"""
+def cell_value(row, col_idx):
+    """按列号（从1开始）读取行中的值，行长度不足时返回None"""
+    if col_idx and col_idx <= len(row):
+        return row[col_idx - 1]
+    return None
+
+
+def parse_rank(raw_rank):
+    """解析排名单元格，无法解析时返回None"""
+    if raw_rank is None:
+        return None
+    rank_value = str(raw_rank).strip()
+    if not rank_value or rank_value in ['--', '-', '', 'None']:
+        return None
+    try:
+        return int(float(rank_value))
+    except:
+        try:
+            return int(rank_value)
+        except:
+            return None
+
+
+def import_time_limit_sheet(conn, ws, exam_id, subject_id, class_name, staging=None, log=None, plan_only=False):
+    """导入一个sheet的数据
+
+    按行流式读取（iter_rows values_only），第2、3行为标题，第4行起为数据，
+    只读模式打开的工作簿也可直接使用。
+    解析出的行先写入暂存表，再由SQL统一匹配学生并合并写入 TimeLimitScores。
+    本函数不提交事务，由调用方决定提交时机；sheet读取出错时回滚本sheet已写入的数据。
+    staging: 限时练暂存表（TimeLimitStaging），为空时自动创建
+    log: 导入日志（ImportLog），quiet 级别时不输出检测到的列位置
+    plan_only: 只在暂存表中匹配学生，不写入 TimeLimitScores（预演导入，由 TimeLimitImportPlan 写入）
+    返回 (成功条数, 失败条数, 错误列表, 最后一行)；最后一行为实际读取到的最后一行（Excel行号），
+    sheet出错回滚或缺少必要的列时为 None，此时不能把该sheet记为已完成
+    """
     success_count = 0
     fail_count = 0
     errors = []
+    last_row = None
+
+    if staging is None:
+        staging = TimeLimitStaging(conn)
+    source = ws.title
+
+    # 以保存点包裹整个sheet，出错时只回滚本sheet
+    if not conn.in_transaction:
+        conn.execute("BEGIN")
+    conn.execute("SAVEPOINT time_limit_sheet")
 
     try:
-        # 智能检测列位置
-        student_number_col, student_name_col, score_col, class_rank_col, grade_rank_col = detect_sheet_columns(ws)
-
-        print(f"\n  检测到的列位置:")
-        if student_number_col:
-            print(f"    学号列: 第{student_number_col}列")
-        if student_name_col:
-            print(f"    姓名列: 第{student_name_col}列")
-        if score_col:
-            print(f"    成绩列: 第{score_col}列")
-        if class_rank_col:
-            print(f"    班级排名列: 第{class_rank_col}列")
-        if grade_rank_col:
-            print(f"    年级排名列: 第{grade_rank_col}列")
+        rows = ws.iter_rows(min_row=2, values_only=True)
+
+        # 智能检测列位置（第2行和第3行）
+        header_row1 = next(rows, ())
+        header_row2 = next(rows, ())
+        student_number_col, student_name_col, score_col, class_rank_col, grade_rank_col = \
+            detect_header_columns(header_row1, header_row2)
+
+        if log is None or log.verbosity > QUIET:
+            print(f"\n  检测到的列位置:")
+            if student_number_col:
+                print(f"    学号列: 第{student_number_col}列")
+            if student_name_col:
+                print(f"    姓名列: 第{student_name_col}列")
+            if score_col:
+                print(f"    成绩列: 第{score_col}列")
+            if class_rank_col:
+                print(f"    班级排名列: 第{class_rank_col}列")
+            if grade_rank_col:
+                print(f"    年级排名列: 第{grade_rank_col}列")
 
         # 验证是否检测到必要的列
         if not score_col:
             errors.append("未检测到成绩列，请检查Excel格式")
             fail_count += 1
-            return success_count, fail_count, errors
+            return success_count, fail_count, errors, None
 
         if not student_number_col and not student_name_col:
             errors.append("未检测到学号列或姓名列，请检查Excel格式")
             fail_count += 1
-            return success_count, fail_count, errors
+            return success_count, fail_count, errors, None
 
-        # 从第4行开始读取数据
-        for row_idx in range(4, ws.max_row + 1):
+        # 从第4行开始读取数据，写入暂存表（工作簿不一定声明行数，按实际读取到的行记录断点）
+        read_row = 3
+        for row_idx, row in enumerate(rows, 4):
+            read_row = row_idx
             try:
-                row = list(ws[row_idx])
-
                 # 读取学生标识（学号优先，其次姓名）
                 school_number = None
                 name = None
 
                 if student_number_col:
-                    number_cell = row[student_number_col - 1]
-                    school_number = str(number_cell.value).strip() if number_cell.value else None
+                    number_value = cell_value(row, student_number_col)
+                    school_number = str(number_value).strip() if number_value else None
 
                 if student_name_col:
-                    name_cell = row[student_name_col - 1]
-                    name = clean_student_name(name_cell.value)
+                    name = clean_student_name(cell_value(row, student_name_col))
 
-                # 如果有学号，使用学号；否则使用姓名
+                # 既没有学号也没有姓名的行不导入
                 if not school_number and not name:
-                    fail_count += 1
+                    staging.reject_row(source, row_idx, EMPTY_ROW_REASON)
                     continue
 
                 # 读取成绩
-                score_cell = row[score_col - 1]
-                score_value = str(score_cell.value).strip() if score_cell.value else ''
+                raw_score = cell_value(row, score_col)
+                score_value = str(raw_score).strip() if raw_score else ''
                 is_absent = False
 
                 if score_value in ['--', '-', '']:
@@ -239,99 +326,58 @@ def import_time_limit_sheet(conn, ws, exam_id, subject_id, class_name):
                         is_absent = True
                         score = None
 
-                # 查找学生ID
-                cursor = conn.cursor()
-                student_result = None
+                # 读取班级排名和年级排名
+                class_rank = parse_rank(cell_value(row, class_rank_col)) if class_rank_col else None
+                grade_rank = parse_rank(cell_value(row, grade_rank_col)) if grade_rank_col else None
 
-                # 优先使用学号查询
-                if school_number:
-                    cursor.execute("SELECT StudentId FROM Students WHERE StudentNumber = ?", (school_number,))
-                    student_result = cursor.fetchone()
-
-                # 如果学号查询失败，尝试用姓名和班级匹配
-                if not student_result and name:
-                    cursor.execute("SELECT StudentId FROM Students WHERE StudentName = ? AND ClassName = ?",
-                                 (name, class_name))
-                    student_result = cursor.fetchone()
-
-                if not student_result:
-                    errors.append(f"找不到学生: {name or '未知'}({school_number or '无学号'})")
-                    fail_count += 1
-                    continue
-
-                student_id = student_result['StudentId']
-
-                # 读取班级排名
-                class_rank = None
-                if class_rank_col:
-                    class_rank_cell = row[class_rank_col - 1]
-                    if class_rank_cell.value is not None:
-                        rank_value = str(class_rank_cell.value).strip()
-                        if rank_value and rank_value not in ['--', '-', '', 'None']:
-                            try:
-                                class_rank = int(float(rank_value))
-                            except:
-                                try:
-                                    class_rank = int(rank_value)
-                                except:
-                                    pass
-
-                # 读取年级排名
-                grade_rank = None
-                if grade_rank_col:
-                    grade_rank_cell = row[grade_rank_col - 1]
-                    if grade_rank_cell.value is not None:
-                        rank_value = str(grade_rank_cell.value).strip()
-                        if rank_value and rank_value not in ['--', '-', '', 'None']:
-                            try:
-                                grade_rank = int(float(rank_value))
-                            except:
-                                try:
-                                    grade_rank = int(rank_value)
-                                except:
-                                    pass
-
-                # 如果缺考，记录但不保存到数据库
-                if is_absent:
-                    errors.append(f"{name or '未知'}({school_number or '无学号'}): 缺考")
-                    fail_count += 1
-                    continue
-
-                # 检查是否已存在（在TimeLimitScores表中使用TimeLimitExamId）
-                cursor.execute("""
-                    SELECT ScoreId FROM TimeLimitScores
-                    WHERE TimeLimitExamId = ? AND StudentId = ? AND SubjectId = ?
-                """, (exam_id, student_id, subject_id))
-
-                if cursor.fetchone():
-                    # 更新
-                    cursor.execute("""
-                        UPDATE TimeLimitScores
-                        SET Score = ?, ClassRank = ?, GradeRank = ?, UpdatedAt = datetime('now')
-                        WHERE TimeLimitExamId = ? AND StudentId = ? AND SubjectId = ?
-                    """, (score, class_rank, grade_rank, exam_id, student_id, subject_id))
-                else:
-                    # 插入
-                    cursor.execute("""
-                        INSERT INTO TimeLimitScores (TimeLimitExamId, StudentId, SubjectId, Score, ClassRank, GradeRank)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """, (exam_id, student_id, subject_id, score, class_rank, grade_rank))
-
-                conn.commit()
-                success_count += 1
+                staging.add_row(source, row_idx, school_number, name, class_name,
+                                score, is_absent, class_rank, grade_rank)
 
             except Exception as e:
-                fail_count += 1
-                errors.append(f"第{row_idx}行错误: {str(e)}")
+                staging.reject_row(source, row_idx, f"第{row_idx}行错误: {str(e)}")
 
-    except Exception as e:
-        errors.append(f"Sheet读取错误: {str(e)}")
+        # 匹配学生（学号优先，其次姓名+班级），缺考的行记录但不保存到数据库，其余合并写入
+        if plan_only:
+            success_count, fail_count = staging.plan(source, exam_id)
+        else:
+            success_count, fail_count = staging.merge(source, exam_id, subject_id)
+        # 空行只计入失败条数，不逐条提示
+        errors.extend(reason for _, _, reason in staging.rejected(source) if reason != EMPTY_ROW_REASON)
+        last_row = read_row
 
-    return success_count, fail_count, errors
+    except Exception as e:
+        # 回滚本sheet已写入的行，已写入的行计为失败
+        conn.execute("ROLLBACK TO SAVEPOINT time_limit_sheet")
+        fail_count += success_count
+        success_count = 0
+        errors.append(f"Sheet读取错误: {str(e)}（本sheet已回滚）")
 
+    finally:
+        conn.execute("RELEASE SAVEPOINT time_limit_sheet")
+
+    return success_count, fail_count, errors, last_row
+
+
+def import_time_limit_excel(excel_path, grade_name='高一', commit_mode='sheet', backend=DEFAULT_BACKEND, conn=None,
+                            rank_ties=DEFAULT_TIES, log=None, dry_run=False):
+    """导入限时练Excel文件
+
+    工作簿以流式方式读取，内存占用不随sheet数量增长
+    commit_mode: 'sheet' 每个sheet作为一个事务提交（默认），同时记录断点，导入中途失败后
+                 重新导入同一文件时跳过已提交的sheet；'file' 整个文件作为一个事务提交
+    backend: Excel读取后端（'auto' / 'fast' / 'openpyxl'，见 xlsx_reader）
+    conn: 已打开的数据库连接（批处理时复用，不会被关闭）；为None时打开默认数据库
+    rank_ties: 所有sheet导入后为缺少排名的成绩按分数计算排名的并列方式（见 rank_derivation）
+    log: 导入日志（ImportLog）；被拒绝的行全部记入日志，控制台上每个sheet只输出缺考人数和前10个错误，
+         verbose 级别时输出全部被拒绝的行，quiet 级别时不输出每个sheet的处理详情
+    dry_run: 预演导入，匹配所有sheet后返回变更计划（import_plan.TimeLimitImportPlan）而不写入数据库，
+             新建的考试也要等计划 apply 时才提交；预演时忽略 commit_mode 和断点
+    返回 (成功条数, 失败条数)；无法导入时返回 None
+    """
+    if commit_mode not in COMMIT_MODES:
+        print(f"❌ 无效的提交方式: {commit_mode}（可选: {', '.join(COMMIT_MODES)}）")
+        return None
 
-def import_time_limit_excel(excel_path, grade_name='高一'):
-    """导入限时练Excel文件"""
     print("=" * 80)
     print("限时练成绩导入工具")
     print("=" * 80)
@@ -342,7 +388,7 @@ def import_time_limit_excel(excel_path, grade_name='高一'):
 
     if not exam_name or not subject_name:
         print(f"❌ 无法从文件名解析考试信息: {filename}")
-        return
+        return None
 
     print(f"\n考试名称: {exam_name}")
     print(f"科目: {subject_name}")
@@ -350,7 +396,11 @@ def import_time_limit_excel(excel_path, grade_name='高一'):
     print(f"文件: {filename}")
     print(f"年级: {grade_name}")
 
-    conn = connect_db()
+    own_conn = conn is None
+    if own_conn:
+        conn = connect_db()
+    plan = None
+    wb = None
 
     try:
         # 查找科目ID
@@ -358,39 +408,79 @@ def import_time_limit_excel(excel_path, grade_name='高一'):
         if not subject_id:
             print(f"❌ 科目不存在: {subject_name}")
             print("   请先在数据库中创建该科目")
-            return
+            return None
 
         # 创建限时练考试
-        exam_id = create_time_limit_exam_if_not_exists(conn, exam_name, subject_name, subject_id, exam_date, grade_name)
+        exam_id = create_time_limit_exam_if_not_exists(conn, exam_name, subject_name, subject_id, exam_date, grade_name,
+                                                       commit=(commit_mode == 'sheet' and not dry_run))
         print(f"考试ID: {exam_id}")
 
         # 加载Excel
         print(f"\n正在加载Excel文件...")
-        wb = openpyxl.load_workbook(excel_path, data_only=True)
+        wb = open_workbook(excel_path, backend)
 
         total_success = 0
         total_fail = 0
         all_errors = []
 
+        # 所有sheet共用一个暂存表
+        staging = TimeLimitStaging(conn)
+        log = log or ImportLog()
+        log.begin(filename)
+        show_sheets = log.verbosity > QUIET
+
+        # 断点（按sheet提交时）：上次导入中途失败时已提交的sheet不再处理
+        checkpoint = None
+        if commit_mode == 'sheet' and not dry_run:
+            checkpoint = ImportCheckpoint(conn, TIME_LIMIT, exam_id, excel_path)
+        if checkpoint and checkpoint.resuming:
+            print(f"\n⏩ 发现该文件上次未完成的导入，已提交的sheet将跳过（不计入本次统计）")
+
         # 遍历所有sheet
+        sources = []
+        problems = 0
         for sheet_name in wb.sheetnames:
-            print(f"\n{'='*80}")
-            print(f"处理Sheet: {sheet_name}")
-            print(f"{'='*80}")
+            if checkpoint and checkpoint.sheet_done(sheet_name):
+                print(f"\n⏩ Sheet {sheet_name} 已在上次导入中完成，跳过")
+                continue
 
             ws = wb[sheet_name]
 
-            # Sheet名称即为班级名称
-            class_name = sheet_name.strip()
-            print(f"班级: {class_name}")
-
-            success, fail, errors = import_time_limit_sheet(conn, ws, exam_id, subject_id, class_name)
+            # Sheet名称即为班级名称；CSV文件只有一个sheet，班级名取文件名最后一个"_"之后的部分
+            class_name = csv_class_name(sheet_name) if wb.backend == 'csv' else sheet_name.strip()
+            if show_sheets:
+                print(f"\n{'='*80}")
+                print(f"处理Sheet: {sheet_name}")
+                print(f"{'='*80}")
+                print(f"班级: {class_name}")
+
+            success, fail, errors, last_row = import_time_limit_sheet(conn, ws, exam_id, subject_id, class_name,
+                                                                      staging, log, plan_only=dry_run)
+            sources.append(ws.title)
+            if checkpoint:
+                # 回滚的sheet不记为已完成，重新导入时再次处理
+                if last_row is not None:
+                    checkpoint.save(sheet_name, last_row, done=True)
+                conn.commit()
 
             total_success += success
             total_fail += fail
             all_errors.extend(errors)
 
-            print(f"\n导入完成: 成功 {success} 条, 失败 {fail} 条")
+            rejected = staging.rejected(ws.title)
+            for source, row_no, reason in rejected:
+                kind = 'absent' if '缺考' in reason else 'empty' if reason == EMPTY_ROW_REASON else 'rejected'
+                log.add(kind, f"    - {sheet_name} 第{row_no}行: {reason}", VERBOSE, source=source, row=row_no,
+                        reason=reason)
+                problems += kind == 'rejected'
+
+            if not show_sheets:
+                continue
+
+            if dry_run:
+                print(f"\n预演完成: 可导入 {success} 条, 失败 {fail} 条")
+            else:
+                print(f"\n导入完成: 成功 {success} 条, 失败 {fail} 条")
 
             # 统计缺考人数
             absent_count = sum(1 for err in errors if '缺考' in err)
@@ -409,10 +499,25 @@ def import_time_limit_excel(excel_path, grade_name='高一'):
                     if len(other_errors) > 10:
                         print(f"    ... 还有 {len(other_errors) - 10} 个错误")
 
-        wb.close()
+            if rejected and log.verbosity >= VERBOSE:
+                print(f"  全部被拒绝的行:")
+            log.flush()
+
+        if dry_run:
+            plan = TimeLimitImportPlan(conn, staging, exam_id, subject_id, sources, total_success, total_fail,
+                                       problems, rank_ties, own_conn)
+            plan.print()
+            return plan
+
+        ranked = derive_exam_ranks(conn, exam_id, rank_ties, kind='time_limit')
+        if checkpoint:
+            checkpoint.finish()
+        conn.commit()
 
         print(f"\n{'='*80}")
         print(f"总计导入完成: 成功 {total_success} 条, 失败 {total_fail} 条")
+        if ranked:
+            print(f"按分数计算排名: {ranked} 条")
 
         # 统计总缺考人数
         total_absent = sum(1 for err in all_errors if '缺考' in err)
@@ -420,14 +525,25 @@ def import_time_limit_excel(excel_path, grade_name='高一'):
             print(f"缺考人数: {total_absent} 人")
 
         print(f"{'='*80}")
+        return total_success, total_fail
 
     except Exception as e:
+        # 回滚尚未提交的数据（'file' 模式下为整个文件）
+        conn.rollback()
         print(f"\n❌ 发生错误: {e}")
+        if commit_mode == 'sheet':
+            print("   已提交的sheet已记录断点，修正问题后重新导入同一文件将跳过这些sheet")
         import traceback
         traceback.print_exc()
+        return None
 
     finally:
-        conn.close()
+        # 出错时也关闭工作簿，否则文件在Windows上一直被占用
+        if wb is not None:
+            wb.close()
+        # 预演返回的计划继续使用连接，由计划写入或放弃后关闭
+        if own_conn and plan is None:
+            conn.close()
 
 
 def main():
@@ -473,8 +589,8 @@ def main():
                 print(f"❌ 文件不存在: {new_excel_path}")
                 continue
 
-            if not new_excel_path.lower().endswith('.xlsx'):
-                print("❌ 文件格式错误，请选择.xlsx文件")
+            if not new_excel_path.lower().endswith(WORKBOOK_EXTENSIONS):
+                print("❌ 文件格式错误，请选择.xlsx/.csv/.tsv文件")
                 continue
 
             # 询问是否修改年级
@@ -6,24 +6,35 @@
 """
 
 import sqlite3
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
 from datetime import datetime
-import numpy as np
 import os
+import sys
+
+# 公共模块位于上级目录
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_connection import connect, READ
+
+# 绘图依赖为可选：未安装时仍可使用文字查询（如批处理命令行 score_cli.py）
+try:
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+    import numpy as np
+    HAS_MATPLOTLIB = True
+except ImportError:
+    HAS_MATPLOTLIB = False
 
 # 数据库路径 - 使用相对路径
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'StudentData.db')
 
 # 设置中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'SimSun']
-plt.rcParams['axes.unicode_minus'] = False
+if HAS_MATPLOTLIB:
+    plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'SimSun']
+    plt.rcParams['axes.unicode_minus'] = False
 
 
 def connect_db():
     """连接数据库"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = connect(DB_PATH, READ, row_factory=sqlite3.Row)
     return conn
 
 
@@ -103,6 +114,10 @@ def get_student_time_limit_scores(conn, student_id, exam_ids=None, limit=None):
 
 def plot_student_grade_rank_trend(scores, student_name, subject_name=None):
     """绘制学生年级排名趋势图"""
+    if not HAS_MATPLOTLIB:
+        print("⚠️  未安装matplotlib，无法绘制趋势图（pip install matplotlib）")
+        return
+
     if len(scores) < 2:
         print("⚠️  限时练记录少于2次，无法绘制趋势图")
         return
@@ -406,6 +421,11 @@ def query_by_class(conn):
         exam_count = '3'
     exam_count = min(5, max(2, int(exam_count)))  # 限制在2-5之间
 
+    print_class_time_limit_progress(conn, class_name, exam_count)
+
+
+def print_class_time_limit_progress(conn, class_name, exam_count=3):
+    """打印班级最近exam_count次限时练的进步/退步详情"""
     print(f"\n正在分析最近{exam_count}次考试的进步情况...")
 
     # 获取班级限时练进步情况
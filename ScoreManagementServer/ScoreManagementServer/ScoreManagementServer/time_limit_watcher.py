@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+限时练成绩自动导入服务
+用法: python time_limit_watcher.py 监控文件夹 [--grade 高一] [--interval 10] [--settle 5] [--once]
+
+- 定时轮询文件夹中的xlsx/csv/tsv文件（跳过Excel打开时产生的 ~$ 临时文件）
+- 文件大小和修改时间在 settle 秒内保持不变、且能以只读方式打开，才认为已经写完
+- 文件名用 parse_exam_name 解析，解析不出考试信息的文件不导入
+- 就绪的文件放入队列，由唯一的导入线程使用同一个数据库连接依次调用 import_time_limit_excel
+- 每个文件的导入结果按文件内容哈希记录在 TimeLimitImportLog 表中，
+  同一个文件（即使改名或重新复制进来）不会被重复导入
+"""
+
+import os
+import sys
+import time
+import queue
+import sqlite3
+import argparse
+import threading
+
+# 公共模块位于上级目录
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_connection import connect
+from import_manifest import file_hash
+from xlsx_reader import BACKENDS, DEFAULT_BACKEND, WORKBOOK_EXTENSIONS
+from time_limit_exam_importer import DB_PATH, COMMIT_MODES, parse_exam_name, import_time_limit_excel
+
+def find_import_log(conn, digest):
+    """按文件内容哈希查找导入记录"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT FileName, Status, ImportedAt FROM TimeLimitImportLog WHERE FileHash = ?
+    """, (digest,))
+    return cursor.fetchone()
+
+
+def record_import(conn, path, digest, exam_name, status, success=0, fail=0, message=None):
+    """记录（或覆盖）一个文件的导入结果并提交"""
+    conn.execute("""
+        INSERT INTO TimeLimitImportLog (FileName, FileHash, FileSize, ExamName, Status, SuccessCount, FailCount, Message)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(FileHash) DO UPDATE SET
+            FileName = excluded.FileName,
+            FileSize = excluded.FileSize,
+            ExamName = excluded.ExamName,
+            Status = excluded.Status,
+            SuccessCount = excluded.SuccessCount,
+            FailCount = excluded.FailCount,
+            Message = excluded.Message,
+            ImportedAt = datetime('now', 'localtime')
+    """, (os.path.basename(path), digest, os.path.getsize(path), exam_name, status, success, fail, message))
+    conn.commit()
+
+
+class FolderWatcher:
+    """轮询文件夹，返回已经写完的新文件
+
+    - 同一路径的文件只有在大小或修改时间变化后才会再次返回
+    - 文件在 settle 秒内大小和修改时间都没有变化，且可以打开，才认为已写完
+    """
+
+    def __init__(self, folder, settle=5.0):
+        self.folder = folder
+        self.settle = settle
+        self.pending = {}   # {路径: (文件签名, 签名首次出现的时间)}
+        self.handled = {}   # {路径: 已交给导入线程的文件签名}
+
+    def scan(self):
+        """扫描一次文件夹，返回本次就绪的文件路径列表"""
+        now = time.monotonic()
+        ready = []
+        present = set()
+
+        for name in sorted(os.listdir(self.folder)):
+            if name.startswith('~$') or not name.lower().endswith(WORKBOOK_EXTENSIONS):
+                continue
+            path = os.path.join(self.folder, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if not os.path.isfile(path):
+                continue
+
+            present.add(path)
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if self.handled.get(path) == signature:
+                continue
+
+            previous = self.pending.get(path)
+            if previous is None or previous[0] != signature:
+                # 新文件或仍在写入，重新计时
+                self.pending[path] = (signature, now)
+                continue
+
+            if now - previous[1] < self.settle or not self._can_open(path):
+                continue
+
+            del self.pending[path]
+            self.handled[path] = signature
+            ready.append(path)
+
+        # 已被删除或移走的文件不再跟踪
+        for path in list(self.pending):
+            if path not in present:
+                del self.pending[path]
+        for path in list(self.handled):
+            if path not in present:
+                del self.handled[path]
+
+        return ready
+
+    @staticmethod
+    def _can_open(path):
+        """Windows下正在复制的文件无法打开"""
+        try:
+            with open(path, 'rb'):
+                return True
+        except OSError:
+            return False
+
+
+def ingest_file(conn, path, grade_name, commit_mode, backend, retry_failed=False):
+    """导入一个就绪的文件并记录结果"""
+    name = os.path.basename(path)
+    digest = file_hash(path)
+
+    previous = find_import_log(conn, digest)
+    if previous:
+        status = previous['Status']
+        # 解析失败而跳过的文件改名后重新判断；导入失败的文件只在 --retry-failed 时重试
+        if status == 'success' or (status == 'failed' and not retry_failed) \
+                or (status == 'skipped' and previous['FileName'] == name):
+            print(f"ℹ️  已处理过，跳过: {name}（{previous['ImportedAt']} {previous['FileName']}: {status}）")
+            return status
+
+    exam_name, subject_name, exam_date = parse_exam_name(name)
+    if not exam_name or not subject_name:
+        print(f"⚠️  无法从文件名解析考试信息，跳过: {name}")
+        record_import(conn, path, digest, None, 'skipped', message="无法从文件名解析考试信息")
+        return 'skipped'
+
+    print(f"\n⏳ 开始导入: {name}")
+    try:
+        result = import_time_limit_excel(path, grade_name, commit_mode, backend, conn=conn)
+    except Exception as e:
+        result = None
+        print(f"❌ 导入失败: {e}")
+
+    if result is None:
+        conn.rollback()
+        record_import(conn, path, digest, exam_name, 'failed', message="导入失败，详见日志输出")
+        print(f"❌ 导入失败: {name}")
+        return 'failed'
+
+    success, fail = result
+    record_import(conn, path, digest, exam_name, 'success', success, fail)
+    print(f"✅ 已导入: {name}（成功 {success} 条, 失败 {fail} 条）")
+    return 'success'
+
+
+def import_worker(jobs, db_path, grade_name, commit_mode, backend, retry_failed):
+    """导入线程：独占一个数据库连接，依次处理队列中的文件，收到 None 时退出"""
+    conn = connect(db_path, row_factory=sqlite3.Row)
+    try:
+        while True:
+            path = jobs.get()
+            try:
+                if path is None:
+                    break
+                if os.path.exists(path):
+                    ingest_file(conn, path, grade_name, commit_mode, backend, retry_failed)
+            except Exception as e:
+                print(f"\n❌ 处理文件时发生错误: {path}: {e}")
+                import traceback
+                traceback.print_exc()
+            finally:
+                jobs.task_done()
+    finally:
+        conn.close()
+
+
+def watch_folder(folder, grade_name='高一', interval=10.0, settle=5.0, commit_mode='sheet',
+                 backend=DEFAULT_BACKEND, db_path=DB_PATH, once=False, retry_failed=False):
+    """监控文件夹并自动导入限时练成绩
+
+    once: 只处理当前文件夹中的文件（等它们写完），处理完后退出
+    """
+    if not os.path.isdir(folder):
+        print(f"❌ 文件夹不存在: {folder}")
+        return 1
+    if not os.path.exists(db_path):
+        print(f"❌ 数据库文件不存在: {db_path}")
+        return 1
+
+    print("=" * 80)
+    print("限时练成绩自动导入服务")
+    print("=" * 80)
+    print(f"监控文件夹: {folder}")
+    print(f"年级: {grade_name}  轮询间隔: {interval}秒  稳定时间: {settle}秒")
+    if not once:
+        print("按 Ctrl+C 停止")
+
+    jobs = queue.Queue()
+    worker = threading.Thread(target=import_worker,
+                              args=(jobs, db_path, grade_name, commit_mode, backend, retry_failed))
+    worker.start()
+
+    watcher = FolderWatcher(folder, settle)
+    try:
+        while True:
+            for path in watcher.scan():
+                jobs.put(path)
+
+            if once and not watcher.pending:
+                break
+            time.sleep(min(interval, settle) if watcher.pending else interval)
+    except KeyboardInterrupt:
+        print("\n⏹️  正在停止（等待当前文件导入完成）...")
+    finally:
+        jobs.put(None)
+        worker.join()
+
+    print("\n✅ 自动导入服务已停止")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="监控文件夹，自动导入限时练成绩")
+    parser.add_argument('folder', help="限时练成绩文件所在的共享文件夹")
+    parser.add_argument('--grade', default='高一', help="年级（默认：高一）")
+    parser.add_argument('--interval', type=float, default=10.0, help="轮询间隔秒数（默认10）")
+    parser.add_argument('--settle', type=float, default=5.0, help="文件多少秒内不再变化才导入（默认5）")
+    parser.add_argument('--commit-mode', choices=COMMIT_MODES, default='sheet', help="每个sheet提交一次，或整个文件一次提交")
+    parser.add_argument('--backend', choices=BACKENDS, default=DEFAULT_BACKEND, help="Excel读取后端")
+    parser.add_argument('--db', default=DB_PATH, help="数据库文件路径")
+    parser.add_argument('--once', action='store_true', help="处理完文件夹中现有的文件后退出")
+    parser.add_argument('--retry-failed', action='store_true', help="重新导入之前导入失败的文件")
+    args = parser.parse_args()
+
+    return watch_folder(args.folder, args.grade, args.interval, args.settle, args.commit_mode,
+                        args.backend, args.db, args.once, args.retry_failed)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
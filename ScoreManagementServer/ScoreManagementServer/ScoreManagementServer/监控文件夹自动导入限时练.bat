@@ -0,0 +1,7 @@
+@echo off
+chcp 65001 > nul
+REM 把共享文件夹拖到本文件上启动；直接运行时监控同目录下的"限时练成绩"文件夹
+set WATCH_DIR=%~1
+if "%WATCH_DIR%"=="" set WATCH_DIR=%~dp0限时练成绩
+python "%~dp0time_limit_watcher.py" "%WATCH_DIR%"
+pause
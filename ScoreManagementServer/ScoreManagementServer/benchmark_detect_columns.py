@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+表头检测性能对比
+用法: python benchmark_detect_columns.py [-n 调用次数]
+对已知的几种成绩表表头格式，分别测试不使用缓存的检测和命中布局缓存的检测的单次耗时，
+并核对两者的检测结果是否一致
+"""
+
+import sys
+import time
+import argparse
+
+from score_import_common import SUBJECT_NAMES, detect_sheet_columns, clear_layout_cache, _detect_columns
+
+
+def subject_headers(subjects, class_rank, grade_rank, score_suffix=''):
+    headers = []
+    for subject in subjects:
+        headers += [f'{subject}{score_suffix}', f'{subject}{class_rank}', f'{subject}{grade_rank}']
+    return headers
+
+
+# 已知的表头格式
+HEADER_VARIANTS = {
+    '智学网导出': ['考号', '姓名', '班级'] + subject_headers(SUBJECT_NAMES[:6], '班名次', '校名次')
+                  + ['总分', '总分班名次', '总分校名次'],
+    '说明文档示例': ['姓名', '学号', '语文', '语文班名次', '语文年级名次', '总分', '总分班名次', '总分校名次'],
+    '姓名匹配+成绩后缀': ['姓名', '班级'] + subject_headers(SUBJECT_NAMES, '班级排名', '年级排名', '成绩')
+                       + ['总分成绩', '班级排名', '年级排名'],
+    '通用排名列': ['学号', '姓名'] + [h for s in SUBJECT_NAMES for h in (s, '班次', '校次')]
+                 + ['总分', '班次', '校次'],
+    '只有分数': ['学号', '姓名', '班级'] + [f'{s}分数' for s in SUBJECT_NAMES] + ['总分分数'],
+}
+
+
+def time_calls(func, headers, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        func(headers)
+    return (time.perf_counter() - start) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description="表头检测性能对比")
+    parser.add_argument('-n', '--number', type=int, default=20000, help="每种格式的调用次数")
+    args = parser.parse_args()
+
+    print(f"{'表头格式':<20} {'列数':>4} {'检测(微秒)':>10} {'缓存(微秒)':>10} {'加速比':>8} {'一致':>4}")
+    print("-" * 66)
+
+    for name, headers in HEADER_VARIANTS.items():
+        clear_layout_cache()
+        uncached = time_calls(lambda h: _detect_columns(tuple(h)), headers, args.number)
+        cached = time_calls(detect_sheet_columns, headers, args.number)
+        same = detect_sheet_columns(headers) == _detect_columns(tuple(headers))
+        print(f"{name:<20} {len(headers):>4} {uncached * 1e6:>10.2f} {cached * 1e6:>10.2f} "
+              f"{uncached / cached:>7.1f}x {'✅' if same else '❌':>4}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
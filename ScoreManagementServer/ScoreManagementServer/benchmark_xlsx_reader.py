@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Excel读取后端性能对比
+用法: python benchmark_xlsx_reader.py 成绩1.xlsx [成绩2.xlsx ...] [-n 重复次数]
+对每个文件分别用 openpyxl 和 fast 后端读取全部sheet的全部行，
+输出耗时、行数，并核对两个后端读出的值是否一致，用于按文件选择读取后端
+"""
+
+import sys
+import time
+import argparse
+
+from xlsx_reader import open_workbook, HAS_OPENPYXL
+
+
+def read_all(path, backend):
+    """读取工作簿全部数据，返回 {sheet名: [值元组, ...]}"""
+    wb = open_workbook(path, backend)
+    try:
+        return {name: list(wb[name].iter_rows(values_only=True)) for name in wb.sheetnames}
+    finally:
+        wb.close()
+
+
+def time_backend(path, backend, repeat):
+    """返回 (最短耗时, 数据)"""
+    best = None
+    data = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = read_all(path, backend)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, data
+
+
+def strip_trailing(rows):
+    """去掉每行末尾和表格末尾的空值，避免两个后端的补齐方式差异影响比较"""
+    result = []
+    for row in rows:
+        row = list(row)
+        while row and row[-1] is None:
+            row.pop()
+        result.append(tuple(row))
+    while result and not result[-1]:
+        result.pop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Excel读取后端性能对比")
+    parser.add_argument('files', nargs='+', help="要测试的xlsx文件")
+    parser.add_argument('-n', '--repeat', type=int, default=3, help="每个后端重复读取次数（取最短耗时）")
+    args = parser.parse_args()
+
+    backends = ['openpyxl', 'fast'] if HAS_OPENPYXL else ['fast']
+    if not HAS_OPENPYXL:
+        print("⚠️  未安装openpyxl，只测试fast后端")
+
+    print(f"{'文件':<40} {'后端':<10} {'行数':>8} {'耗时(秒)':>10} {'加速比':>8}")
+    print("-" * 82)
+
+    for path in args.files:
+        results = {}
+        for backend in backends:
+            try:
+                results[backend] = time_backend(path, backend, args.repeat)
+            except Exception as e:
+                print(f"{path:<40} {backend:<10} ❌ 读取失败: {e}")
+
+        base_time = results['openpyxl'][0] if 'openpyxl' in results else None
+        for backend, (elapsed, data) in results.items():
+            rows = sum(len(r) for r in data.values())
+            speedup = f"{base_time / elapsed:.1f}x" if base_time and elapsed else '-'
+            print(f"{path:<40} {backend:<10} {rows:>8} {elapsed:>10.3f} {speedup:>8}")
+
+        if len(results) == 2:
+            a = results['openpyxl'][1]
+            b = results['fast'][1]
+            same = a.keys() == b.keys() and all(strip_trailing(a[k]) == strip_trailing(b[k]) for k in a)
+            print(f"  数据一致: {'✅ 是' if same else '❌ 否（该文件建议使用openpyxl后端）'}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+批量写入模式
+Scores / Students 的时间戳触发器（trg_scores_update / trg_students_update）对每条被修改的记录
+再执行一次 UPDATE 写入 UpdatedAt；导入语句本身已经写入 UpdatedAt，批量更新时每行会被写两次。
+批量写入模式下触发器不执行（BulkLoadMode 表中有一行，见 migrations/0006_bulk_load_mode.sql），
+由导入语句自己写时间戳；不在批量写入模式中的单条修改仍由触发器自动更新时间戳。
+
+用法（不提交事务）:
+    with bulk_load(conn):
+        cursor.execute(...)     # 语句中需要自己写 UpdatedAt = datetime('now', 'localtime')
+
+- 标记在当前事务中写入、退出时在同一事务中删除，其他连接看不到，事务回滚时也随之撤销
+- 可以嵌套，只有最外层退出时才删除标记
+"""
+
+from contextlib import contextmanager
+
+
+@contextmanager
+def bulk_load(conn):
+    """在 with 块中处于批量写入模式（不提交事务）"""
+    cursor = conn.cursor()
+    cursor.execute("INSERT OR IGNORE INTO BulkLoadMode (Active) VALUES (1)")
+    outermost = cursor.rowcount == 1
+    try:
+        yield conn
+    finally:
+        if outermost:
+            conn.execute("DELETE FROM BulkLoadMode")
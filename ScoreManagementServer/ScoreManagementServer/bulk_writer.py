@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+成绩批量写入工具
+将解析好的成绩记录分批缓存，通过 executemany + UPSERT 一次性写入数据库
+"""
+
+# 每批写入的记录数
+DEFAULT_BATCH_SIZE = 500
+
+# Scores 表的 UPSERT 语句（依赖 UNIQUE(ExamId, StudentId, SubjectId)）
+UPSERT_SCORES_SQL = """
+    INSERT INTO Scores (ExamId, StudentId, SubjectId, Score, ClassRank, GradeRank)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(ExamId, StudentId, SubjectId) DO UPDATE SET
+        Score = excluded.Score,
+        ClassRank = excluded.ClassRank,
+        GradeRank = excluded.GradeRank,
+        ClassRankDerived = 0,
+        GradeRankDerived = 0,
+        UpdatedAt = datetime('now', 'localtime')
+"""
+
+
+class BulkWriter:
+    """批量写入器
+
+    用法：
+        writer = BulkWriter(conn)
+        writer.add((exam_id, student_id, subject_id, score, class_rank, grade_rank), label)
+        writer.flush()
+        conn.commit()
+
+    - 记录先缓存在内存中，满 batch_size 条后用 executemany 写入
+    - 整批写入失败时回滚该批，再逐条写入，以便准确统计成功/失败条数
+    - 不负责提交事务，由调用方在全部写入后统一 commit
+    """
+
+    def __init__(self, conn, sql=UPSERT_SCORES_SQL, batch_size=DEFAULT_BATCH_SIZE):
+        self.conn = conn
+        self.sql = sql
+        self.batch_size = batch_size
+        self.pending = []
+        self.success = 0
+        self.failed = 0
+        self.errors = []  # [(label, 异常信息)]
+        self.failed_params = []  # 写入失败的记录参数
+
+    def add(self, params, label=None):
+        """添加一条待写入记录，label 用于出错时提示"""
+        self.pending.append((params, label))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """写入所有缓存的记录"""
+        if not self.pending:
+            return
+
+        batch = self.pending
+        self.pending = []
+
+        # 确保处于事务中，使保存点只回滚本批次
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN")
+
+        cursor = self.conn.cursor()
+        cursor.execute("SAVEPOINT bulk_batch")
+        try:
+            cursor.executemany(self.sql, [params for params, _ in batch])
+            cursor.execute("RELEASE SAVEPOINT bulk_batch")
+            self.success += len(batch)
+            return
+        except Exception:
+            cursor.execute("ROLLBACK TO SAVEPOINT bulk_batch")
+            cursor.execute("RELEASE SAVEPOINT bulk_batch")
+
+        # 整批失败，逐条写入定位失败记录
+        for params, label in batch:
+            try:
+                cursor.execute(self.sql, params)
+                self.success += 1
+            except Exception as e:
+                self.failed += 1
+                self.errors.append((label, str(e)))
+                self.failed_params.append(params)
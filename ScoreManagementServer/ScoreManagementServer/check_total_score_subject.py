@@ -1,12 +1,13 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 """检查数据库中是否有总分科目（SubjectId=10）"""
-import sqlite3
 import os
 
+from db_connection import connect
+
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "StudentData.db")
 
-conn = sqlite3.connect(DB_PATH)
+conn = connect(DB_PATH)
 cursor = conn.cursor()
 
 print("=" * 80)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+班级名称索引
+导入开始时一次性加载 Students 表中的班级名，把各种写法（"107"、"107班"、"高一107班"）
+映射到数据库中的标准班级名，替代逐行执行 SELECT DISTINCT ClassName 和线性扫描
+"""
+
+import re
+
+NUMBER_PATTERN = re.compile(r'\d+')
+
+
+class ClassNameIndex:
+    """班级名索引
+
+    匹配规则（与原 find_matching_class 一致）：
+    1. 精确匹配
+    2. 包含匹配（输入班级名包含在数据库班级名中，或数据库班级名包含在输入班级名中）
+    3. 数字匹配（输入班级名中的第一个数字与数据库班级名中的第一个数字相同）
+    4. 都不匹配，使用输入的班级名
+
+    - 班级按名称排序，多个班级都能匹配时取排在前面的
+    - 每种写法的匹配结果缓存在字典中，同一写法只匹配一次
+    - 导入过程中新增或修改学生班级后，需调用 add / move 同步；
+      出现新班级或某班级不再有学生时，缓存自动失效
+    """
+
+    def __init__(self, conn):
+        self.counts = {}
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT ClassName, COUNT(*) FROM Students
+            WHERE ClassName IS NOT NULL AND ClassName != ''
+            GROUP BY ClassName
+        """)
+        for class_name, count in cursor.fetchall():
+            self.counts[class_name] = count
+        self._invalidate()
+
+    def _invalidate(self):
+        self._classes = None     # 排序后的班级名
+        self._by_number = None   # {班级名中的第一个数字: 班级名}
+        self._cache = {}         # {输入写法: 匹配结果}
+
+    def add(self, class_name):
+        """新增一名该班级的学生"""
+        if not class_name:
+            return
+        if class_name not in self.counts:
+            self.counts[class_name] = 0
+            self._invalidate()
+        self.counts[class_name] += 1
+
+    def remove(self, class_name):
+        """减少一名该班级的学生"""
+        if not class_name or class_name not in self.counts:
+            return
+        self.counts[class_name] -= 1
+        if self.counts[class_name] <= 0:
+            del self.counts[class_name]
+            self._invalidate()
+
+    def move(self, old_class, new_class):
+        """学生从 old_class 调到 new_class"""
+        self.add(new_class)
+        self.remove(old_class)
+
+    def classes(self):
+        """所有班级名（排序）"""
+        if self._classes is None:
+            self._classes = sorted(self.counts)
+        return self._classes
+
+    def match(self, input_class):
+        """返回输入班级名对应的标准班级名"""
+        if not input_class or input_class == "None":
+            return None
+
+        # 数据库中没有班级，直接使用输入的
+        if not self.counts:
+            return input_class
+
+        # 1. 精确匹配
+        if input_class in self.counts:
+            return input_class
+
+        matched = self._cache.get(input_class)
+        if matched is None:
+            matched = self._cache[input_class] = self._match_spelling(input_class)
+        return matched
+
+    def _match_spelling(self, input_class):
+        # 2. 包含匹配
+        for db_class in self.classes():
+            if input_class in db_class or db_class in input_class:
+                return db_class
+
+        # 3. 数字匹配
+        number = NUMBER_PATTERN.search(input_class)
+        if number:
+            if self._by_number is None:
+                self._by_number = {}
+                for db_class in self.classes():
+                    db_number = NUMBER_PATTERN.search(db_class)
+                    if db_number:
+                        self._by_number.setdefault(db_number.group(), db_class)
+            matched = self._by_number.get(number.group())
+            if matched:
+                return matched
+
+        # 都不匹配，使用输入的班级名
+        return input_class
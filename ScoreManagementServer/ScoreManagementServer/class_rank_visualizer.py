@@ -10,6 +10,8 @@ from datetime import datetime, timedelta
 import os
 import sys
 
+from db_connection import connect, READ
+
 try:
     from openpyxl import Workbook
     from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
@@ -31,8 +33,7 @@ SUBJECT_MAPPING = {
 
 def connect_db():
     """连接数据库"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = connect(DB_PATH, READ, row_factory=sqlite3.Row)
     return conn
 
 
@@ -106,24 +107,68 @@ def get_class_rank_trend(conn, class_name, subject_id, start_date=None, end_date
 
 
 def get_all_subjects_with_scores(conn, class_name):
-    """获取班级有成绩记录的科目"""
+    """获取班级有成绩记录的科目（读取考试-班级-科目统计表）"""
     cursor = conn.cursor()
     cursor.execute("""
-        SELECT DISTINCT
+        SELECT
             sb.SubjectId,
             sb.SubjectName,
             sb.SortOrder,
-            COUNT(s.ScoreId) as RecordCount
-        FROM Subjects sb
-        JOIN Scores s ON sb.SubjectId = s.SubjectId
-        JOIN Students st ON s.StudentId = st.StudentId
-        WHERE st.ClassName = ?
+            SUM(c.StudentCount) as RecordCount
+        FROM ExamClassSubjectStats c
+        JOIN Subjects sb ON c.SubjectId = sb.SubjectId
+        WHERE c.ClassName = ?
         GROUP BY sb.SubjectId, sb.SubjectName, sb.SortOrder
         ORDER BY sb.SortOrder
     """, (class_name,))
     return cursor.fetchall()
 
 
+def get_recent_exams(conn, subject_id, count=2):
+    """获取该科目有成绩记录的最近count次考试（按日期倒序）"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT DISTINCT e.ExamId, e.ExamDate, e.ExamName
+        FROM Exams e
+        JOIN ExamClassSubjectStats c ON e.ExamId = c.ExamId
+        WHERE c.SubjectId = ?
+        ORDER BY e.ExamDate DESC
+        LIMIT ?
+    """, (subject_id, count))
+    return cursor.fetchall()
+
+
+def get_class_rank_sums(conn, class_name, subject_id, start_date=None, end_date=None):
+    """获取班级某科目每次考试的年级排名总和（读取考试-班级-科目统计表，按日期排序）"""
+    sql = """
+        SELECT
+            e.ExamId,
+            e.ExamName,
+            e.ExamDate,
+            c.GradeRankSum as RankSum,
+            c.GradeRankCount as StudentCount
+        FROM ExamClassSubjectStats c
+        JOIN Exams e ON c.ExamId = e.ExamId
+        WHERE c.ClassName = ? AND c.SubjectId = ?
+    """
+
+    params = [class_name, subject_id]
+
+    if start_date:
+        sql += " AND e.ExamDate >= ?"
+        params.append(start_date)
+
+    if end_date:
+        sql += " AND e.ExamDate <= ?"
+        params.append(end_date)
+
+    sql += " ORDER BY e.ExamDate, e.ExamId"
+
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    return cursor.fetchall()
+
+
 def format_name(name):
     """格式化姓名：两个字中间加空格"""
     if len(name) == 2:
@@ -267,44 +312,21 @@ def print_class_rank_summary(scores, class_name, subject_name, decline_threshold
     return improvements, declines, no_change
 
 
-def print_class_rank_sum_trend(scores, class_name, subject_name):
+def print_class_rank_sum_trend(rank_sums, class_name, subject_name):
     """打印班级学科排名总和变化
 
     Args:
-        scores: 成绩数据
+        rank_sums: 每次考试的排名总和（get_class_rank_sums，按日期排序）
         class_name: 班级名称
         subject_name: 科目名称
     """
-    if not scores:
+    if not rank_sums:
         print(f"⚠️  {class_name}没有{subject_name}成绩记录")
         return
 
-    # 按考试分组，计算每次考试的所有学生排名总和
-    exam_rank_sums = {}
-    exam_students_count = {}
-
-    for s in scores:
-        exam_name = s['ExamName']
-        exam_date = s['ExamDate']
-        rank = s['Rank']
-
-        if exam_name not in exam_rank_sums:
-            exam_rank_sums[exam_name] = {
-                'ExamDate': exam_date,
-                'RankSum': 0,
-                'StudentCount': 0
-            }
-
-        if rank is not None:
-            exam_rank_sums[exam_name]['RankSum'] += rank
-            exam_rank_sums[exam_name]['StudentCount'] += 1
-
-    if not exam_rank_sums:
-        print(f"⚠️  没有有效的排名数据")
-        return
-
-    # 按日期排序
-    sorted_exams = sorted(exam_rank_sums.items(), key=lambda x: datetime.strptime(x[1]['ExamDate'], '%Y-%m-%d'))
+    sorted_exams = [(s['ExamName'], {'ExamDate': s['ExamDate'], 'RankSum': s['RankSum'],
+                                     'StudentCount': s['StudentCount']})
+                    for s in rank_sums]
 
     if len(sorted_exams) < 2:
         print(f"⚠️  该班级{subject_name}只有{len(sorted_exams)}次考试记录，无法计算排名总和变化")
@@ -620,8 +642,8 @@ def main():
 
             if analysis_type == 2:
                 # 班级学科排名总和变化分析
-                scores = get_class_rank_trend(conn, class_name, subject_id, None, None, 'grade')
-                print_class_rank_sum_trend(scores, class_name, subject_name)
+                rank_sums = get_class_rank_sums(conn, class_name, subject_id)
+                print_class_rank_sum_trend(rank_sums, class_name, subject_name)
                 continue
 
             # 原有功能：学生个人排名变化分析
@@ -667,16 +689,7 @@ def main():
                 print(f"  时间范围: {start_date} 至 {end_date}")
             elif choice == 2:
                 # 获取最近两次考试的日期（从 Exams 表中查询该科目有考试的记录）
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT DISTINCT e.ExamId, e.ExamDate, e.ExamName
-                    FROM Exams e
-                    JOIN Scores s ON e.ExamId = s.ExamId
-                    WHERE s.SubjectId = ?
-                    ORDER BY e.ExamDate DESC
-                    LIMIT 2
-                """, (subject_id,))
-                recent_exams = cursor.fetchall()
+                recent_exams = get_recent_exams(conn, subject_id, 2)
 
                 if len(recent_exams) >= 2:
                     # 获取这两次考试的日期范围
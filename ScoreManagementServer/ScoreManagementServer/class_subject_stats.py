@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+考试-班级-科目统计表
+ExamClassSubjectStats 为每场考试每个班级每个科目预先汇总成绩条数、平均分、最高分、最低分、标准差、
+及格率、优秀率和年级排名总和，班级排名总和变化、班级对比等统计直接读取汇总行，不再扫描全部成绩。
+表由迁移脚本 migrations/0005_exam_class_subject_stats.sql 创建并填充。
+
+导入成绩或重新计算排名后按考试重建（不提交事务）:
+    refresh_class_subject_stats(conn, [exam_id])
+学生调班后重建这些学生有成绩的考试:
+    refresh_stats_for_students(conn, student_ids)
+"""
+
+from schema_migrations import register_functions
+
+# 及格线、优秀线（占科目满分的比例）
+PASS_RATIO = 0.6
+EXCELLENT_RATIO = 0.85
+
+# 一场考试的统计：按班级、科目一次 GROUP BY（sqrt 由 schema_migrations.register_functions 注册）
+INSERT_EXAM_STATS_SQL = """
+    INSERT INTO ExamClassSubjectStats (
+        ExamId, ClassName, SubjectId, StudentCount, ScoredCount, AvgScore, MaxScore, MinScore, StdDev,
+        PassCount, PassRate, ExcellentCount, ExcellentRate, GradeRankSum, GradeRankCount
+    )
+    SELECT
+        ExamId, ClassName, SubjectId, StudentCount, ScoredCount, AvgScore, MaxScore, MinScore, StdDev,
+        PassCount, 1.0 * PassCount / ScoredCount, ExcellentCount, 1.0 * ExcellentCount / ScoredCount,
+        GradeRankSum, GradeRankCount
+    FROM (
+        SELECT
+            s.ExamId,
+            st.ClassName,
+            s.SubjectId,
+            COUNT(*) as StudentCount,
+            COUNT(s.Score) as ScoredCount,
+            AVG(s.Score) as AvgScore,
+            MAX(s.Score) as MaxScore,
+            MIN(s.Score) as MinScore,
+            sqrt(MAX(AVG(s.Score * s.Score) - AVG(s.Score) * AVG(s.Score), 0)) as StdDev,
+            CASE WHEN MAX(sb.MaxScore) > 0
+                THEN COUNT(CASE WHEN s.Score >= sb.MaxScore * :pass_ratio THEN 1 END) END as PassCount,
+            CASE WHEN MAX(sb.MaxScore) > 0
+                THEN COUNT(CASE WHEN s.Score >= sb.MaxScore * :excellent_ratio THEN 1 END) END as ExcellentCount,
+            COALESCE(SUM(s.GradeRank), 0) as GradeRankSum,
+            COUNT(s.GradeRank) as GradeRankCount
+        FROM Scores s
+        JOIN Students st ON s.StudentId = st.StudentId
+        JOIN Subjects sb ON s.SubjectId = sb.SubjectId
+        WHERE s.ExamId = :exam_id
+        GROUP BY st.ClassName, s.SubjectId
+    )
+"""
+
+
+def refresh_class_subject_stats(conn, exam_ids):
+    """重建若干场考试的统计行（不提交事务），返回写入的行数"""
+    register_functions(conn)
+    cursor = conn.cursor()
+    written = 0
+    for exam_id in dict.fromkeys(exam_ids):
+        cursor.execute("DELETE FROM ExamClassSubjectStats WHERE ExamId = ?", (exam_id,))
+        cursor.execute(INSERT_EXAM_STATS_SQL, {'exam_id': exam_id, 'pass_ratio': PASS_RATIO,
+                                               'excellent_ratio': EXCELLENT_RATIO})
+        written += cursor.rowcount
+    return written
+
+
+def refresh_stats_for_students(conn, student_ids):
+    """学生调班后重建这些学生有成绩的考试的统计（不提交事务），返回写入的行数"""
+    student_ids = list(dict.fromkeys(student_ids))
+    if not student_ids:
+        return 0
+    cursor = conn.cursor()
+    exam_ids = []
+    # 分批查询，避免超过SQLite的参数个数限制
+    for start in range(0, len(student_ids), 500):
+        batch = student_ids[start:start + 500]
+        cursor.execute(f"""
+            SELECT DISTINCT ExamId FROM Scores
+            WHERE StudentId IN ({', '.join('?' * len(batch))})
+        """, batch)
+        exam_ids.extend(row[0] for row in cursor.fetchall())
+    return refresh_class_subject_stats(conn, sorted(set(exam_ids)))
+
+
+def rebuild_class_subject_stats(conn):
+    """按全部成绩重建统计表（不提交事务），返回写入的行数"""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM ExamClassSubjectStats")
+    cursor.execute("SELECT ExamId FROM Exams ORDER BY ExamId")
+    return refresh_class_subject_stats(conn, [row[0] for row in cursor.fetchall()])
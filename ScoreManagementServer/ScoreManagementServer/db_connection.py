@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+数据库连接
+所有工具通过 connect 打开数据库，得到相同的连接设置：
+- journal_mode=WAL: 查询（可视化、统计）与导入可以同时进行，读不阻塞写、写不阻塞读
+- synchronous=NORMAL: WAL模式下不会损坏数据库，只在断电时可能丢失最后提交的事务
+- temp_store=MEMORY: 导入暂存表和排序用的临时数据放在内存中
+- foreign_keys=ON: 成绩必须对应存在的学生、考试和科目
+- busy_timeout: 另一个进程正在写入时等待，而不是立即报 "database is locked"
+- 打开时把数据库结构升级到最新版本（schema_migrations，已是最新版本时只读取一次 user_version），
+  查询工具直接打开旧数据库时也不会遇到缺少的表
+
+两种配置：
+- READ: 查询和可视化工具
+- BULK_WRITE: 导入工具，更大的页缓存，WAL 自动检查点间隔更长，等待锁的时间更长
+
+用法:
+    conn = connect(DB_PATH)                 # 默认 BULK_WRITE
+    conn = connect(DB_PATH, READ)
+"""
+
+import sqlite3
+
+from schema_migrations import migrate
+
+READ = 'read'
+BULK_WRITE = 'bulk_write'
+
+# 各配置的 PRAGMA 设置（按顺序执行）；cache_size 为负数时单位为KB
+COMMON_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('temp_store', 'MEMORY'),
+    ('foreign_keys', 'ON'),
+    ('mmap_size', 268435456),               # 256MB
+)
+PROFILES = {
+    READ: COMMON_PRAGMAS + (
+        ('cache_size', -32768),             # 32MB
+        ('busy_timeout', 5000),
+    ),
+    BULK_WRITE: COMMON_PRAGMAS + (
+        ('cache_size', -131072),            # 128MB
+        ('busy_timeout', 30000),
+        ('wal_autocheckpoint', 10000),      # 约40MB检查点一次（默认1000页）
+    ),
+}
+
+
+def apply_profile(conn, profile=BULK_WRITE):
+    """对已打开的连接应用一种配置（需要在事务之外执行）"""
+    if profile not in PROFILES:
+        raise ValueError(f"未知的连接配置: {profile}（可选: {', '.join(PROFILES)}）")
+    for name, value in PROFILES[profile]:
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+def connect(db_path, profile=BULK_WRITE, row_factory=None):
+    """打开数据库并应用连接配置
+
+    row_factory: 例如 sqlite3.Row（查询函数按列名取值时使用）
+    """
+    conn = sqlite3.connect(db_path)
+    if row_factory is not None:
+        conn.row_factory = row_factory
+    apply_profile(conn, profile)
+    migrate(conn)
+    return conn
@@ -5,157 +5,45 @@ Excel导入工具 V2.0 - 简化解耦版
 支持查询和成绩趋势分析
 """
 
-import sqlite3
 import os
-import sys
-import re
-from datetime import datetime
 
-try:
-    from openpyxl import load_workbook
-except ImportError:
-    print("❌ 缺少openpyxl库")
-    print("请运行: pip install openpyxl")
-    sys.exit(1)
+from class_name_index import ClassNameIndex
+from db_connection import connect, READ
+from import_log import ImportLog
+from import_manifest import ImportManifest
+from import_plan import ScoreImportPlan, StudentImportPlan, confirm_plan
+from import_progress import ImportCheckpoint, SCORES, CHUNK_ROWS
+from rank_derivation import derive_exam_ranks, DEFAULT_TIES
+from roster_sync import RosterSync, detect_roster_columns
+from schema_migrations import schema_version
+from score_staging import ScoreStaging
+from score_trend import refresh_score_trends
+from class_subject_stats import refresh_class_subject_stats
+from xlsx_reader import open_workbook
+from folder_import import import_score_folder, import_score_jobs, read_exam_map
+from score_import_common import (
+    read_headers, cell_text, detect_sheet_columns,
+    parse_score_row, ensure_total_subject,
+)
 
 # 配置
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "StudentData.db")
-SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "database_schema_simple.sql")
-
-# 科目映射表 - 使用科目名作为key，数据库SubjectId作为value
-SUBJECT_IDS = {
-    '语文': 1,
-    '数学': 2,
-    '英语': 3,
-    '物理': 4,
-    '化学': 5,
-    '生物': 6,
-    '政治': 7,
-    '历史': 8,
-    '地理': 9,
-    '总分': 10  # SubjectId为10时表示总分
-}
-
-print("=" * 50)
-print("   高中成绩管理系统 V2.0 - Excel导入工具")
-print("=" * 50)
-print()
-
-
-def create_database():
-    """创建数据库"""
-    print(f"\n📝 正在创建数据库...")
-
-    if not os.path.exists(SCHEMA_FILE):
-        print(f"❌ 数据库架构文件不存在: {SCHEMA_FILE}")
-        return False
-
-    with open(SCHEMA_FILE, 'r', encoding='utf-8') as f:
-        sql = f.read()
-
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    # 分割并执行SQL语句
-    statements = sql.split(';')
-    for stmt in statements:
-        stmt = stmt.strip()
-        if stmt and not stmt.startswith('--'):
-            try:
-                cursor.execute(stmt)
-            except Exception as e:
-                if "already exists" not in str(e).lower():
-                    print(f"⚠️  {str(e)[:60]}")
-
-    conn.commit()
-    conn.close()
-
-    print(f"✅ 数据库创建成功: {DB_PATH}")
-    return True
 
+# Excel读取后端: 'auto'（优先纯标准库快速读取，失败时回退openpyxl）/ 'fast' / 'openpyxl'
+READER_BACKEND = 'auto'
 
-def update_database_schema():
-    """更新数据库架构：允许StudentNumber为NULL"""
-    print(f"\n🔄 正在检查并更新数据库架构...")
-
+def migrate_database():
+    """创建数据库或把数据库结构升级到最新版本（由 connect 执行 migrations 目录中的迁移脚本）"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        # 检查 Students 表是否存在
-        cursor.execute("""
-            SELECT name FROM sqlite_master
-            WHERE type='table' AND name='Students'
-        """)
-        table_exists = cursor.fetchone()
-
-        if not table_exists:
-            print("⚠️  Students 表不存在，跳过架构更新")
-            conn.close()
-            return False
-
-        # 检查 StudentNumber 是否允许 NULL
-        cursor.execute("PRAGMA table_info(Students)")
-        columns = cursor.fetchall()
-
-        studentnumber_notnull = False
-        for col in columns:
-            col_name = col[1]  # 列名在索引1
-            notnull = col[3]  # notnull 约束在索引3
-            if col_name == 'StudentNumber' and notnull == 1:
-                studentnumber_notnull = True
-                break
-
-        if studentnumber_notnull:
-            print("🔧 检测到 StudentNumber 字段不允许为空，正在更新架构...")
-
-            # SQLite 不支持直接修改列约束，需要重建表
-            # 1. 创建新表
-            cursor.execute("""
-                CREATE TABLE Students_new (
-                    StudentId INTEGER PRIMARY KEY AUTOINCREMENT,
-                    StudentNumber TEXT UNIQUE,
-                    StudentName TEXT NOT NULL,
-                    ClassName TEXT,
-                    Gender TEXT CHECK(Gender IN ('男', '女')),
-                    EnrollmentDate TEXT,
-                    IsActive INTEGER DEFAULT 1,
-                    CreatedAt TEXT DEFAULT (datetime('now', 'localtime')),
-                    UpdatedAt TEXT DEFAULT (datetime('now', 'localtime'))
-                )
-            """)
-
-            # 2. 复制数据
-            cursor.execute("""
-                INSERT INTO Students_new (StudentId, StudentNumber, StudentName, ClassName, Gender, EnrollmentDate, IsActive, CreatedAt, UpdatedAt)
-                SELECT StudentId, StudentNumber, StudentName, ClassName, Gender, EnrollmentDate, IsActive, CreatedAt, UpdatedAt
-                FROM Students
-            """)
-
-            # 3. 删除旧表
-            cursor.execute("DROP TABLE Students")
-
-            # 4. 重命名新表
-            cursor.execute("ALTER TABLE Students_new RENAME TO Students")
-
-            # 5. 重建索引
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_number ON Students(StudentNumber)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_name ON Students(StudentName)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_class ON Students(ClassName)")
-
-            conn.commit()
-            print("✅ 数据库架构更新成功：StudentNumber 字段现在可以为空")
-        else:
-            print("✅ 数据库架构已是最新版本")
-
+        conn = connect(DB_PATH)
+        version = schema_version(conn)
         conn.close()
-        return True
-
+        return version
     except Exception as e:
-        print(f"❌ 数据库架构更新失败: {e}")
+        print(f"❌ 数据库结构升级失败: {e}")
         import traceback
         traceback.print_exc()
-        return False
+        return None
 
 
 def import_students():
@@ -163,22 +51,51 @@ def import_students():
     print("\n📋 导入学生信息")
     print("-" * 50)
 
-    file_path = input("请输入Excel文件路径 (如: 107学生考号(新).xlsx): ").strip()
+    file_path = input("请输入Excel/CSV文件路径 (如: 107学生考号(新).xlsx): ").strip()
 
     if not os.path.exists(file_path):
         print("❌ 文件不存在!")
         return
 
     default_class = input("请输入默认班级名称 (可选,直接回车跳过): ").strip()
+    preview = input("是否先预演导入，确认变更后再写入？(y/N): ").strip().lower() == 'y'
 
-    print("\n⏳ 正在导入...")
+    conn = connect(DB_PATH)
+    try:
+        if preview:
+            plan = import_students_file(conn, file_path, default_class, dry_run=True)
+            if plan:
+                confirm_plan(plan)
+        else:
+            import_students_file(conn, file_path, default_class)
+    finally:
+        conn.close()
 
+
+def import_students_file(conn, file_path, default_class=None, log=None, dry_run=False):
+    """导入一个学生信息表（使用调用方的数据库连接，成功后提交）
+
+    先在内存中得出变更计划（import_plan.StudentImportPlan），再一次写入
+    log: 导入日志（ImportLog），为None时使用默认详细程度的日志
+    dry_run: 预演导入，返回变更计划而不写入数据库，由调用方决定 apply 或 discard
+    返回 (新增, 更新, 失败) 条数；文件无法读取时返回 None
+    """
+    if not os.path.exists(file_path):
+        print(f"❌ 文件不存在: {file_path}")
+        return None
+
+    print("\n⏳ 正在预演导入..." if dry_run else "\n⏳ 正在导入...")
+
+    log = log or ImportLog()
+    log.begin(file_path)
+
+    wb = None
     try:
-        wb = load_workbook(filename=file_path, read_only=True)
+        wb = open_workbook(file_path, READER_BACKEND)
         ws = wb.active
 
         # 读取表头
-        headers = [str(cell.value).strip() if cell.value else "" for cell in ws[1]]
+        headers = read_headers(ws)
 
         # 创建字段映射
         col_map = {}
@@ -193,26 +110,18 @@ def import_students():
                 elif '性别' in header:
                     col_map['性别'] = idx
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        success = 0
-        updated = 0
-        failed = 0
+        plan = StudentImportPlan(conn, log)
 
         # 从第2行开始读取数据
-        for row in ws.iter_rows(min_row=2):
+        for row in ws.iter_rows(min_row=2, values_only=True):
             # 读取学号
-            student_number_cell = row[col_map.get('学号', 0)] if col_map.get('学号') is not None else None
-            student_number = str(student_number_cell.value).strip() if student_number_cell and student_number_cell.value else ""
+            student_number = cell_text(row, col_map.get('学号'))
 
             # 读取姓名
-            student_name_cell = row[col_map.get('姓名', 1)] if col_map.get('姓名') is not None else None
-            student_name = str(student_name_cell.value).strip() if student_name_cell and student_name_cell.value else ""
+            student_name = cell_text(row, col_map.get('姓名'))
 
             # 读取班级
-            class_name_cell = row[col_map.get('班级', 2)] if col_map.get('班级') is not None else None
-            class_name = str(class_name_cell.value).strip() if class_name_cell and class_name_cell.value else ""
+            class_name = cell_text(row, col_map.get('班级'))
 
             # 使用默认班级或从Excel读取
             if not class_name and default_class:
@@ -221,45 +130,34 @@ def import_students():
             if not student_number or student_number == "None" or not student_name:
                 continue
 
-            try:
-                # 检查是否已存在
-                cursor.execute("SELECT StudentId FROM Students WHERE StudentNumber = ?", (student_number,))
-                existing = cursor.fetchone()
-
-                if existing:
-                    # 更新
-                    cursor.execute("""
-                        UPDATE Students SET
-                            StudentName = ?,
-                            ClassName = ?,
-                            UpdatedAt = datetime('now', 'localtime')
-                        WHERE StudentNumber = ?
-                    """, (student_name, class_name, student_number))
-                    updated += 1
-                else:
-                    # 插入新学生
-                    cursor.execute("""
-                        INSERT INTO Students (StudentNumber, StudentName, ClassName)
-                        VALUES (?, ?, ?)
-                    """, (student_number, student_name, class_name))
-                    success += 1
-            except Exception as e:
-                failed += 1
-                print(f"❌ 学号 {student_number}: {e}")
+            plan.add_row(student_number, student_name, class_name)
 
-        conn.commit()
-        conn.close()
-        wb.close()
+        if dry_run:
+            plan.print()
+            return plan
+
+        log.flush()
+        result = plan.write()
+        if result is None:
+            return None
+        success, updated, failed = result
 
         print(f"\n✅ 导入完成: 新增 {success} 条, 更新 {updated} 条, 失败 {failed} 条")
+        return success, updated, failed
 
     except Exception as e:
+        conn.rollback()
         print(f"\n❌ 导入失败: {e}")
         import traceback
         traceback.print_exc()
+        return None
+
+    finally:
+        if wb is not None:
+            wb.close()
 
 
-def find_matching_class(cursor, input_class):
+def find_matching_class(classes, input_class):
     """根据输入的班级名，在数据库中查找匹配的班级
 
     匹配规则：
@@ -267,41 +165,10 @@ def find_matching_class(cursor, input_class):
     2. 包含匹配（输入班级名包含在数据库班级名中）
     3. 反向包含匹配（数据库班级名包含在输入班级名中）
     4. 数字匹配（提取输入班级名中的数字，与数据库班级名中的数字匹配）
-    """
-    if not input_class or input_class == "None":
-        return None
-
-    # 获取所有已有班级
-    cursor.execute("SELECT DISTINCT ClassName FROM Students WHERE ClassName IS NOT NULL AND ClassName != '' ORDER BY ClassName")
-    all_classes = [row[0] for row in cursor.fetchall()]
-
-    if not all_classes:
-        return input_class  # 数据库中没有班级，直接使用输入的
-
-    # 1. 精确匹配
-    if input_class in all_classes:
-        return input_class
-
-    # 2. 包含匹配
-    for db_class in all_classes:
-        if input_class in db_class:
-            return db_class
-        if db_class in input_class:
-            return db_class
 
-    # 3. 数字匹配
-    import re
-    # 提取输入班级名中的数字
-    input_numbers = re.findall(r'\d+', input_class)
-    if input_numbers:
-        input_num = input_numbers[0]
-        for db_class in all_classes:
-            db_numbers = re.findall(r'\d+', db_class)
-            if db_numbers and db_numbers[0] == input_num:
-                return db_class
-
-    # 都不匹配，使用输入的班级名
-    return input_class
+    classes: 班级名索引（ClassNameIndex），每种写法只匹配一次
+    """
+    return classes.match(input_class)
 
 
 def update_students_info():
@@ -313,315 +180,69 @@ def update_students_info():
     print("      新增学生时，班级名称会自动匹配数据库中的标准班级名")
     print("      Excel表格格式与导入学生信息相同")
 
-    file_path = input("请输入Excel文件路径 (如: 107学生考号(新).xlsx): ").strip()
+    file_path = input("请输入Excel/CSV文件路径 (如: 107学生考号(新).xlsx): ").strip()
 
     if not os.path.exists(file_path):
         print("❌ 文件不存在!")
         return
 
-    print("\n⏳ 正在处理...")
-
+    conn = connect(DB_PATH)
     try:
-        wb = load_workbook(filename=file_path, read_only=True)
-        ws = wb.active
-
-        # 读取表头
-        headers = [str(cell.value).strip() if cell.value else "" for cell in ws[1]]
-
-        # 创建字段映射
-        col_map = {}
-        for idx, header in enumerate(headers):
-            if header:
-                if '学号' in header or '考号' in header:
-                    col_map['学号'] = idx
-                elif '姓名' in header:
-                    col_map['姓名'] = idx
-                elif '班级' in header:
-                    col_map['班级'] = idx
-                elif '性别' in header:
-                    col_map['性别'] = idx
+        update_students_file(conn, file_path)
+    finally:
+        conn.close()
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
 
-        updated = 0
-        inserted = 0
-        skipped = 0
-        failed = 0
+def update_students_file(conn, file_path, log=None):
+    """按姓名更新一个学生信息表（使用调用方的数据库连接，成功后提交）
 
-        # 从第2行开始读取数据
-        for row in ws.iter_rows(min_row=2):
-            # 读取姓名（必须）
-            student_name_cell = row[col_map.get('姓名', 1)] if col_map.get('姓名') is not None else None
-            student_name = str(student_name_cell.value).strip() if student_name_cell and student_name_cell.value else ""
-
-            # 读取学号
-            student_number_cell = row[col_map.get('学号', 0)] if col_map.get('学号') is not None else None
-            student_number = str(student_number_cell.value).strip() if student_number_cell and student_number_cell.value else ""
+    整张花名册先在内存中与 Students 表比较，再批量写入（见 roster_sync）
+    log: 导入日志（ImportLog），为None时使用默认详细程度的日志（不输出"信息无变化"的行）
+    返回 (新增, 更新, 跳过, 失败) 条数；文件无法读取或写入失败时返回 None
+    """
+    if not os.path.exists(file_path):
+        print(f"❌ 文件不存在: {file_path}")
+        return None
 
-            # 读取班级
-            class_name_cell = row[col_map.get('班级', 2)] if col_map.get('班级') is not None else None
-            input_class_name = str(class_name_cell.value).strip() if class_name_cell and class_name_cell.value else ""
+    print("\n⏳ 正在处理...")
 
-            if not student_name or student_name == "None":
-                continue
+    wb = None
+    try:
+        wb = open_workbook(file_path, READER_BACKEND)
+        ws = wb.active
 
-            if not student_number or student_number == "None":
-                print(f"⚠️  跳过: {student_name} | 学号为空")
-                skipped += 1
-                continue
+        # 读取表头，创建字段映射
+        col_map = detect_roster_columns(read_headers(ws))
 
-            # 如果有班级信息，匹配数据库中的标准班级名
-            matched_class = None
-            if input_class_name:
-                matched_class = find_matching_class(cursor, input_class_name)
-
-            try:
-                # 根据姓名查找学生
-                cursor.execute("SELECT StudentId, StudentNumber, ClassName FROM Students WHERE StudentName = ?", (student_name,))
-                existing = cursor.fetchone()
-
-                if existing:
-                    # 学生已存在，更新
-                    student_id, old_number, old_class = existing
-                    has_change = False
-
-                    # 检查学号是否需要更新
-                    # 条件：Excel中学号不为空，且（数据库中学号为空 或 学号不同）
-                    old_number_empty = not old_number or old_number.strip() == ""
-                    if student_number and (old_number_empty or student_number != old_number):
-                        # 检查新学号是否已被其他学生使用
-                        cursor.execute("SELECT StudentId, StudentName FROM Students WHERE StudentNumber = ? AND StudentId != ?", (student_number, student_id))
-                        conflict_record = cursor.fetchone()
-                        if conflict_record:
-                            # 存在学号冲突，废弃旧学号，以新学号为准
-                            conflict_id, conflict_name = conflict_record
-                            cursor.execute("""
-                                UPDATE Students SET
-                                    StudentNumber = NULL,
-                                    UpdatedAt = datetime('now', 'localtime')
-                                WHERE StudentId = ?
-                            """, (conflict_id,))
-                            print(f"⚠️  废弃学号: {conflict_name} | 学号 {student_number} 已被清空")
-
-                        # 更新当前学生学号
-                        cursor.execute("""
-                            UPDATE Students SET
-                                StudentNumber = ?,
-                                UpdatedAt = datetime('now', 'localtime')
-                            WHERE StudentId = ?
-                        """, (student_number, student_id))
-                        if old_number_empty:
-                            print(f"✅ 补充: {student_name} | 学号: 空 → {student_number}")
-                        else:
-                            print(f"✅ 更新: {student_name} | 学号: {old_number} → {student_number}")
-                        has_change = True
-
-                    # 检查班级是否需要更新
-                    # 条件：Excel中班级不为空，且（数据库中班级为空 或 班级不同）
-                    old_class_empty = not old_class or old_class.strip() == ""
-                    if matched_class and (old_class_empty or matched_class != old_class):
-                        cursor.execute("""
-                            UPDATE Students SET
-                                ClassName = ?,
-                                UpdatedAt = datetime('now', 'localtime')
-                            WHERE StudentId = ?
-                        """, (matched_class, student_id))
-                        if old_class_empty:
-                            print(f"✅ 补充: {student_name} | 班级: 空 → {matched_class} (自动匹配: {input_class_name})")
-                        elif input_class_name and input_class_name != matched_class:
-                            print(f"✅ 更新: {student_name} | 班级: {old_class or '空'} → {matched_class} (自动匹配: {input_class_name})")
-                        else:
-                            print(f"✅ 更新: {student_name} | 班级: {old_class or '空'} → {matched_class}")
-                        has_change = True
-
-                    if has_change:
-                        updated += 1
-                    else:
-                        print(f"⏭️  跳过: {student_name} | 信息无变化")
-                        skipped += 1
+        sync = RosterSync(conn)
 
-                else:
-                    # 学生不存在，插入新学生
-                    # 检查学号是否已存在
-                    cursor.execute("SELECT StudentId, StudentName FROM Students WHERE StudentNumber = ?", (student_number,))
-                    number_record = cursor.fetchone()
-                    if number_record:
-                        # 存在学号冲突，废弃旧学号
-                        number_id, number_name = number_record
-                        cursor.execute("""
-                            UPDATE Students SET
-                                StudentNumber = NULL,
-                                UpdatedAt = datetime('now', 'localtime')
-                            WHERE StudentId = ?
-                        """, (number_id,))
-                        print(f"⚠️  废弃学号: {number_name} | 学号 {student_number} 已被清空")
-
-                    # 插入新学生
-                    display_class = matched_class if matched_class else "未设置"
-                    if input_class_name and matched_class and input_class_name != matched_class:
-                        print(f"➕ 新增: {student_name} | 学号: {student_number} | 班级: {matched_class} (自动匹配: {input_class_name})")
-                    else:
-                        print(f"➕ 新增: {student_name} | 学号: {student_number} | 班级: {display_class}")
-                    cursor.execute("""
-                        INSERT INTO Students (StudentNumber, StudentName, ClassName)
-                        VALUES (?, ?, ?)
-                    """, (student_number, student_name, matched_class))
-                    inserted += 1
-
-            except Exception as e:
-                failed += 1
-                print(f"❌ 处理失败 {student_name}: {e}")
+        # 从第2行开始读取数据：姓名（必须）、学号、班级
+        for row in ws.iter_rows(min_row=2, values_only=True):
+            sync.add_row(cell_text(row, col_map.get('姓名')),
+                         cell_text(row, col_map.get('学号')),
+                         cell_text(row, col_map.get('班级')))
 
+        sync.apply()
         conn.commit()
-        conn.close()
-        wb.close()
 
-        print(f"\n✅ 处理完成:")
-        print(f"  新增学生: {inserted} 条")
-        print(f"  更新学生: {updated} 条")
-        print(f"  跳过: {skipped} 条")
-        print(f"  失败: {failed} 条")
+        report = sync.report
+        log = log or ImportLog()
+        log.begin(file_path)
+        report.log_changes(log)
+        log.flush()
+        report.print_summary()
+        return report.inserted, report.updated, report.skipped, report.failed
 
     except Exception as e:
+        conn.rollback()
         print(f"\n❌ 更新失败: {e}")
         import traceback
         traceback.print_exc()
+        return None
 
-
-def detect_sheet_columns(headers):
-    """
-    智能检测Excel表的列位置
-    优先级：
-    1. 检测学号列（包含"学号"或"考号"二字）
-    2. 如果没有学号，检测姓名列（包含"姓名"二字）
-    3. 检测学科成绩列（学科名或学科名+成绩/分数）
-    4. 检测排名列（成绩列附近查找"班级排名"/"班次"/"年级排名"）
-    """
-    # 列索引映射（从0开始）
-    col_map = {}
-
-    # 1. 优先检测学号列
-    for idx, header in enumerate(headers):
-        if header and ('学号' in header or '考号' in header):
-            col_map['学号'] = idx
-            break
-
-    # 2. 如果没找到学号，检测姓名列
-    if '学号' not in col_map:
-        for idx, header in enumerate(headers):
-            if header and '姓名' in header:
-                col_map['姓名'] = idx
-                break
-
-    # 3. 检测班级列
-    for idx, header in enumerate(headers):
-        if header and '班级' in header:
-            col_map['班级'] = idx
-            break
-
-    # 4. 检测总分相关列
-    for idx, header in enumerate(headers):
-        if header:
-            # 检测总分分数列（支持多种命名方式）
-            if ('总分分数' in header or header == '总分' or header.startswith('总分') or
-                '总分成绩' in header or '总分级' == header):
-                # 确保不是排名列
-                if not ('名次' in header or '排名' in header):
-                    col_map['总分_score'] = idx
-            # 检测总分校名次/年级排名（支持多种命名方式）
-            elif ('总分校名次' in header or '总分班级排名' in header or
-                  '总分级排名' in header or '总分年级排名' in header or
-                  '总分年级名次' in header or '总分校名次' in header or
-                  '总分校排名' in header or '总分校次' in header):
-                col_map['总分_grade_rank'] = idx
-            # 检测总分班名次/班级排名（支持多种命名方式）
-            elif ('总分班名次' in header or '总分班级名次' in header or
-                  '总分班级排名' in header or '总分班次' in header):
-                col_map['总分_class_rank'] = idx
-
-    # 5. 检测总分的通用排名列（不带"总分"前缀的情况）
-    # 如果找到了总分分数列，在它后面查找可能的排名列
-    if '总分_score' in col_map:
-        total_score_col = col_map['总分_score']
-        # 在总分列之后5列内查找班级排名和年级排名
-        for idx in range(total_score_col + 1, min(total_score_col + 6, len(headers))):
-            header = headers[idx]
-            if header:
-                # 班级排名的多种命名方式
-                if ('班级名次' in header or '班级排名' in header or '班名次' in header or '班次' in header):
-                    if '总分_class_rank' not in col_map:
-                        col_map['总分_class_rank'] = idx
-                        # 如果还没找到年级排名，继续往后面查找
-                # 年级排名的多种命名方式（必须在班级排名之后或同一列的年级排名）
-                elif ('年级名次' in header or '年级排名' in header or '学校名次' in header or
-                      '校名次' in header or '校次' in header or '校排名' in header):
-                    if '总分_grade_rank' not in col_map:
-                        col_map['总分_grade_rank'] = idx
-
-    # 5. 检测各学科成绩和排名列
-    for subject_name in ['语文', '数学', '英语', '物理', '化学', '生物', '政治', '历史', '地理']:
-        # 成绩列：支持 "学科名", "学科名成绩", "学科名分数"
-        score_col = None
-        for idx, header in enumerate(headers):
-            if header:
-                if (header == subject_name or
-                    f'{subject_name}成绩' in header or
-                    f'{subject_name}分数' in header):
-                    col_map[f'{subject_name}_score'] = idx
-                    score_col = idx
-                    break
-
-        # 班级排名列：成绩列后查找 "班名次", "班级名次", "班级排名", "班次"
-        if score_col is not None:
-            # 优先查找带学科前缀的排名列
-            class_rank_col = None
-            for idx in range(score_col + 1, min(score_col + 3, len(headers))):
-                header = headers[idx]
-                if header and (f'{subject_name}班名次' in header or
-                              f'{subject_name}班级名次' in header or
-                              f'{subject_name}班级排名' in header):
-                    col_map[f'{subject_name}_class_rank'] = idx
-                    class_rank_col = idx
-                    break
-
-            # 如果没找到带学科前缀的，查找通用的"班次"、"班级排名"等
-            if class_rank_col is None:
-                for idx in range(score_col + 1, min(score_col + 3, len(headers))):
-                    header = headers[idx]
-                    if header and ('班次' in header or '班级排名' in header or '班级名次' in header):
-                        col_map[f'{subject_name}_class_rank'] = idx
-                        break
-
-        # 年级/学校排名列：成绩列后查找 "年级名次", "年级排名", "校名次", "校次"
-        if score_col is not None:
-            # 优先查找带学科前缀的排名列
-            for idx in range(score_col + 1, min(score_col + 5, len(headers))):
-                header = headers[idx]
-                if header and (f'{subject_name}年级名次' in header or
-                              f'{subject_name}年级排名' in header or
-                              f'{subject_name}校名次' in header or
-                              f'{subject_name}校次' in header):
-                    col_map[f'{subject_name}_grade_rank'] = idx
-                    break
-
-            # 如果没找到带学科前缀的，查找通用的"年级排名"、"年级名次"、"校名次"、"校次"等
-            # 注意：需要判断是否已被其他学科占用
-            found = False
-            for idx in range(score_col + 1, min(score_col + 5, len(headers))):
-                header = headers[idx]
-                if header and ('年级排名' in header or '年级名次' in header or '校名次' in header or '校次' in header):
-                    # 检查该列是否已被分配给其他学科
-                    is_assigned = any(f'{subj}_grade_rank' in col_map and col_map[f'{subj}_grade_rank'] == idx
-                                    for subj in ['语文', '数学', '英语', '物理', '化学', '生物', '政治', '历史', '地理'])
-                    if not is_assigned:
-                        col_map[f'{subject_name}_grade_rank'] = idx
-                        found = True
-                        break
-                elif found:
-                    break
-
-    return col_map
+    finally:
+        if wb is not None:
+            wb.close()
 
 
 def import_scores():
@@ -629,7 +250,7 @@ def import_scores():
     print("\n📊 导入学生成绩")
     print("-" * 50)
 
-    file_path = input("请输入Excel文件路径 (如: 107班物化生成绩.xlsx): ").strip()
+    file_path = input("请输入Excel/CSV文件路径 (如: 107班物化生成绩.xlsx): ").strip()
 
     if not os.path.exists(file_path):
         print("❌ 文件不存在!")
@@ -639,239 +260,242 @@ def import_scores():
     if not exam_id.isdigit():
         print("❌ 无效的考试ID!")
         return
-    exam_id = int(exam_id)
 
-    print("\n⏳ 正在导入...")
+    preview = input("是否先预演导入，确认变更后再写入？(y/N): ").strip().lower() == 'y'
 
+    conn = connect(DB_PATH)
+    try:
+        if preview:
+            plan = import_scores_file(conn, file_path, int(exam_id), dry_run=True)
+            if plan:
+                confirm_plan(plan)
+        else:
+            import_scores_file(conn, file_path, int(exam_id))
+    finally:
+        conn.close()
+
+
+def import_scores_file(conn, file_path, exam_id, sheet_as_class=False, rank_ties=DEFAULT_TIES, log=None,
+                       chunk_rows=CHUNK_ROWS, dry_run=False):
+    """导入一个成绩表（工作簿中的所有sheet）到指定考试（使用调用方的数据库连接，分块提交）
+
+    sheet_as_class: sheet名作为该sheet中没有班级信息的行的班级（与限时练导入相同）
+    rank_ties: 成绩表缺少排名时按分数计算排名的并列方式（见 rank_derivation）
+    log: 导入日志（ImportLog），为None时使用默认详细程度的日志
+    chunk_rows: 每多少行合并提交一次并记录断点（见 import_progress）；
+                导入中途失败后重新导入同一文件时从断点继续
+    dry_run: 预演导入，解析并匹配整个文件后返回变更计划（import_plan.ScoreImportPlan）而不写入数据库，
+             由调用方决定 apply 或 discard；预演时不分块提交
+    返回 (成功, 失败) 条数（只统计本次处理的行）；考试不存在或文件无法导入时返回 None
+    """
+    if not os.path.exists(file_path):
+        print(f"❌ 文件不存在: {file_path}")
+        return None
+
+    print("\n⏳ 正在预演导入..." if dry_run else "\n⏳ 正在导入...")
+
+    wb = None
     try:
-        conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
 
         # 检查考试是否存在
         cursor.execute("SELECT * FROM Exams WHERE ExamId = ?", (exam_id,))
         if not cursor.fetchone():
             print("❌ 考试不存在,请先创建考试!")
-            conn.close()
-            return
+            return None
 
-        wb = load_workbook(filename=file_path, read_only=True)
-        ws = wb.active
+        wb = open_workbook(file_path, READER_BACKEND)
+        sheet_names = list(wb.sheetnames)
+        multi_sheet = len(sheet_names) > 1
+        classes = ClassNameIndex(conn) if sheet_as_class else None
 
-        # 读取表头
-        headers = [str(cell.value).strip() if cell.value else "" for cell in ws[1]]
-
-        print(f"\n📋 Excel文件信息:")
-        print(f"  总行数: {ws.max_row}")
-        print(f"  总列数: {ws.max_column}")
-        print(f"  表头列: {headers}")
+        # 检查总分科目是否存在，不存在则创建（SubjectId固定为10）
+        ensure_total_subject(conn)
 
-        # 使用智能列检测
-        col_map = detect_sheet_columns(headers)
+        log = log or ImportLog()
+        log.begin(file_path)
 
-        print(f"\n🔍 字段映射:")
-        for key, idx in col_map.items():
-            print(f"  {key}: 列{idx} ({headers[idx] if idx < len(headers) else 'N/A'})")
+        # 断点：上次导入中途失败时，已提交的sheet和行不再处理
+        checkpoint = ImportCheckpoint(conn, SCORES, exam_id, file_path)
+        if checkpoint.resuming:
+            print(f"\n⏩ 发现该文件上次未完成的导入，将从断点继续（已提交的行不再处理）")
 
-        # 显示匹配模式
-        if '学号' in col_map:
-            print(f"\n✅ 使用学号匹配模式")
-        elif '姓名' in col_map:
-            print(f"\n✅ 使用姓名匹配模式 (根据姓名查找学号)")
-        else:
-            print(f"\n⚠️  警告: Excel中既没有学号列也没有姓名列!")
+        # 解析后的原始行先批量写入暂存表，再由SQL统一匹配学生、校验并合并写入；
+        # 每 chunk_rows 行合并一次，与断点一起提交后清空暂存表。同一学生出现多次时以后面的行为准
+        staging = ScoreStaging(conn)
+        manifests = []
+        stats = {key: 0 for key in ('skipped', 'inserted', 'updated', 'unchanged', 'rejected')}
+        processed = 0
 
-        # 检查总分科目是否存在，不存在则创建（SubjectId固定为10）
-        cursor.execute("SELECT SubjectId FROM Subjects WHERE SubjectId = ?", (10,))
-        total_subject = cursor.fetchone()
-        if not total_subject:
-            print("\n⚠️  数据库中不存在'总分'科目（SubjectId=10），正在添加...")
-            cursor.execute("INSERT INTO Subjects (SubjectId, SubjectName, SubjectCode) VALUES (10, '总分', 'TOTAL')")
+        def commit_chunk(manifest, sheet_name, last_row, done):
+            """合并暂存表中的一块数据，与断点一起提交"""
+            nonlocal staging
+            staging.merge(exam_id)
+            manifest.save(done)
+            staging.log_messages(log, with_source=multi_sheet)
+            chunk_stats = staging.summary().get(manifest.source, {})
+            for key in stats:
+                stats[key] += chunk_stats.get(key, 0)
+            checkpoint.save(sheet_name, last_row, done)
             conn.commit()
-            print(f"✅ 已添加'总分'科目 (SubjectId: 10)")
-        else:
-            # 检查科目名称是否正确
-            cursor.execute("SELECT SubjectName FROM Subjects WHERE SubjectId = ?", (10,))
-            subject_name = cursor.fetchone()
-            if subject_name and subject_name[0] != '总分':
-                print(f"⚠️  SubjectId=10的科目名称是'{subject_name[0]}'，正在更新为'总分'...")
-                cursor.execute("UPDATE Subjects SET SubjectName = '总分' WHERE SubjectId = ?", (10,))
-                conn.commit()
-                print(f"✅ 已更新为'总分'")
-
-        success = 0
-        failed = 0
-        processed = 0
-        has_student_number = '学号' in col_map
-
-        print(f"\n开始处理数据...")
-
-        for row in ws.iter_rows(min_row=2):
-            processed += 1
-
-            student_id = None
-            student_number = ""
-            student_name = ""
-            class_name = ""
-
-            # 读取班级（如果有）
-            if '班级' in col_map:
-                class_cell = row[col_map['班级']]
-                class_name = str(class_cell.value).strip() if class_cell and class_cell.value else ""
-
-            # 优先使用学号，如果没有则使用姓名查找
-            if has_student_number:
-                # 读取学号
-                student_number_cell = row[col_map.get('学号', 0)]
-                student_number = str(student_number_cell.value).strip() if student_number_cell and student_number_cell.value else ""
-
-                if student_number and student_number != "None":
-                    # 根据学号查找
-                    cursor.execute("SELECT StudentId, StudentName FROM Students WHERE StudentNumber = ?", (student_number,))
-                    student = cursor.fetchone()
-                    if student:
-                        student_id, student_name = student
-                    else:
-                        print(f"⚠️  第{processed}行: 学号 '{student_number}' 不存在,跳过")
-                        failed += 1
-                        continue
-                else:
-                    print(f"⚠️  第{processed}行: 学号为空,跳过")
-                    failed += 1
-                    continue
-            else:
-                # 没有学号列，使用姓名查找
-                if '姓名' in col_map:
-                    name_cell = row[col_map['姓名']]
-                    student_name = str(name_cell.value).strip() if name_cell and name_cell.value else ""
-
-                    if student_name and student_name != "None":
-                        # 根据姓名查找（可以加上班级筛选，如果有班级信息）
-                        if class_name:
-                            # 如果有班级信息，优先匹配同班级的学生
-                            cursor.execute("SELECT StudentId, StudentNumber FROM Students WHERE StudentName = ? AND ClassName = ?", (student_name, class_name))
-                            students = cursor.fetchall()
-                            if len(students) == 0:
-                                # 同班级没找到，去掉班级限制再找
-                                cursor.execute("SELECT StudentId, StudentNumber FROM Students WHERE StudentName = ?", (student_name,))
-                                students = cursor.fetchall()
-                        else:
-                            cursor.execute("SELECT StudentId, StudentNumber FROM Students WHERE StudentName = ?", (student_name,))
-                            students = cursor.fetchall()
-
-                        if len(students) == 0:
-                            print(f"⚠️  第{processed}行: 未找到姓名为 '{student_name}' 的学生" + (f"(班级:{class_name})" if class_name else "") + ",跳过")
-                            failed += 1
-                            continue
-                        elif len(students) > 1:
-                            print(f"⚠️  第{processed}行: 姓名为 '{student_name}' 的学生有{len(students)}个,使用第一个")
-                            student_id, student_number = students[0]
-                        else:
-                            student_id, student_number = students[0]
-                    else:
-                        print(f"⚠️  第{processed}行: 姓名为空,跳过")
-                        failed += 1
-                        continue
-                else:
-                    print(f"⚠️  第{processed}行: Excel中既没有学号列也没有姓名列,跳过")
-                    failed += 1
-                    continue
+            staging = ScoreStaging(conn)
 
-            # 如果还是没找到学生ID，跳过
-            if not student_id:
-                if has_student_number:
-                    print(f"⚠️  第{processed}行: 学号 '{student_number}' 未找到,跳过")
-                else:
-                    print(f"⚠️  第{processed}行: 姓名为 '{student_name}' 的学生未找到,跳过")
-                failed += 1
+        for sheet_name in sheet_names:
+            if checkpoint.sheet_done(sheet_name):
+                print(f"\n⏩ Sheet {sheet_name} 已在上次导入中完成，跳过")
                 continue
 
-            # 读取各科成绩（包括总分，SubjectId=10）
-            for subject_name, subject_id in SUBJECT_IDS.items():
-                # 只处理Excel中有对应列的科目
-                if f'{subject_name}_score' not in col_map:
-                    continue
+            ws = wb[sheet_name]
+            source = f"{os.path.basename(file_path)} [{sheet_name}]" if multi_sheet else None
+
+            # 读取表头
+            headers = read_headers(ws)
+
+            if multi_sheet:
+                print(f"\n📋 Sheet: {sheet_name}")
+            else:
+                print(f"\n📋 Excel文件信息:")
+            print(f"  总行数: {ws.max_row}")
+            print(f"  总列数: {ws.max_column}")
+            print(f"  表头列: {headers}")
+
+            # 使用智能列检测
+            col_map = detect_sheet_columns(headers)
+
+            print(f"\n🔍 字段映射:")
+            for key, idx in col_map.items():
+                print(f"  {key}: 列{idx} ({headers[idx] if idx < len(headers) else 'N/A'})")
+
+            # 显示匹配模式
+            if '学号' in col_map:
+                print(f"\n✅ 使用学号匹配模式")
+            elif '姓名' in col_map:
+                print(f"\n✅ 使用姓名匹配模式 (根据姓名查找学号)")
+            elif multi_sheet:
+                print(f"\n⚠️  跳过: 该sheet既没有学号列也没有姓名列")
+                continue
+            else:
+                print(f"\n⚠️  警告: Excel中既没有学号列也没有姓名列!")
+
+            sheet_class = classes.match(sheet_name.strip()) if classes else None
+
+            # 数据从Excel第2行开始，row_no 为数据行序号（Excel行号 - 1）
+            resume_row = checkpoint.last_row(sheet_name)
 
-                # 读取成绩
-                score_cell = row[col_map.get(f'{subject_name}_score')]
-                score = None
-                if score_cell and score_cell.value:
-                    try:
-                        score = float(score_cell.value)
-                    except:
-                        pass
-
-                # 读取班级排名
-                class_rank = None
-                class_rank_col = col_map.get(f'{subject_name}_class_rank')
-                if class_rank_col is not None:
-                    class_rank_cell = row[class_rank_col]
-                    if class_rank_cell and class_rank_cell.value:
-                        try:
-                            class_rank = int(float(class_rank_cell.value))
-                        except:
-                            pass
-
-                # 读取年级排名
-                grade_rank = None
-                grade_rank_col = col_map.get(f'{subject_name}_grade_rank')
-                if grade_rank_col is not None:
-                    grade_rank_cell = row[grade_rank_col]
-                    if grade_rank_cell and grade_rank_cell.value:
-                        try:
-                            grade_rank = int(float(grade_rank_cell.value))
-                        except:
-                            pass
-
-                # 如果有成绩则插入或更新
-                if score is not None:
-                    try:
-                        # 检查成绩是否已存在
-                        cursor.execute("""
-                            SELECT ScoreId FROM Scores
-                            WHERE ExamId = ? AND StudentId = ? AND SubjectId = ?
-                        """, (exam_id, student_id, subject_id))
-                        existing = cursor.fetchone()
-
-                        if existing:
-                            # 更新
-                            cursor.execute("""
-                                UPDATE Scores SET
-                                    Score = ?,
-                                    ClassRank = ?,
-                                    GradeRank = ?,
-                                    UpdatedAt = datetime('now', 'localtime')
-                                WHERE ExamId = ? AND StudentId = ? AND SubjectId = ?
-                            """, (score, class_rank, grade_rank, exam_id, student_id, subject_id))
-                        else:
-                            # 插入
-                            cursor.execute("""
-                                INSERT INTO Scores (
-                                    ExamId, StudentId, SubjectId, Score, ClassRank, GradeRank
-                                ) VALUES (?, ?, ?, ?, ?, ?)
-                            """, (exam_id, student_id, subject_id, score, class_rank, grade_rank))
-
-                        success += 1
-                    except Exception as e:
-                        failed += 1
-                        student_info = f"学号{student_number}" if has_student_number else f"姓名'{student_name}'"
-                        print(f"❌ {student_info} 科目 {subject_name}: {e}")
+            # 导入清单：跳过与上次导入相同的行，只写入新增或改变的成绩
+            manifest = ImportManifest(conn, exam_id, file_path, ws.title, source=source, resumed=bool(resume_row),
+                                      digest=checkpoint.file_hash)
+            manifests.append(manifest)
+            if manifest.file_unchanged:
+                print(f"\nℹ️  该{'sheet' if multi_sheet else '文件'}与上次导入时相同，数据库中成绩仍与文件一致的行将直接跳过")
 
+            if resume_row:
+                print(f"\n⏩ 从第{resume_row + 1}行继续导入")
+            print(f"\n开始处理数据...")
+
+            row_no = 0
+            chunk = 0
+            for row in ws.iter_rows(min_row=2, values_only=True):
+                row_no += 1
+                if row_no + 1 <= resume_row:
+                    continue
+                parsed_row = parse_score_row(row, col_map)
+                if sheet_class and not parsed_row[2]:
+                    parsed_row = (parsed_row[0], parsed_row[1], sheet_class, parsed_row[3])
+                staging.add_row(manifest.source, row_no, col_map, parsed_row, manifest.manifest_id)
+                processed += 1
+                chunk += 1
+                if chunk >= chunk_rows and not dry_run:
+                    commit_chunk(manifest, sheet_name, row_no + 1, done=False)
+                    chunk = 0
+            if not dry_run:
+                commit_chunk(manifest, sheet_name, row_no + 1, done=True)
+
+        if dry_run:
+            # 整个文件在暂存表中得出变更计划，确认后由计划对象一次写入
+            staging.plan(exam_id)
+            plan = ScoreImportPlan(conn, exam_id, staging, manifests, processed, rank_ties, checkpoint, log,
+                                   with_source=multi_sheet)
+            plan.print()
+            return plan
+
+        ranked = derive_exam_ranks(conn, exam_id, rank_ties)
+        refresh_score_trends(conn, [exam_id])
+        refresh_class_subject_stats(conn, [exam_id])
+        checkpoint.finish()
         conn.commit()
-        conn.close()
-        wb.close()
+
+        # 匹配失败被跳过的行、匹配提示和未通过校验的成绩
+        log.flush()
+
+        success = stats['inserted'] + stats['updated'] + stats['unchanged']
+        failed = stats['skipped'] + stats['rejected']
 
         print(f"\n========================================")
         print(f"导入结果:")
+        if multi_sheet:
+            print(f"  sheet数: {len(manifests)}/{len(sheet_names)}")
         print(f"  总行数: {processed}")
         print(f"  成功: {success}")
         print(f"  失败: {failed}")
+        print(f"  新增: {stats['inserted']}  更新: {stats['updated']}  未变化: {stats['unchanged']}")
+        if ranked:
+            print(f"  按分数计算排名: {ranked} 条")
         print(f"========================================")
         print(f"✅ 导入完成: 成功 {success} 条, 失败 {failed} 条")
+        return success, failed
 
     except Exception as e:
+        conn.rollback()
         print(f"\n❌ 导入失败: {e}")
+        print("   已提交的部分已记录断点，修正问题后重新导入同一文件将从断点继续")
         import traceback
         traceback.print_exc()
+        return None
+
+    finally:
+        if wb is not None:
+            wb.close()
+
+
+def import_folder_scores():
+    """批量导入文件夹中的成绩表（多进程解析）"""
+    print("\n📂 批量导入文件夹成绩")
+    print("-" * 50)
+
+    folder = input("请输入成绩表所在文件夹: ").strip()
+    if not os.path.isdir(folder):
+        print("❌ 文件夹不存在!")
+        return
+
+    exam_id = input("请输入考试ID: ").strip()
+    if not exam_id.isdigit():
+        print("❌ 无效的考试ID!")
+        return
+
+    import_score_folder(folder, int(exam_id), backend=READER_BACKEND, db_path=DB_PATH)
+
+
+def import_exam_season():
+    """按考试映射文件一次导入多场考试的成绩"""
+    print("\n📚 按考试映射文件导入多场考试")
+    print("-" * 50)
+    print("说明：映射文件每行一条: 考试ID,文件或文件夹[,sheet名]，# 开头为注释")
+    print("      未指定sheet时导入工作簿中的所有sheet，全部考试在同一事务中提交")
+
+    map_path = input("请输入考试映射文件路径: ").strip()
+    if not os.path.exists(map_path):
+        print("❌ 文件不存在!")
+        return
+
+    try:
+        jobs = read_exam_map(map_path)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    sheet_as_class = input("没有班级列时用sheet名作为班级? (y/n): ").strip().lower() == 'y'
+    import_score_jobs(jobs, backend=READER_BACKEND, db_path=DB_PATH, sheet_as_class=sheet_as_class)
 
 
 def create_exam():
@@ -886,7 +510,19 @@ def create_exam():
     term = input("学期 (上学期/下学期,可选): ").strip()
     academic_year = input("学年 (如: 2024-2025,可选): ").strip()
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
+    try:
+        exam_id = create_exam_record(conn, exam_name, exam_type, exam_date, grade_name, term, academic_year)
+    finally:
+        conn.close()
+
+    print(f"\n✅ 考试创建成功!")
+    print(f"考试ID: {exam_id}")
+    print(f"请记住这个ID,导入成绩时需要使用!")
+
+
+def create_exam_record(conn, exam_name, exam_type, exam_date, grade_name, term=None, academic_year=None):
+    """插入一条考试记录并提交，返回考试ID"""
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -897,11 +533,7 @@ def create_exam():
 
     exam_id = cursor.lastrowid
     conn.commit()
-    conn.close()
-
-    print(f"\n✅ 考试创建成功!")
-    print(f"考试ID: {exam_id}")
-    print(f"请记住这个ID,导入成绩时需要使用!")
+    return exam_id
 
 
 def query_scores():
@@ -916,7 +548,7 @@ def query_scores():
     print("3. 查看所有学生成绩")
     choice = input("请选择 (1/2/3): ").strip()
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH, READ)
     cursor = conn.cursor()
 
     if choice == '1':
@@ -946,7 +578,7 @@ def query_student_by_number(cursor, student_number):
         print(f"❌ 未找到学号为 {student_number} 的学生!")
         return
 
-    student_id, number, name, class_name, _, _, _ = student
+    student_id, number, name, class_name = student[:4]
 
     print(f"\n👤 学生信息")
     print(f"  学号: {number}")
@@ -1058,38 +690,21 @@ def query_trend(cursor, student_id, student_name):
     print(f"\n📈 成绩趋势分析")
     print("-" * 80)
 
+    # 上次考试的成绩和排名从成绩趋势表中按索引读取
     cursor.execute("""
         SELECT
             sb.SubjectName,
-            e.ExamId, e.ExamName, e.ExamDate,
-            s.Score,
-            s.ClassRank, s.GradeRank,
-            -- 上次考试成绩
-            (
-                SELECT s2.Score
-                FROM Scores s2
-                JOIN Exams e2 ON s2.ExamId = e2.ExamId
-                WHERE s2.StudentId = ? AND s2.SubjectId = s.SubjectId
-                  AND e2.ExamDate < e.ExamDate
-                ORDER BY e2.ExamDate DESC
-                LIMIT 1
-            ) as PrevScore,
-            -- 上次考试排名
-            (
-                SELECT s2.ClassRank
-                FROM Scores s2
-                JOIN Exams e2 ON s2.ExamId = e2.ExamId
-                WHERE s2.StudentId = ? AND s2.SubjectId = s.SubjectId
-                  AND e2.ExamDate < e.ExamDate
-                ORDER BY e2.ExamDate DESC
-                LIMIT 1
-            ) as PrevClassRank
-        FROM Scores s
-        JOIN Exams e ON s.ExamId = e.ExamId
-        JOIN Subjects sb ON s.SubjectId = sb.SubjectId
-        WHERE s.StudentId = ?
-        ORDER BY sb.SortOrder, e.ExamDate DESC
-    """, (student_id, student_id, student_id))
+            t.ExamId, e.ExamName, t.ExamDate,
+            t.Score,
+            t.ClassRank, t.GradeRank,
+            t.PrevScore,
+            t.PrevClassRank
+        FROM StudentScoreTrend t
+        JOIN Exams e ON t.ExamId = e.ExamId
+        JOIN Subjects sb ON t.SubjectId = sb.SubjectId
+        WHERE t.StudentId = ?
+        ORDER BY sb.SortOrder, t.ExamDate DESC, t.ExamId DESC
+    """, (student_id,))
 
     trends = cursor.fetchall()
 
@@ -1108,7 +723,7 @@ def query_trend(cursor, student_id, student_name):
         print("-" * 80)
 
         for trend in subject_data:
-            exam_name, exam_id, exam_date, score, class_rank, grade_rank, prev_score, prev_class_rank = trend
+            _, exam_id, exam_name, exam_date, score, class_rank, grade_rank, prev_score, prev_class_rank = trend
 
             # 计算变化
             score_change = ""
@@ -1134,7 +749,15 @@ def show_statistics():
     print("\n📈 数据库统计")
     print("-" * 50)
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH, READ)
+    try:
+        print_statistics(conn)
+    finally:
+        conn.close()
+
+
+def print_statistics(conn):
+    """打印学生/考试/成绩数量和考试列表"""
     cursor = conn.cursor()
 
     # 统计数据
@@ -1168,23 +791,27 @@ def show_statistics():
         for exam in exams:
             print(f"  ID: {exam[0]}, {exam[1]} ({exam[2]}) - {exam[3]} - {exam[4]}")
 
-    conn.close()
-
 
 def main():
     """主函数"""
+    print("=" * 50)
+    print("   高中成绩管理系统 V2.0 - Excel导入工具")
+    print("=" * 50)
+    print()
+
     # 检查数据库
     if not os.path.exists(DB_PATH):
         print(f"⚠️  数据库文件不存在: {DB_PATH}")
         choice = input("是否创建新数据库? (y/n): ").strip().lower()
         if choice == 'y':
-            if not create_database():
+            print(f"\n📝 正在创建数据库...")
+            if migrate_database() is None:
                 return
+            print(f"✅ 数据库创建成功: {DB_PATH}")
         else:
             return
-    else:
-        # 更新数据库架构
-        update_database_schema()
+    elif migrate_database() is None:
+        return
 
     # 主菜单
     while True:
@@ -1197,9 +824,11 @@ def main():
         print("4. 更新学生信息")
         print("5. 查询成绩")
         print("6. 查看数据库统计")
-        print("7. 退出")
+        print("7. 批量导入文件夹成绩")
+        print("8. 按考试映射导入多场考试")
+        print("9. 退出")
         print("=" * 50)
-        choice = input("请输入选项 (1-7): ").strip()
+        choice = input("请输入选项 (1-9): ").strip()
 
         if choice == '1':
             import_students()
@@ -1214,6 +843,10 @@ def main():
         elif choice == '6':
             show_statistics()
         elif choice == '7':
+            import_folder_scores()
+        elif choice == '8':
+            import_exam_season()
+        elif choice == '9':
             print("\n👋 感谢使用,再见!")
             break
         else:
@@ -0,0 +1,389 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+批量导入成绩表（文件夹 / 多个sheet / 多场考试）
+用法: python folder_import.py 成绩文件夹 考试ID [-j 进程数] [--backend auto|fast|openpyxl] [--sheet-class]
+      python folder_import.py --exam-map 考试映射文件 [-j 进程数] [--sheet-class]
+
+- 导入工作簿中的每一个sheet；--sheet-class 时sheet名作为该sheet中没有班级信息的行的班级（与限时练导入相同）
+- 多个子进程并行解析各个sheet（表头检测、单元格转换为成绩/排名），只返回解析好的数据
+- 主进程使用唯一的数据库连接，按考试把解析结果写入暂存表后统一匹配学生并合并写入，
+  所有考试在同一事务中提交
+- 考试映射文件每行一条: 考试ID,文件或文件夹[,sheet名]（# 开头为注释），一次导入整个考试季
+- 全部sheet处理完后输出一份汇总报告
+"""
+
+import os
+import sys
+import csv
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from class_name_index import ClassNameIndex
+from db_connection import connect
+from import_log import ImportLog, VERBOSITY_LEVELS, DEFAULT_VERBOSITY
+from import_manifest import ImportManifest, file_hash
+from rank_derivation import derive_exam_ranks, TIE_MODES, DEFAULT_TIES
+from score_staging import ScoreStaging
+from score_trend import refresh_score_trends
+from class_subject_stats import refresh_class_subject_stats
+from xlsx_reader import open_workbook, BACKENDS, DEFAULT_BACKEND, WORKBOOK_EXTENSIONS
+from score_import_common import (
+    read_headers, detect_sheet_columns, parse_score_row, ensure_total_subject,
+)
+
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "StudentData.db")
+
+
+def list_score_files(folder):
+    """列出文件夹中的xlsx/csv/tsv文件（跳过Excel打开时产生的 ~$ 临时文件），按文件名排序"""
+    files = []
+    for name in sorted(os.listdir(folder)):
+        if name.startswith('~$') or not name.lower().endswith(WORKBOOK_EXTENSIONS):
+            continue
+        path = os.path.join(folder, name)
+        if os.path.isfile(path):
+            files.append(path)
+    return files
+
+
+def list_workbook_sheets(path, backend=DEFAULT_BACKEND):
+    """工作簿中所有sheet的名称"""
+    wb = open_workbook(path, backend)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+
+def parse_score_workbook(path, backend=DEFAULT_BACKEND, sheet_name=None):
+    """解析成绩表的一个sheet（在子进程中执行，不访问数据库）
+
+    sheet_name 为None时解析活动sheet
+    返回字典: path / sheet / headers / col_map / rows / error
+    rows 为 parse_score_row 的结果列表；解析失败时 error 为错误信息
+    """
+    result = {'path': path, 'sheet': sheet_name, 'headers': [], 'col_map': {}, 'rows': [], 'error': None}
+    try:
+        wb = open_workbook(path, backend)
+        try:
+            ws = wb[sheet_name] if sheet_name is not None else wb.active
+            result['sheet'] = ws.title
+            headers = read_headers(ws)
+            col_map = detect_sheet_columns(headers)
+            result['headers'] = headers
+            result['col_map'] = col_map
+            result['rows'] = [parse_score_row(row, col_map)
+                              for row in ws.iter_rows(min_row=2, values_only=True)]
+        finally:
+            wb.close()
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def stage_parsed_workbook(conn, parsed, exam_id, staging, source=None, sheet_class=None, digest=None):
+    """把一个sheet的解析结果写入暂存表，返回 (统计信息, 导入清单)
+
+    source: 报告和暂存表中的来源名称，默认为文件名
+    sheet_class: 没有班级信息的行使用的班级名（--sheet-class）
+    digest: 工作簿的文件哈希（同一工作簿的多个sheet只计算一次），为None时由导入清单计算
+    """
+    name = source or os.path.basename(parsed['path'])
+    stats = {'file': name, 'exam_id': exam_id, 'rows': 0, 'matched': 0, 'skipped': 0,
+             'inserted': 0, 'updated': 0, 'unchanged': 0, 'rejected': 0,
+             'error': parsed['error']}
+    if parsed['error']:
+        return stats, None
+
+    col_map = parsed['col_map']
+    if '学号' not in col_map and '姓名' not in col_map:
+        stats['error'] = "Excel中既没有学号列也没有姓名列"
+        stats['rows'] = stats['skipped'] = len(parsed['rows'])
+        return stats, None
+
+    manifest = ImportManifest(conn, exam_id, parsed['path'], parsed['sheet'], source=name, digest=digest)
+    for row_no, parsed_row in enumerate(parsed['rows'], start=1):
+        if sheet_class and not parsed_row[2]:
+            parsed_row = (parsed_row[0], parsed_row[1], sheet_class, parsed_row[3])
+        staging.add_row(manifest.source, row_no, col_map, parsed_row, manifest.manifest_id)
+    return stats, manifest
+
+
+def read_exam_map(map_path):
+    """读取考试映射文件，返回 [(考试ID, 文件或文件夹, sheet名或None)]
+
+    每行: 考试ID,文件或文件夹[,sheet名]；空行和 # 开头的行忽略；相对路径相对于映射文件所在目录
+    """
+    base_dir = os.path.dirname(os.path.abspath(map_path))
+    jobs = []
+    with open(map_path, encoding='utf-8-sig', newline='') as f:
+        for line_no, fields in enumerate(csv.reader(f), start=1):
+            fields = [field.strip() for field in fields]
+            if not fields or not fields[0] or fields[0].startswith('#'):
+                continue
+            if len(fields) < 2 or not fields[0].isdigit() or not fields[1]:
+                raise ValueError(f"考试映射文件第{line_no}行格式错误，应为: 考试ID,文件或文件夹[,sheet名]")
+            path = fields[1] if os.path.isabs(fields[1]) else os.path.join(base_dir, fields[1])
+            sheet_name = fields[2] if len(fields) > 2 and fields[2] else None
+            jobs.append((int(fields[0]), path, sheet_name))
+    return jobs
+
+
+def expand_score_jobs(jobs, backend=DEFAULT_BACKEND):
+    """把 (考试ID, 文件或文件夹, sheet名或None) 展开为逐个sheet的任务
+
+    返回 (任务列表 [(考试ID, 文件, sheet名, 来源名称)], 错误列表)
+    文件夹展开为其中所有xlsx文件；未指定sheet时导入工作簿的所有sheet，
+    工作簿有多个sheet时来源名称为 "文件名 [sheet名]"（不同文件夹中的同名文件加上文件夹名区分）；
+    同一考试中重复出现的sheet只导入一次
+    """
+    tasks = []
+    errors = []
+    seen = set()
+    sources = set()
+
+    def add_task(exam_id, file_path, sheet_name, source):
+        key = (exam_id, os.path.abspath(file_path), sheet_name)
+        if key in seen:
+            return
+        seen.add(key)
+        if (exam_id, source) in sources:
+            folder_name = os.path.basename(os.path.dirname(os.path.abspath(file_path)))
+            source = f"{folder_name}/{source}"
+        unique_source, n = source, 1
+        while (exam_id, unique_source) in sources:
+            n += 1
+            unique_source = f"{source} ({n})"
+        sources.add((exam_id, unique_source))
+        tasks.append((exam_id, file_path, sheet_name, unique_source))
+
+    for exam_id, path, sheet_name in jobs:
+        if os.path.isdir(path):
+            files = list_score_files(path)
+            if not files:
+                errors.append(f"文件夹中没有xlsx文件: {path}")
+        elif os.path.isfile(path):
+            files = [path]
+        else:
+            errors.append(f"文件不存在: {path}")
+            continue
+
+        for file_path in files:
+            name = os.path.basename(file_path)
+            if sheet_name is not None:
+                add_task(exam_id, file_path, sheet_name, f"{name} [{sheet_name}]")
+                continue
+            try:
+                sheets = list_workbook_sheets(file_path, backend)
+            except Exception as e:
+                errors.append(f"无法打开 {name}: {e}")
+                continue
+            for sheet in sheets:
+                add_task(exam_id, file_path, sheet, name if len(sheets) == 1 else f"{name} [{sheet}]")
+    return tasks, errors
+
+
+def import_score_folder(folder, exam_id, workers=None, backend=DEFAULT_BACKEND, db_path=DB_PATH, conn=None,
+                        sheet_as_class=False, rank_ties=DEFAULT_TIES, log=None):
+    """导入文件夹中所有成绩表（每个工作簿的所有sheet）到同一场考试
+
+    workers: 解析进程数，默认为CPU核数；为1或只有一个sheet时在当前进程解析
+    conn: 已打开的数据库连接（批处理时复用，不会被关闭）；为None时打开 db_path
+    返回 (成功条数, 失败条数)
+    """
+    if not os.path.isdir(folder):
+        print(f"❌ 文件夹不存在: {folder}")
+        return 0, 0
+
+    if not list_score_files(folder):
+        print(f"❌ 文件夹中没有xlsx文件: {folder}")
+        return 0, 0
+
+    return import_score_jobs([(exam_id, folder, None)], workers, backend, db_path, conn, sheet_as_class, rank_ties,
+                             log)
+
+
+def import_score_jobs(jobs, workers=None, backend=DEFAULT_BACKEND, db_path=DB_PATH, conn=None,
+                      sheet_as_class=False, rank_ties=DEFAULT_TIES, log=None):
+    """按 (考试ID, 文件或文件夹, sheet名或None) 列表导入成绩，可以一次导入多场考试
+
+    所有sheet并行解析；主进程按考试依次写入暂存表并合并，全部考试在同一事务中提交
+    合并后为缺少排名的科目/班级按分数计算排名（rank_ties: 并列方式，见 rank_derivation）
+    log: 导入日志（ImportLog），跳过和未通过校验的行在汇总报告中按详细程度输出
+    返回 (成功条数, 失败条数)
+    """
+    tasks, job_errors = expand_score_jobs(jobs, backend)
+    for message in job_errors:
+        print(f"❌ {message}")
+    if not tasks:
+        print("❌ 没有可导入的成绩表")
+        return 0, 0
+
+    own_conn = conn is None
+    if own_conn:
+        conn = connect(db_path)
+    try:
+        cursor = conn.cursor()
+        exam_ids = list(dict.fromkeys(task[0] for task in tasks))
+        for exam_id in exam_ids:
+            cursor.execute("SELECT * FROM Exams WHERE ExamId = ?", (exam_id,))
+            if not cursor.fetchone():
+                print(f"❌ 考试不存在,请先创建考试! (考试ID: {exam_id})")
+                return 0, 0
+
+        ensure_total_subject(conn)
+        classes = ClassNameIndex(conn) if sheet_as_class else None
+
+        workers = workers or os.cpu_count() or 1
+        workers = min(workers, len(tasks))
+        print(f"\n⏳ 正在导入 {len(tasks)} 个sheet，{len(exam_ids)} 场考试（解析进程数: {workers}）...")
+
+        # 同一考试的sheet排在一起（考试之间、考试内部保持原来的顺序），每场考试使用一次暂存表
+        tasks.sort(key=lambda task: exam_ids.index(task[0]))
+
+        # 解析在子进程中并行进行，结果按任务顺序逐个取出：每个sheet一解析完就写入暂存表，
+        # 不必等所有sheet解析完，也不在内存中同时保留所有sheet的解析结果
+        paths = [task[1] for task in tasks]
+        sheets = [task[2] for task in tasks]
+        if workers > 1:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            parsed_sheets = executor.map(parse_score_workbook, paths, [backend] * len(tasks), sheets)
+        else:
+            executor = None
+            parsed_sheets = map(parse_score_workbook, paths, [backend] * len(tasks), sheets)
+
+        report = []
+        digests = {}    # {文件: 文件哈希}，同一工作簿的多个sheet共用
+        log = log or ImportLog()
+        current_exam = staging = None   # 正在写入暂存表的考试
+        exam_report, manifests = [], []
+        try:
+            # 同一考试中同一学生出现在多个sheet时以后面的为准
+            for (exam_id, _, sheet_name, source), parsed in zip(tasks, parsed_sheets):
+                if exam_id != current_exam:
+                    if staging:
+                        merge_staged_exam(conn, current_exam, staging, exam_report, manifests, rank_ties, report, log)
+                    if len(exam_ids) > 1:
+                        print(f"\n📋 考试ID: {exam_id}")
+                    current_exam, staging, exam_report, manifests = exam_id, ScoreStaging(conn), [], []
+
+                sheet_class = classes.match(sheet_name.strip()) if classes and sheet_name else None
+                if not parsed['error'] and parsed['path'] not in digests:
+                    digests[parsed['path']] = file_hash(parsed['path'])
+                stats, manifest = stage_parsed_workbook(conn, parsed, exam_id, staging, source, sheet_class,
+                                                        digests.get(parsed['path']))
+                exam_report.append(stats)
+                if manifest:
+                    manifests.append(manifest)
+                print(f"  {'❌' if stats['error'] else '✅'} {stats['file']}")
+            merge_staged_exam(conn, current_exam, staging, exam_report, manifests, rank_ties, report, log)
+        finally:
+            if executor:
+                executor.shutdown()
+
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"\n❌ 导入失败（已回滚）: {e}")
+        import traceback
+        traceback.print_exc()
+        return 0, 0
+    finally:
+        if own_conn:
+            conn.close()
+
+    return print_report(report, log)
+
+
+def merge_staged_exam(conn, exam_id, staging, exam_report, manifests, rank_ties, report, log):
+    """合并一场考试暂存的所有sheet，保存导入清单、计算缺少的排名并刷新统计（不提交事务）
+
+    exam_report 中各sheet的统计信息补充合并结果后加入 report
+    """
+    staging.merge(exam_id)
+    for manifest in manifests:
+        manifest.save()
+    ranked = derive_exam_ranks(conn, exam_id, rank_ties)
+    refresh_score_trends(conn, [exam_id])
+    refresh_class_subject_stats(conn, [exam_id])
+    if ranked:
+        print(f"  🏅 按分数计算排名: {ranked} 条")
+
+    summary = staging.summary()
+    for stats in exam_report:
+        if not stats['error']:
+            stats.update(summary.get(stats['file'], {}))
+    report.extend(exam_report)
+    log.begin(f"考试{exam_id}")
+    staging.log_messages(log)
+
+
+def print_report(report, log):
+    """输出汇总报告（跳过和未通过校验的行按导入日志的详细程度输出），返回 (成功条数, 失败条数)"""
+    print(f"\n========================================")
+    print(f"批量导入结果:")
+    print(f"{'文件':<30} {'行数':>6} {'匹配':>6} {'跳过':>6} {'新增':>6} {'更新':>6} {'未变化':>6}")
+    for stats in report:
+        if stats['error']:
+            print(f"{stats['file']:<30} ❌ {stats['error']}")
+            continue
+        print(f"{stats['file']:<30} {stats['rows']:>6} {stats['matched']:>6} {stats['skipped']:>6} "
+              f"{stats['inserted']:>6} {stats['updated']:>6} {stats['unchanged']:>6}")
+
+    log.flush()
+
+    total = {key: sum(stats[key] for stats in report)
+             for key in ('rows', 'skipped', 'inserted', 'updated', 'unchanged', 'rejected')}
+    failed_files = sum(1 for stats in report if stats['error'])
+    success = total['inserted'] + total['updated'] + total['unchanged']
+    failed = total['skipped'] + total['rejected']
+    print(f"----------------------------------------")
+    print(f"  文件数: {len(report)}（失败 {failed_files}）")
+    print(f"  总行数: {total['rows']}")
+    print(f"  成功: {success}")
+    print(f"  失败: {failed}")
+    print(f"  新增: {total['inserted']}  更新: {total['updated']}  未变化: {total['unchanged']}")
+    print(f"========================================")
+    print(f"✅ 导入完成: 成功 {success} 条, 失败 {failed} 条")
+    return success, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量导入成绩表（文件夹 / 多个sheet / 多场考试）")
+    parser.add_argument('folder', nargs='?', help="成绩表所在文件夹")
+    parser.add_argument('exam_id', nargs='?', type=int, help="考试ID")
+    parser.add_argument('--exam-map', help="考试映射文件（每行: 考试ID,文件或文件夹[,sheet名]）")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="解析进程数（默认CPU核数）")
+    parser.add_argument('--backend', choices=BACKENDS, default=DEFAULT_BACKEND, help="Excel读取后端")
+    parser.add_argument('--sheet-class', action='store_true', help="sheet名作为没有班级信息的行的班级")
+    parser.add_argument('--ties', choices=TIE_MODES, default=DEFAULT_TIES,
+                        help="缺少排名时按分数计算排名的并列方式: rank 1,1,3 / dense 1,1,2 / row 1,2,3")
+    parser.add_argument('--log-level', choices=VERBOSITY_LEVELS, default=DEFAULT_VERBOSITY,
+                        help="控制台输出的详细程度: quiet 只输出汇总 / normal / verbose 输出所有记录")
+    parser.add_argument('--log-file', help="导入日志明细文件（.json 或 .csv）")
+    parser.add_argument('--db', default=DB_PATH, help="数据库文件路径")
+    args = parser.parse_args()
+
+    log = ImportLog(args.log_level)
+
+    if args.exam_map:
+        try:
+            jobs = read_exam_map(args.exam_map)
+        except (OSError, ValueError) as e:
+            print(f"❌ {e}")
+            return 1
+        success, failed = import_score_jobs(jobs, args.workers, args.backend, args.db,
+                                            sheet_as_class=args.sheet_class, rank_ties=args.ties, log=log)
+    elif args.folder and args.exam_id is not None:
+        success, failed = import_score_folder(args.folder, args.exam_id, args.workers, args.backend, args.db,
+                                              sheet_as_class=args.sheet_class, rank_ties=args.ties, log=log)
+    else:
+        parser.error("请指定 成绩文件夹 考试ID，或使用 --exam-map")
+    if args.log_file:
+        log.write_detail(args.log_file)
+    return 0 if success or not failed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+导入日志
+导入过程中逐行产生的提示（跳过、更新、冲突、校验失败等）先作为结构化记录收集在内存中，
+处理完一个文件后按详细程度过滤，一次性写到控制台；全部处理完后可以写出汇总和 JSON/CSV 明细文件。
+Windows 控制台逐行输出很慢，大批量导入时使用 quiet 级别可以只输出汇总。
+
+用法:
+    log = ImportLog(verbosity='normal')
+    log.begin('107班成绩.xlsx')
+    log.add('skip', "⚠️  第3行: 学号 '2024001' 不存在,跳过", row=3)
+    log.flush()                     # 输出本文件的记录
+    ...
+    log.write_detail('导入日志.json')
+    log.print_summary()
+"""
+
+import os
+import sys
+import csv
+import json
+from datetime import datetime
+
+# 详细程度: 记录的级别不高于当前详细程度时输出到控制台
+QUIET = 0       # 只输出汇总
+NORMAL = 1      # 输出变化和问题（新增、更新、跳过、校验失败）
+VERBOSE = 2     # 输出所有记录（包括信息无变化、缺考等）
+VERBOSITY_LEVELS = {'quiet': QUIET, 'normal': NORMAL, 'verbose': VERBOSE}
+DEFAULT_VERBOSITY = 'normal'
+
+# CSV 明细文件的固定列，记录中的其他字段以 JSON 写在 data 列
+DETAIL_COLUMNS = ['time', 'context', 'kind', 'source', 'row', 'message', 'data']
+
+
+class ImportLog:
+    """导入日志
+
+    - add 只记录，不输出；flush 把尚未输出的记录一次写到控制台
+    - 每条记录: time / context（begin 设置的当前文件或命令）/ kind（记录类型）/
+      source / row / message（控制台文字）/ 其他字段
+    """
+
+    def __init__(self, verbosity=DEFAULT_VERBOSITY, stream=None):
+        if verbosity not in VERBOSITY_LEVELS:
+            raise ValueError(f"无效的日志详细程度: {verbosity}（可选: {', '.join(VERBOSITY_LEVELS)}）")
+        self.verbosity = VERBOSITY_LEVELS[verbosity]
+        self.stream = stream or sys.stdout
+        self.context = None
+        self.records = []
+        self._levels = []       # 每条记录的级别，与 records 一一对应
+        self._flushed = 0
+
+    def begin(self, context):
+        """设置之后记录所属的文件或命令"""
+        self.context = context
+
+    def add(self, kind, message, level=NORMAL, source=None, row=None, **fields):
+        """记录一条信息（不输出）"""
+        record = {'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'context': self.context,
+                  'kind': kind, 'source': source, 'row': row, 'message': message}
+        record.update(fields)
+        self.records.append(record)
+        self._levels.append(level)
+
+    def flush(self):
+        """把尚未输出的记录按详细程度过滤后一次写到控制台"""
+        lines = [record['message'] for record, level in zip(self.records[self._flushed:], self._levels[self._flushed:])
+                 if level <= self.verbosity and record['message']]
+        self._flushed = len(self.records)
+        if lines:
+            self.stream.write('\n'.join(lines) + '\n')
+            self.stream.flush()
+
+    def counts(self):
+        """各类型记录的条数"""
+        counts = {}
+        for record in self.records:
+            counts[record['kind']] = counts.get(record['kind'], 0) + 1
+        return counts
+
+    def print_summary(self):
+        """输出记录汇总"""
+        counts = self.counts()
+        if not counts:
+            return
+        print(f"\n📝 导入日志: 共 {len(self.records)} 条记录")
+        for kind, count in sorted(counts.items(), key=lambda item: -item[1]):
+            print(f"  {kind}: {count}")
+
+    def write_detail(self, path):
+        """写出明细文件：扩展名为 .csv 时写CSV（Excel可直接打开），否则写JSON"""
+        if os.path.splitext(path)[1].lower() == '.csv':
+            with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=DETAIL_COLUMNS)
+                writer.writeheader()
+                for record in self.records:
+                    row = {key: record.get(key) for key in DETAIL_COLUMNS[:-1]}
+                    extra = {key: value for key, value in record.items() if key not in row}
+                    row['data'] = json.dumps(extra, ensure_ascii=False, default=str) if extra else ''
+                    writer.writerow(row)
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'summary': self.counts(), 'records': self.records}, f,
+                          ensure_ascii=False, indent=1, default=str)
+        print(f"📝 导入日志明细已写入: {path}")
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+成绩导入清单
+记录每次导入的工作簿、sheet 和每一行成绩的哈希值。
+重复导入同一工作簿时，哈希未变化的行直接跳过；
+变化的行与数据库现有成绩逐科比较，只写入新增或确实改变的成绩（比较和写入见 score_staging）。
+清单表 ImportManifest / ImportRowManifest 由迁移脚本 migrations/0003_import_bookkeeping.sql 创建。
+"""
+
+import os
+import hashlib
+
+def file_hash(path):
+    """计算文件内容的SHA1"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def row_hash(scores):
+    """计算一行成绩的哈希（scores 为 parse_score_row 返回的成绩列表）"""
+    return hashlib.sha1(repr(scores).encode('utf-8')).hexdigest()
+
+
+class ImportManifest:
+    """一个sheet的导入清单
+
+    用法（配合 score_staging.ScoreStaging）：
+        manifest = ImportManifest(conn, exam_id, file_path, ws.title)
+        staging.add_row(manifest.source, row_no, col_map, parsed_row, manifest.manifest_id)
+        ...
+        staging.merge(exam_id)
+        manifest.save()
+        conn.commit()
+
+    - 行哈希与上次导入相同：整行跳过，计入"未变化"
+    - 行哈希不同或首次导入：逐科与数据库现有成绩比较，分别计入"新增"/"更新"/"未变化"
+    - save 从暂存表读取本次导入的行哈希，不提交事务，由调用方统一 commit
+    - 分块导入时每块合并后、清空暂存表前调用 save(done=False)，行哈希与该块数据一起提交，
+      sheet处理完后调用 save()；汇总哈希和行数按清单中全部行计算
+    - resumed: 从断点继续导入该sheet（之前的块已在上次导入中提交），保留清单中已有的行哈希；
+      否则 save() 时删除本次导入中没有出现的学生的行哈希
+    - source: 暂存表中的来源名称，默认为文件名
+    - digest: 调用方已计算的文件哈希（同一工作簿的多个sheet只计算一次），为None时读取文件计算
+    """
+
+    def __init__(self, conn, exam_id, file_path, sheet_name, source=None, resumed=False, digest=None):
+        self.conn = conn
+        self.exam_id = exam_id
+        self.file_name = os.path.basename(file_path)
+        self.sheet_name = sheet_name
+        self.file_hash = digest or file_hash(file_path)
+        # 暂存表中本sheet数据的来源标识（同一工作簿导入多个sheet时由调用方区分）
+        self.source = source or self.file_name
+        self.resumed = resumed
+        # 已收集、尚未保存的行哈希 {StudentId: RowHash}
+        self.row_hashes = {}
+        # 本次导入已保存行哈希的学生
+        self.saved = set()
+
+        cursor = conn.cursor()
+
+        # 上次导入的清单
+        cursor.execute("""
+            SELECT ManifestId, FileHash FROM ImportManifest
+            WHERE ExamId = ? AND FileName = ? AND SheetName = ?
+        """, (exam_id, self.file_name, sheet_name))
+        previous = cursor.fetchone()
+        self.manifest_id = previous[0] if previous else None
+        self.file_unchanged = bool(previous) and previous[1] == self.file_hash
+
+    def collect(self):
+        """从暂存表收集本sheet已合并的行哈希；有成绩未通过校验的行不记录，下次导入时会重新处理"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT StudentId, RowHash FROM StagingScores r
+            WHERE Source = ? AND Status IN ('matched', 'unchanged')
+              AND NOT EXISTS (SELECT 1 FROM StagingScoreItems i
+                              WHERE i.StagingId = r.StagingId AND i.Action = 'rejected')
+            ORDER BY StagingId
+        """, (self.source,))
+        # 同一学生出现多次时以后面的行为准
+        self.row_hashes.update(cursor.fetchall())
+
+    def save(self, done=True):
+        """保存本次导入的清单（包括之前 collect 收集的行哈希）
+
+        done: sheet已全部处理；为False时只保存到目前为止的行哈希（分块提交）
+        """
+        self.collect()
+        cursor = self.conn.cursor()
+
+        cursor.execute("""
+            INSERT INTO ImportManifest (ExamId, FileName, SheetName, FileHash, SheetHash)
+            VALUES (?, ?, ?, ?, '')
+            ON CONFLICT(ExamId, FileName, SheetName) DO UPDATE SET
+                FileHash = excluded.FileHash,
+                ImportedAt = datetime('now', 'localtime')
+        """, (self.exam_id, self.file_name, self.sheet_name, self.file_hash))
+
+        cursor.execute("""
+            SELECT ManifestId FROM ImportManifest
+            WHERE ExamId = ? AND FileName = ? AND SheetName = ?
+        """, (self.exam_id, self.file_name, self.sheet_name))
+        self.manifest_id = cursor.fetchone()[0]
+
+        # 同一学生的行哈希以本次导入为准
+        cursor.executemany("""
+            INSERT INTO ImportRowManifest (ManifestId, StudentId, RowHash) VALUES (?, ?, ?)
+            ON CONFLICT(ManifestId, StudentId) DO UPDATE SET RowHash = excluded.RowHash
+        """, [(self.manifest_id, student_id, digest) for student_id, digest in self.row_hashes.items()])
+        self.saved.update(self.row_hashes)
+        self.row_hashes = {}
+
+        # 整个sheet在本次导入中处理完：已不在sheet中的学生的行哈希不再保留
+        if done and not self.resumed:
+            cursor.execute("SELECT StudentId FROM ImportRowManifest WHERE ManifestId = ?", (self.manifest_id,))
+            stale = [(self.manifest_id, student_id) for (student_id,) in cursor.fetchall()
+                     if student_id not in self.saved]
+            cursor.executemany("DELETE FROM ImportRowManifest WHERE ManifestId = ? AND StudentId = ?", stale)
+
+        # 汇总哈希和行数按整个sheet（包括断点之前已提交的行）计算
+        cursor.execute("""
+            SELECT RowHash FROM ImportRowManifest WHERE ManifestId = ? ORDER BY StudentId
+        """, (self.manifest_id,))
+        row_hashes = [digest for (digest,) in cursor.fetchall()]
+        sheet_hash = hashlib.sha1(''.join(row_hashes).encode('ascii')).hexdigest()
+        cursor.execute("""
+            UPDATE ImportManifest SET SheetHash = ?, RowCount = ? WHERE ManifestId = ?
+        """, (sheet_hash, len(row_hashes), self.manifest_id))
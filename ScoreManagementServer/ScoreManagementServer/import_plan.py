@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+导入变更计划（预演导入）
+预演时完整解析Excel并匹配学生（成绩在暂存表中与现有数据比较，学生信息在内存中的学生索引上模拟），
+得出完整的变更计划：新增、更新、无法导入的行，但不写入数据库。
+确认后由同一个计划对象在一个事务中写入，不需要重新解析Excel；放弃时丢弃计划（回滚）。
+
+用法:
+    plan = import_scores_file(conn, path, exam_id, dry_run=True)
+    if plan and plan.clean:         # 或由用户确认
+        plan.apply()
+    elif plan:
+        plan.discard()
+"""
+
+from bulk_load import bulk_load
+from bulk_writer import BulkWriter
+from import_log import ImportLog, VERBOSE
+from rank_derivation import derive_exam_ranks, DEFAULT_TIES
+from class_subject_stats import refresh_class_subject_stats, refresh_stats_for_students
+from score_trend import refresh_score_trends
+from student_index import StudentIndex
+
+
+def print_plan_header(title):
+    print(f"\n========================================")
+    print(f"🔍 变更计划（预演，尚未写入数据库）: {title}")
+
+
+class ScoreImportPlan:
+    """普通考试成绩的变更计划
+
+    暂存表中已完成学生匹配、成绩校验和与现有成绩的比较（ScoreStaging.plan），
+    apply 只执行合并写入、保存导入清单、计算缺少的排名、刷新成绩趋势和班级统计并提交
+    """
+
+    def __init__(self, conn, exam_id, staging, manifests, processed, rank_ties=DEFAULT_TIES,
+                 checkpoint=None, log=None, with_source=False):
+        self.conn = conn
+        self.exam_id = exam_id
+        self.staging = staging
+        self.manifests = manifests
+        self.processed = processed
+        self.rank_ties = rank_ties
+        self.checkpoint = checkpoint
+        self.log = log or ImportLog()
+        self.with_source = with_source
+
+        summary = staging.summary()
+        self.stats = {key: sum(summary.get(manifest.source, {}).get(key, 0) for manifest in manifests)
+                      for key in ('skipped', 'inserted', 'updated', 'unchanged', 'rejected')}
+
+    @property
+    def success(self):
+        return self.stats['inserted'] + self.stats['updated'] + self.stats['unchanged']
+
+    @property
+    def failed(self):
+        return self.stats['skipped'] + self.stats['rejected']
+
+    @property
+    def clean(self):
+        """没有无法导入的行或成绩"""
+        return self.failed == 0
+
+    def print(self):
+        """输出变更计划：每条新增/更新（verbose 级别）、无法导入的行和成绩、汇总"""
+        for source, row_no, number, name, subject, action, old_score, new_score in self.staging.changes(self.exam_id):
+            prefix = f"{source} " if self.with_source else ""
+            if action == 'insert':
+                message = f"➕ {prefix}第{row_no}行 {name}({number}) {subject}: {new_score}"
+            else:
+                message = f"✏️  {prefix}第{row_no}行 {name}({number}) {subject}: {old_score} → {new_score}"
+            self.log.add(f"plan_{action}", message, VERBOSE, source=source, row=row_no, number=number,
+                         name=name, subject=subject, old=old_score, new=new_score)
+        self.staging.log_messages(self.log, self.with_source)
+        self.log.flush()
+
+        print_plan_header(f"考试ID {self.exam_id}")
+        print(f"  总行数: {self.processed}")
+        print(f"  将新增: {self.stats['inserted']}  将更新: {self.stats['updated']}  未变化: {self.stats['unchanged']}")
+        print(f"  无法导入: 跳过的行 {self.stats['skipped']}，未通过校验的成绩 {self.stats['rejected']}")
+        print(f"========================================")
+
+    def apply(self):
+        """在一个事务中写入计划并提交，返回 (成功, 失败) 条数；写入失败时回滚并返回 None"""
+        try:
+            self.staging.apply(self.exam_id)
+            for manifest in self.manifests:
+                manifest.save()
+            ranked = derive_exam_ranks(self.conn, self.exam_id, self.rank_ties)
+            refresh_score_trends(self.conn, [self.exam_id])
+            refresh_class_subject_stats(self.conn, [self.exam_id])
+            if self.checkpoint:
+                self.checkpoint.finish()
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            print(f"\n❌ 写入失败（已回滚）: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+        print(f"\n✅ 已按计划写入: 新增 {self.stats['inserted']} 条, 更新 {self.stats['updated']} 条"
+              f"{f', 按分数计算排名 {ranked} 条' if ranked else ''}")
+        return self.success, self.failed
+
+    def discard(self):
+        """放弃计划，不写入数据库"""
+        self.conn.rollback()
+        print("ℹ️  已放弃变更计划，数据库未修改")
+
+
+INSERT_STUDENT_SQL = """
+    INSERT INTO Students (StudentNumber, StudentName, ClassName)
+    VALUES (?, ?, ?)
+"""
+
+UPDATE_STUDENT_SQL = """
+    UPDATE Students SET
+        StudentName = ?,
+        ClassName = ?,
+        UpdatedAt = datetime('now', 'localtime')
+    WHERE StudentNumber = ?
+"""
+
+
+class StudentImportPlan:
+    """学生信息（按学号新增或更新）的变更计划
+
+    add_row 在内存中的学生索引上模拟逐行导入（同一学号出现多次时后面的行为准），缺少学号或姓名的行
+    在计划中拒绝；apply 批量写入：先插入新学生，再按学号更新姓名和班级，
+    写入失败的行单独回滚并计入失败条数，其余行照常写入
+    """
+
+    def __init__(self, conn, log=None):
+        self.conn = conn
+        self.log = log or ImportLog()
+        self.students = StudentIndex(conn)
+        self.inserts = []       # [(学号, 姓名, 班级)]
+        self.updates = []       # [(姓名, 班级, 学号)]
+        self.moved = []         # 班级改变的已有学生ID（重建其有成绩的考试的班级统计）
+        self.rejected = []      # [(学号, 姓名, 原因)]
+        self.errors = []        # 写入失败的行 [(学号, 异常信息)]
+        self._next_new_id = -1
+
+    def add_row(self, student_number, student_name, class_name):
+        """在计划中导入一行，无法导入时记入 rejected 并返回 False"""
+        if not student_number or not student_name:
+            self.reject(student_number, student_name, '学号或姓名为空')
+            return False
+
+        existing = self.students.find_by_number(student_number)
+        if existing:
+            if existing['StudentId'] > 0 and existing['ClassName'] != class_name:
+                self.moved.append(existing['StudentId'])
+            self.students.update(existing['StudentId'], StudentName=student_name, ClassName=class_name)
+            self.updates.append((student_name, class_name, student_number))
+            self.log.add('update', f"✅ 更新: {student_name} | 学号: {student_number} | 班级: {class_name or '未设置'}",
+                         VERBOSE, name=student_name, number=student_number, class_name=class_name)
+        else:
+            self.students.add(self._next_new_id, student_number, student_name, class_name)
+            self._next_new_id -= 1
+            self.inserts.append((student_number, student_name, class_name))
+            self.log.add('insert', f"➕ 新增: {student_name} | 学号: {student_number} | 班级: {class_name or '未设置'}",
+                         VERBOSE, name=student_name, number=student_number, class_name=class_name)
+        return True
+
+    def reject(self, student_number, student_name, reason):
+        self.rejected.append((student_number, student_name, reason))
+        self.log.add('rejected', f"❌ 学号 {student_number or '无'} {student_name or ''}: {reason}",
+                     name=student_name, number=student_number, reason=reason)
+
+    @property
+    def failed(self):
+        """计划中拒绝的行和写入失败的行"""
+        return len(self.rejected) + len(self.errors)
+
+    @property
+    def clean(self):
+        return not self.rejected
+
+    def print(self):
+        self.log.flush()
+        print_plan_header("学生信息")
+        print(f"  将新增: {len(self.inserts)}  将更新: {len(self.updates)}")
+        print(f"  无法导入: {len(self.rejected)}")
+        print(f"========================================")
+
+    def apply(self):
+        """在一个事务中写入计划并提交，返回 (新增, 更新, 失败) 条数；写入失败时回滚并返回 None"""
+        result = self.write()
+        if result is not None:
+            inserted, updated, failed = result
+            print(f"\n✅ 已按计划写入: 新增 {inserted} 条, 更新 {updated} 条, 失败 {failed} 条")
+        return result
+
+    def write(self):
+        """同 apply，但不输出结果（直接导入时由调用方输出）
+
+        每批用 executemany 写入，整批失败时逐行写入（见 bulk_writer），单独跳过写入失败的行
+        """
+        try:
+            inserts = BulkWriter(self.conn, INSERT_STUDENT_SQL)
+            for params in self.inserts:
+                inserts.add(params, params[0])
+            inserts.flush()
+            updates = BulkWriter(self.conn, UPDATE_STUDENT_SQL)
+            with bulk_load(self.conn):
+                for params in self.updates:
+                    updates.add(params, params[2])
+                updates.flush()
+            refresh_stats_for_students(self.conn, self.moved)
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            print(f"\n❌ 写入失败（已回滚）: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+        for writer in (inserts, updates):
+            for student_number, error in writer.errors:
+                self.errors.append((student_number, error))
+                print(f"❌ 学号 {student_number}: {error}")
+        return inserts.success, updates.success, self.failed
+
+    def discard(self):
+        """放弃计划，不写入数据库"""
+        self.conn.rollback()
+        print("ℹ️  已放弃变更计划，数据库未修改")
+
+
+class TimeLimitImportPlan:
+    """限时练成绩的变更计划
+
+    每个sheet已在暂存表中完成学生匹配（TimeLimitStaging.plan），apply 合并写入所有sheet、
+    计算缺少的排名并提交；预演时新建的限时练考试也在同一事务中提交
+    """
+
+    def __init__(self, conn, staging, exam_id, subject_id, sources, success, failed, problems,
+                 rank_ties=DEFAULT_TIES, own_conn=False):
+        self.conn = conn
+        self.staging = staging
+        self.exam_id = exam_id
+        self.subject_id = subject_id
+        self.sources = sources
+        self.success = success
+        self.failed = failed
+        self.problems = problems    # 除缺考和空行外被拒绝的行数
+        self.rank_ties = rank_ties
+        self.own_conn = own_conn    # 连接由导入函数打开时，写入或放弃后关闭
+
+    @property
+    def clean(self):
+        """除缺考和空行外没有被拒绝的行"""
+        return self.problems == 0
+
+    def print(self):
+        print_plan_header(f"限时练考试ID {self.exam_id}")
+        print(f"  sheet数: {len(self.sources)}")
+        print(f"  可导入: {self.success}  失败: {self.failed}（其中缺考和空行以外的问题 {self.problems} 条）")
+        print(f"========================================")
+
+    def _close(self):
+        if self.own_conn:
+            self.conn.close()
+
+    def apply(self):
+        """在一个事务中写入计划并提交，返回 (成功条数, 失败条数)；写入失败时回滚并返回 None"""
+        try:
+            for source in self.sources:
+                self.staging.apply(source, self.exam_id, self.subject_id)
+            ranked = derive_exam_ranks(self.conn, self.exam_id, self.rank_ties, kind='time_limit')
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            print(f"\n❌ 写入失败（已回滚）: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+        finally:
+            self._close()
+
+        print(f"\n✅ 已按计划写入: 成功 {self.success} 条, 失败 {self.failed} 条"
+              f"{f', 按分数计算排名 {ranked} 条' if ranked else ''}")
+        return self.success, self.failed
+
+    def discard(self):
+        """放弃计划，不写入数据库"""
+        self.conn.rollback()
+        self._close()
+        print("ℹ️  已放弃变更计划，数据库未修改")
+
+
+def confirm_plan(plan):
+    """询问是否按已输出的计划写入数据库；确认时写入并返回 apply 的结果，否则放弃计划并返回 None"""
+    if not plan.clean:
+        print("⚠️  计划中有无法导入的数据，写入时将跳过这些数据")
+    answer = input("\n确认按计划写入数据库？(y/N): ").strip().lower()
+    if answer == 'y':
+        return plan.apply()
+    plan.discard()
+    return None
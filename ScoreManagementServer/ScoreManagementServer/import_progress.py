@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+导入断点
+大工作簿分块提交时，每提交一块就在 ImportProgress 表中记录断点（文件哈希、sheet、已提交的最后一行），
+断点与该块数据在同一事务中提交。导入中途失败（数据库被锁、单元格错误等）后重新导入同一个文件时，
+从断点之后继续，已提交的行和sheet不再处理；整个文件导入完成后删除断点。
+文件内容改变后哈希不同，会从头导入。
+ImportProgress 表由迁移脚本 migrations/0003_import_bookkeeping.sql 创建。
+"""
+
+import os
+
+from import_manifest import file_hash
+
+# 导入类型
+SCORES = 'scores'            # 普通考试成绩（import_scores）
+TIME_LIMIT = 'time_limit'    # 限时练成绩（import_time_limit_excel）
+
+# 普通考试成绩每多少行提交一次
+CHUNK_ROWS = 5000
+
+
+class ImportCheckpoint:
+    """一个文件的导入断点
+
+    用法:
+        checkpoint = ImportCheckpoint(conn, SCORES, exam_id, file_path)
+        start = checkpoint.last_row(sheet)          # 上次已提交的最后一行（Excel行号），0表示从头开始
+        ... 处理一块数据 ...
+        checkpoint.save(sheet, excel_row)           # 与数据一起提交
+        conn.commit()
+        checkpoint.save(sheet, excel_row, done=True)
+        checkpoint.finish()                         # 整个文件完成，删除断点
+        conn.commit()
+
+    save / finish 都不提交事务，断点与数据在同一事务中提交
+    """
+
+    def __init__(self, conn, kind, exam_id, file_path, digest=None):
+        self.conn = conn
+        self.kind = kind
+        self.exam_id = exam_id
+        self.file_name = os.path.basename(file_path)
+        self.file_hash = digest or file_hash(file_path)
+
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT SheetName, LastRow, Status FROM ImportProgress
+            WHERE Kind = ? AND ExamId = ? AND FileHash = ?
+        """, (kind, exam_id, self.file_hash))
+        # 上次中断时各sheet的进度: {sheet名: (最后一行, 状态)}
+        self.previous = {sheet: (last_row, status) for sheet, last_row, status in cursor.fetchall()}
+
+    @property
+    def resuming(self):
+        """是否有上次中断的导入可以继续"""
+        return bool(self.previous)
+
+    def last_row(self, sheet_name):
+        """上次已提交的最后一行（Excel行号），没有断点时为0"""
+        return self.previous.get(sheet_name, (0, None))[0]
+
+    def sheet_done(self, sheet_name):
+        """该sheet是否已在上次导入中全部提交"""
+        return self.previous.get(sheet_name, (0, None))[1] == 'done'
+
+    def save(self, sheet_name, last_row, done=False):
+        """记录已处理到的行（不提交事务）"""
+        self.conn.execute("""
+            INSERT INTO ImportProgress (Kind, ExamId, FileName, FileHash, SheetName, LastRow, Status)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(Kind, ExamId, FileHash, SheetName) DO UPDATE SET
+                FileName = excluded.FileName,
+                LastRow = excluded.LastRow,
+                Status = excluded.Status,
+                UpdatedAt = datetime('now', 'localtime')
+        """, (self.kind, self.exam_id, self.file_name, self.file_hash, sheet_name, last_row,
+              'done' if done else 'running'))
+
+    def finish(self):
+        """整个文件导入完成，删除断点（不提交事务）"""
+        self.conn.execute("""
+            DELETE FROM ImportProgress WHERE Kind = ? AND ExamId = ? AND FileHash = ?
+        """, (self.kind, self.exam_id, self.file_hash))
+        self.previous = {}
@@ -1,10 +1,13 @@
 -- 高中成绩管理系统数据库设计(简化解耦版)
 -- 设计原则: 高度解耦,以查询为主,支持成绩趋势分析
+--
+-- 迁移 1: 基础表结构(由 schema_migrations 通过 executescript 在一个事务中执行)
+-- 所有语句使用 IF NOT EXISTS / INSERT OR IGNORE, 对已有的旧数据库也可以执行
 
 -- ============================================
 -- 1. 学生表(核心表)
 -- ============================================
-CREATE TABLE Students (
+CREATE TABLE IF NOT EXISTS Students (
     StudentId INTEGER PRIMARY KEY AUTOINCREMENT,
     StudentNumber TEXT UNIQUE,               -- 学号(唯一标识，可为空，用于学号变更时废弃旧学号)
     StudentName TEXT NOT NULL,              -- 姓名
@@ -19,7 +22,7 @@ CREATE TABLE Students (
 -- ============================================
 -- 2. 考试表
 -- ============================================
-CREATE TABLE Exams (
+CREATE TABLE IF NOT EXISTS Exams (
     ExamId INTEGER PRIMARY KEY AUTOINCREMENT,
     ExamName TEXT NOT NULL,                 -- 考试名称
     ExamType TEXT NOT NULL CHECK(ExamType IN ('月考', '期中考', '期末考', '模拟考', '联考')),
@@ -29,13 +32,14 @@ CREATE TABLE Exams (
     AcademicYear TEXT,                      -- 学年(如: 2024-2025)
     IsPublished INTEGER DEFAULT 0,           -- 是否发布
     Description TEXT,                       -- 描述
-    CreatedAt TEXT DEFAULT (datetime('now', 'localtime'))
+    CreatedAt TEXT DEFAULT (datetime('now', 'localtime')),
+    IsTimeLimit INTEGER DEFAULT 0            -- 是否限时练(限时练现在使用单独的 TimeLimitExams 表)
 );
 
 -- ============================================
 -- 3. 科目表
 -- ============================================
-CREATE TABLE Subjects (
+CREATE TABLE IF NOT EXISTS Subjects (
     SubjectId INTEGER PRIMARY KEY AUTOINCREMENT,
     SubjectName TEXT NOT NULL UNIQUE,       -- 科目名称
     SubjectCode TEXT NOT NULL UNIQUE,       -- 科目代码
@@ -48,12 +52,12 @@ CREATE TABLE Subjects (
 -- ============================================
 -- 4. 成绩表(核心表)
 -- ============================================
-CREATE TABLE Scores (
+CREATE TABLE IF NOT EXISTS Scores (
     ScoreId INTEGER PRIMARY KEY AUTOINCREMENT,
     ExamId INTEGER NOT NULL,               -- 考试ID
     StudentId INTEGER NOT NULL,            -- 学生ID
     SubjectId INTEGER NOT NULL,            -- 科目ID (10表示总分)
-    Score REAL NOT NULL,                   -- 得分
+    Score REAL,                            -- 得分(缺考等没有成绩时为空)
     ClassRank INTEGER,                      -- 班级排名
     GradeRank INTEGER,                      -- 年级排名
     CreatedAt TEXT DEFAULT (datetime('now', 'localtime')),
@@ -69,22 +73,23 @@ CREATE TABLE Scores (
 -- ============================================
 
 -- 学生表索引
-CREATE INDEX idx_students_number ON Students(StudentNumber);
-CREATE INDEX idx_students_name ON Students(StudentName);
-CREATE INDEX idx_students_class ON Students(ClassName);
+CREATE INDEX IF NOT EXISTS idx_students_number ON Students(StudentNumber);
+CREATE INDEX IF NOT EXISTS idx_students_name ON Students(StudentName);
+CREATE INDEX IF NOT EXISTS idx_students_class ON Students(ClassName);
 
 -- 考试表索引
-CREATE INDEX idx_exams_date ON Exams(ExamDate DESC);
-CREATE INDEX idx_exams_grade ON Exams(GradeName);
-CREATE INDEX idx_exams_type ON Exams(ExamType);
+CREATE INDEX IF NOT EXISTS idx_exams_date ON Exams(ExamDate DESC);
+CREATE INDEX IF NOT EXISTS idx_exams_grade ON Exams(GradeName);
+CREATE INDEX IF NOT EXISTS idx_exams_type ON Exams(ExamType);
+CREATE INDEX IF NOT EXISTS idx_exams_istimelimit ON Exams(IsTimeLimit);
 
 -- 成绩表索引(重点优化)
-CREATE INDEX idx_scores_exam ON Scores(ExamId);
-CREATE INDEX idx_scores_student ON Scores(StudentId);
-CREATE INDEX idx_scores_subject ON Scores(SubjectId);
-CREATE INDEX idx_scores_score ON Scores(Score DESC);  -- 成绩降序
-CREATE INDEX idx_scores_exam_student ON Scores(ExamId, StudentId);  -- 考试+学生组合
-CREATE INDEX idx_scores_student_exam ON Scores(StudentId, ExamId);  -- 学生+考试组合(趋势分析)
+CREATE INDEX IF NOT EXISTS idx_scores_exam ON Scores(ExamId);
+CREATE INDEX IF NOT EXISTS idx_scores_student ON Scores(StudentId);
+CREATE INDEX IF NOT EXISTS idx_scores_subject ON Scores(SubjectId);
+CREATE INDEX IF NOT EXISTS idx_scores_score ON Scores(Score DESC);  -- 成绩降序
+CREATE INDEX IF NOT EXISTS idx_scores_exam_student ON Scores(ExamId, StudentId);  -- 考试+学生组合
+CREATE INDEX IF NOT EXISTS idx_scores_student_exam ON Scores(StudentId, ExamId);  -- 学生+考试组合(趋势分析)
 
 -- ============================================
 -- 视图创建(简化查询)
@@ -249,15 +254,15 @@ END;
 -- 初始化数据
 -- ============================================
 
--- 初始化科目
-INSERT INTO Subjects (SubjectName, SubjectCode, Category, MaxScore, SortOrder) VALUES
-('语文', 'CHI', '通用', 150, 1),
-('数学', 'MATH', '通用', 150, 2),
-('英语', 'ENG', '通用', 150, 3),
-('物理', 'PHY', '理科', 100, 4),
-('化学', 'CHE', '理科', 100, 5),
-('生物', 'BIO', '理科', 100, 6),
-('政治', 'POL', '文科', 100, 7),
-('历史', 'HIS', '文科', 100, 8),
-('地理', 'GEO', '文科', 100, 9),
-('总分', 'TOTAL', '总分', 0, 10);  -- SubjectId=10,总分作为特殊科目
+-- 初始化科目(已存在的科目不修改)
+INSERT OR IGNORE INTO Subjects (SubjectId, SubjectName, SubjectCode, Category, MaxScore, SortOrder) VALUES
+(1, '语文', 'CHI', '通用', 150, 1),
+(2, '数学', 'MATH', '通用', 150, 2),
+(3, '英语', 'ENG', '通用', 150, 3),
+(4, '物理', 'PHY', '理科', 100, 4),
+(5, '化学', 'CHE', '理科', 100, 5),
+(6, '生物', 'BIO', '理科', 100, 6),
+(7, '政治', 'POL', '文科', 100, 7),
+(8, '历史', 'HIS', '文科', 100, 8),
+(9, '地理', 'GEO', '文科', 100, 9),
+(10, '总分', 'TOTAL', NULL, 0, 10);  -- SubjectId=10,总分作为特殊科目(不属于任何类别)
@@ -0,0 +1,64 @@
+-- 迁移 2: 限时练表(原来只存在于 StudentData.db 中, 由限时练导入工具使用)
+
+-- ============================================
+-- 1. 限时练考试表
+-- ============================================
+CREATE TABLE IF NOT EXISTS TimeLimitExams (
+    ExamId INTEGER PRIMARY KEY AUTOINCREMENT,
+    ExamName TEXT NOT NULL,                 -- 考试名称(如: 物理限时练12.16)
+    ExamDate TEXT NOT NULL,                 -- 考试日期
+    SubjectName TEXT NOT NULL,              -- 科目名称
+    SubjectId INTEGER,                      -- 科目ID
+    GradeName TEXT NOT NULL,                -- 年级
+    Term TEXT CHECK(Term IN ('上学期', '下学期')), -- 学期
+    AcademicYear TEXT,                      -- 学年(如: 2024-2025)
+    Description TEXT,                       -- 描述
+    CreatedAt TEXT DEFAULT (datetime('now', 'localtime')),
+    UpdatedAt TEXT DEFAULT (datetime('now', 'localtime'))
+);
+
+-- ============================================
+-- 2. 限时练成绩表
+-- ============================================
+CREATE TABLE IF NOT EXISTS TimeLimitScores (
+    ScoreId INTEGER PRIMARY KEY AUTOINCREMENT,
+    TimeLimitExamId INTEGER NOT NULL,       -- 限时练考试ID
+    StudentId INTEGER NOT NULL,             -- 学生ID
+    SubjectId INTEGER NOT NULL,             -- 科目ID
+    Score REAL,                             -- 得分(缺考不保存)
+    ClassRank INTEGER,                      -- 班级排名
+    GradeRank INTEGER,                      -- 年级排名
+    CreatedAt TEXT DEFAULT (datetime('now', 'localtime')),
+    UpdatedAt TEXT DEFAULT (datetime('now', 'localtime')),
+    FOREIGN KEY (TimeLimitExamId) REFERENCES TimeLimitExams(ExamId),
+    FOREIGN KEY (StudentId) REFERENCES Students(StudentId),
+    FOREIGN KEY (SubjectId) REFERENCES Subjects(SubjectId),
+    UNIQUE(TimeLimitExamId, StudentId, SubjectId)
+);
+
+-- ============================================
+-- 3. 限时练导入记录表(监控文件夹自动导入时按文件内容哈希去重)
+-- ============================================
+CREATE TABLE IF NOT EXISTS TimeLimitImportLog (
+    LogId INTEGER PRIMARY KEY AUTOINCREMENT,
+    FileName TEXT NOT NULL,
+    FileHash TEXT NOT NULL UNIQUE,
+    FileSize INTEGER,
+    ExamName TEXT,
+    Status TEXT NOT NULL CHECK(Status IN ('success', 'failed', 'skipped')),
+    SuccessCount INTEGER DEFAULT 0,
+    FailCount INTEGER DEFAULT 0,
+    Message TEXT,
+    ImportedAt TEXT DEFAULT (datetime('now', 'localtime'))
+);
+
+-- ============================================
+-- 索引
+-- ============================================
+CREATE INDEX IF NOT EXISTS idx_timelimit_exams_date ON TimeLimitExams(ExamDate DESC);
+CREATE INDEX IF NOT EXISTS idx_timelimit_exams_subject ON TimeLimitExams(SubjectName);
+CREATE INDEX IF NOT EXISTS idx_timelimit_exams_grade ON TimeLimitExams(GradeName);
+CREATE INDEX IF NOT EXISTS idx_timelimit_scores_exam ON TimeLimitScores(TimeLimitExamId);
+CREATE INDEX IF NOT EXISTS idx_timelimit_scores_student ON TimeLimitScores(StudentId);
+CREATE INDEX IF NOT EXISTS idx_timelimit_scores_subject ON TimeLimitScores(SubjectId);
+CREATE INDEX IF NOT EXISTS idx_timelimit_scores_rank ON TimeLimitScores(GradeRank);
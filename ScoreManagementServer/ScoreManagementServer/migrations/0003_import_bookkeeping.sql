@@ -0,0 +1,57 @@
+-- 迁移 3: 导入记录表(原来由各导入模块在首次使用时创建)
+
+-- ============================================
+-- 1. 导入清单表(重复导入时跳过未变化的数据, 见 import_manifest)
+-- ============================================
+CREATE TABLE IF NOT EXISTS ImportManifest (
+    ManifestId INTEGER PRIMARY KEY AUTOINCREMENT,
+    ExamId INTEGER NOT NULL,               -- 考试ID
+    FileName TEXT NOT NULL,                -- 工作簿文件名
+    SheetName TEXT NOT NULL,               -- sheet名
+    FileHash TEXT NOT NULL,                -- 工作簿内容哈希
+    SheetHash TEXT NOT NULL,               -- sheet内全部行哈希的汇总哈希
+    RowCount INTEGER DEFAULT 0,            -- 匹配到学生的行数
+    ImportedAt TEXT DEFAULT (datetime('now', 'localtime')),
+    UNIQUE(ExamId, FileName, SheetName)
+);
+
+CREATE TABLE IF NOT EXISTS ImportRowManifest (
+    ManifestId INTEGER NOT NULL,           -- 所属导入清单
+    StudentId INTEGER NOT NULL,            -- 学生ID
+    RowHash TEXT NOT NULL,                 -- 该行成绩的哈希
+    PRIMARY KEY (ManifestId, StudentId),
+    FOREIGN KEY (ManifestId) REFERENCES ImportManifest(ManifestId) ON DELETE CASCADE
+);
+
+-- ============================================
+-- 2. 学号历史表(导入使用旧学号的历史成绩表时精确匹配学生, 见 student_number_history)
+-- ============================================
+CREATE TABLE IF NOT EXISTS StudentNumberHistory (
+    HistoryId INTEGER PRIMARY KEY AUTOINCREMENT,
+    StudentId INTEGER NOT NULL,            -- 学生ID
+    StudentNumber TEXT NOT NULL,           -- 停用的学号
+    EffectiveFrom TEXT,                    -- 开始使用日期(未知时为空)
+    EffectiveTo TEXT NOT NULL,             -- 停用日期
+    Reason TEXT,                           -- changed: 换了新学号 / invalidated: 学号被分配给其他学生
+    CreatedAt TEXT DEFAULT (datetime('now', 'localtime')),
+    FOREIGN KEY (StudentId) REFERENCES Students(StudentId)
+);
+
+CREATE INDEX IF NOT EXISTS idx_number_history_number ON StudentNumberHistory(StudentNumber, EffectiveTo);
+
+-- ============================================
+-- 3. 导入断点表(大工作簿分块提交, 中断后从断点继续, 见 import_progress)
+-- ============================================
+CREATE TABLE IF NOT EXISTS ImportProgress (
+    ProgressId INTEGER PRIMARY KEY AUTOINCREMENT,
+    Kind TEXT NOT NULL,                    -- scores / time_limit
+    ExamId INTEGER NOT NULL,               -- 考试ID或限时练考试ID
+    FileName TEXT NOT NULL,
+    FileHash TEXT NOT NULL,
+    SheetName TEXT NOT NULL,
+    LastRow INTEGER NOT NULL DEFAULT 0,    -- 已提交的最后一行(Excel行号)
+    Status TEXT NOT NULL DEFAULT 'running' CHECK(Status IN ('running', 'done')),
+    StartedAt TEXT DEFAULT (datetime('now', 'localtime')),
+    UpdatedAt TEXT DEFAULT (datetime('now', 'localtime')),
+    UNIQUE(Kind, ExamId, FileHash, SheetName)
+);
@@ -0,0 +1,93 @@
+-- 迁移 4: 学生成绩趋势表(物化 vw_StudentScoreTrend, 由 score_trend 在导入时按考试增量刷新)
+
+-- ============================================
+-- 1. 学生成绩趋势表
+-- ============================================
+-- 每条成绩一行, 记录同一学生同一科目按考试日期排在它前面的那次考试的成绩和排名;
+-- 同一天的考试按考试ID排序
+CREATE TABLE IF NOT EXISTS StudentScoreTrend (
+    StudentId INTEGER NOT NULL,            -- 学生ID
+    SubjectId INTEGER NOT NULL,            -- 科目ID
+    ExamId INTEGER NOT NULL,               -- 考试ID
+    ExamDate TEXT NOT NULL,                -- 考试日期(排序用, 与 Exams.ExamDate 相同)
+    Score REAL,                            -- 本次得分
+    ClassRank INTEGER,                     -- 本次班级排名
+    GradeRank INTEGER,                     -- 本次年级排名
+    PrevExamId INTEGER,                    -- 上次考试ID(第一次考试为空)
+    PrevScore REAL,                        -- 上次得分
+    PrevClassRank INTEGER,                 -- 上次班级排名
+    PrevGradeRank INTEGER,                 -- 上次年级排名
+    ScoreChange REAL,                      -- 分数变化(本次 - 上次, 上次没有得分时为空)
+    ClassRankChange INTEGER,               -- 班级排名变化(上次 - 本次, 正数表示进步)
+    GradeRankChange INTEGER,               -- 年级排名变化(上次 - 本次, 正数表示进步)
+    Trend TEXT CHECK(Trend IN ('进步', '退步', '持平')), -- 趋势(上次没有得分时为空)
+    FOREIGN KEY (StudentId) REFERENCES Students(StudentId),
+    FOREIGN KEY (SubjectId) REFERENCES Subjects(SubjectId),
+    FOREIGN KEY (ExamId) REFERENCES Exams(ExamId)
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_trend_student ON StudentScoreTrend(StudentId, SubjectId, ExamDate, ExamId);
+CREATE INDEX IF NOT EXISTS idx_trend_exam ON StudentScoreTrend(ExamId, SubjectId);
+
+-- 已有成绩的趋势(之后由导入增量维护)
+DELETE FROM StudentScoreTrend;
+INSERT INTO StudentScoreTrend (
+    StudentId, SubjectId, ExamId, ExamDate, Score, ClassRank, GradeRank,
+    PrevExamId, PrevScore, PrevClassRank, PrevGradeRank,
+    ScoreChange, ClassRankChange, GradeRankChange, Trend
+)
+SELECT
+    StudentId, SubjectId, ExamId, ExamDate, Score, ClassRank, GradeRank,
+    PrevExamId, PrevScore, PrevClassRank, PrevGradeRank,
+    CASE WHEN PrevScore IS NOT NULL THEN Score - PrevScore END,
+    CASE WHEN PrevScore IS NOT NULL THEN PrevClassRank - ClassRank END,
+    CASE WHEN PrevScore IS NOT NULL THEN PrevGradeRank - GradeRank END,
+    CASE
+        WHEN PrevScore IS NULL THEN NULL
+        WHEN Score > PrevScore THEN '进步'
+        WHEN Score < PrevScore THEN '退步'
+        ELSE '持平'
+    END
+FROM (
+    SELECT
+        s.StudentId, s.SubjectId, s.ExamId, e.ExamDate, s.Score, s.ClassRank, s.GradeRank,
+        LAG(s.ExamId) OVER w as PrevExamId,
+        LAG(s.Score) OVER w as PrevScore,
+        LAG(s.ClassRank) OVER w as PrevClassRank,
+        LAG(s.GradeRank) OVER w as PrevGradeRank
+    FROM Scores s
+    JOIN Exams e ON s.ExamId = e.ExamId
+    WINDOW w AS (PARTITION BY s.StudentId, s.SubjectId ORDER BY e.ExamDate, s.ExamId)
+);
+
+-- ============================================
+-- 2. 趋势视图改为读取趋势表(列与原视图相同)
+-- ============================================
+DROP VIEW IF EXISTS vw_StudentScoreTrend;
+CREATE VIEW IF NOT EXISTS vw_StudentScoreTrend AS
+SELECT
+    st.StudentId,
+    st.StudentNumber,
+    st.StudentName,
+    st.ClassName,
+    sb.SubjectName,
+    t.ExamId,
+    e.ExamName,
+    t.ExamDate,
+    e.ExamType,
+    t.Score,
+    t.ClassRank,
+    t.GradeRank,
+    ROW_NUMBER() OVER (PARTITION BY t.StudentId, t.SubjectId ORDER BY t.ExamDate, t.ExamId) as ExamSeq,
+    t.PrevScore,
+    t.PrevClassRank,
+    t.PrevGradeRank,
+    t.ScoreChange,
+    t.ClassRankChange,
+    t.GradeRankChange,
+    t.Trend
+FROM StudentScoreTrend t
+JOIN Students st ON t.StudentId = st.StudentId
+JOIN Exams e ON t.ExamId = e.ExamId
+JOIN Subjects sb ON t.SubjectId = sb.SubjectId
+ORDER BY st.StudentName, sb.SubjectName, t.ExamDate;
@@ -0,0 +1,84 @@
+-- 迁移 5: 考试-班级-科目统计表(预先汇总的成绩统计, 由 class_subject_stats 在导入后按考试重建)
+-- 标准差使用 schema_migrations 注册的 sqrt 函数(部分SQLite版本没有内置数学函数)
+
+-- ============================================
+-- 1. 考试-班级-科目统计表
+-- ============================================
+-- 每场考试每个班级每个科目一行; 班级为学生当前所在班级(学生调班后重建其有成绩的考试)
+CREATE TABLE IF NOT EXISTS ExamClassSubjectStats (
+    ExamId INTEGER NOT NULL,               -- 考试ID
+    ClassName TEXT,                        -- 班级名称(未设置班级的学生为空)
+    SubjectId INTEGER NOT NULL,            -- 科目ID
+    StudentCount INTEGER NOT NULL,         -- 成绩条数(含缺考等没有得分的记录)
+    ScoredCount INTEGER NOT NULL,          -- 有得分的人数
+    AvgScore REAL,                         -- 平均分
+    MaxScore REAL,                         -- 最高分
+    MinScore REAL,                         -- 最低分
+    StdDev REAL,                           -- 标准差(总体)
+    PassCount INTEGER,                     -- 及格人数(得分 >= 满分的60%, 科目没有满分时为空)
+    PassRate REAL,                         -- 及格率(及格人数 / 有得分的人数)
+    ExcellentCount INTEGER,                -- 优秀人数(得分 >= 满分的85%)
+    ExcellentRate REAL,                    -- 优秀率
+    GradeRankSum INTEGER NOT NULL,         -- 年级排名总和
+    GradeRankCount INTEGER NOT NULL,       -- 有年级排名的人数
+    UpdatedAt TEXT DEFAULT (datetime('now', 'localtime')),
+    FOREIGN KEY (ExamId) REFERENCES Exams(ExamId),
+    FOREIGN KEY (SubjectId) REFERENCES Subjects(SubjectId)
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_class_stats_exam ON ExamClassSubjectStats(ExamId, ClassName, SubjectId);
+CREATE INDEX IF NOT EXISTS idx_class_stats_class ON ExamClassSubjectStats(ClassName, SubjectId);
+
+-- 已有成绩的统计(之后由导入按考试重建)
+DELETE FROM ExamClassSubjectStats;
+INSERT INTO ExamClassSubjectStats (
+    ExamId, ClassName, SubjectId, StudentCount, ScoredCount, AvgScore, MaxScore, MinScore, StdDev,
+    PassCount, PassRate, ExcellentCount, ExcellentRate, GradeRankSum, GradeRankCount
+)
+SELECT
+    ExamId, ClassName, SubjectId, StudentCount, ScoredCount, AvgScore, MaxScore, MinScore, StdDev,
+    PassCount, 1.0 * PassCount / ScoredCount, ExcellentCount, 1.0 * ExcellentCount / ScoredCount,
+    GradeRankSum, GradeRankCount
+FROM (
+    SELECT
+        s.ExamId,
+        st.ClassName,
+        s.SubjectId,
+        COUNT(*) as StudentCount,
+        COUNT(s.Score) as ScoredCount,
+        AVG(s.Score) as AvgScore,
+        MAX(s.Score) as MaxScore,
+        MIN(s.Score) as MinScore,
+        sqrt(MAX(AVG(s.Score * s.Score) - AVG(s.Score) * AVG(s.Score), 0)) as StdDev,
+        CASE WHEN MAX(sb.MaxScore) > 0 THEN COUNT(CASE WHEN s.Score >= sb.MaxScore * 0.6 THEN 1 END) END as PassCount,
+        CASE WHEN MAX(sb.MaxScore) > 0 THEN COUNT(CASE WHEN s.Score >= sb.MaxScore * 0.85 THEN 1 END) END as ExcellentCount,
+        COALESCE(SUM(s.GradeRank), 0) as GradeRankSum,
+        COUNT(s.GradeRank) as GradeRankCount
+    FROM Scores s
+    JOIN Students st ON s.StudentId = st.StudentId
+    JOIN Subjects sb ON s.SubjectId = sb.SubjectId
+    GROUP BY s.ExamId, st.ClassName, s.SubjectId
+);
+
+-- ============================================
+-- 2. 科目平均分统计视图改为读取统计表(列与原视图相同)
+-- ============================================
+DROP VIEW IF EXISTS vw_SubjectStats;
+CREATE VIEW IF NOT EXISTS vw_SubjectStats AS
+SELECT
+    e.ExamId,
+    e.ExamName,
+    e.ExamDate,
+    sb.SubjectName,
+    c.ClassName,
+    c.StudentCount,
+    c.AvgScore,
+    c.MaxScore,
+    c.MinScore,
+    ROUND(c.AvgScore, 2) as AvgScoreRounded,
+    ROUND(c.MaxScore, 2) as MaxScoreRounded,
+    ROUND(c.MinScore, 2) as MinScoreRounded
+FROM ExamClassSubjectStats c
+JOIN Exams e ON c.ExamId = e.ExamId
+JOIN Subjects sb ON c.SubjectId = sb.SubjectId
+ORDER BY e.ExamDate DESC, sb.SubjectName;
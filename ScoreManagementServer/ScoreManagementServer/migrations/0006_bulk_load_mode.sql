@@ -0,0 +1,30 @@
+-- 迁移 6: 批量写入模式(导入语句自己写 UpdatedAt, 不再由触发器对每行再执行一次 UPDATE)
+
+-- ============================================
+-- 1. 批量写入模式标记表
+-- ============================================
+-- 有一行时处于批量写入模式; 由 bulk_load.bulk_load 在导入的事务中写入并在同一事务中删除,
+-- 其他连接不会看到这一行, 事务回滚时标记随之撤销
+CREATE TABLE IF NOT EXISTS BulkLoadMode (
+    Active INTEGER PRIMARY KEY CHECK (Active = 1)
+);
+
+-- ============================================
+-- 2. 时间戳触发器在批量写入模式下不执行
+-- ============================================
+-- 单条修改(手工编辑等)仍由触发器自动更新时间戳
+DROP TRIGGER IF EXISTS trg_students_update;
+CREATE TRIGGER IF NOT EXISTS trg_students_update
+AFTER UPDATE ON Students
+WHEN NOT EXISTS (SELECT 1 FROM BulkLoadMode)
+BEGIN
+    UPDATE Students SET UpdatedAt = datetime('now', 'localtime') WHERE StudentId = NEW.StudentId;
+END;
+
+DROP TRIGGER IF EXISTS trg_scores_update;
+CREATE TRIGGER IF NOT EXISTS trg_scores_update
+AFTER UPDATE ON Scores
+WHEN NOT EXISTS (SELECT 1 FROM BulkLoadMode)
+BEGIN
+    UPDATE Scores SET UpdatedAt = datetime('now', 'localtime') WHERE ScoreId = NEW.ScoreId;
+END;
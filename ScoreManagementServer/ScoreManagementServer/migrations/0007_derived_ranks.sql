@@ -0,0 +1,15 @@
+-- 迁移 7: 记录排名是否由导入后计算得出(rank_derivation)
+-- 计算出的排名在之后每次计算时重新计算(如同一考试又导入了其他班级的成绩);
+-- 成绩表中提供的排名(标记为0)保留不变
+
+-- ============================================
+-- 1. 普通考试成绩
+-- ============================================
+ALTER TABLE Scores ADD COLUMN ClassRankDerived INTEGER NOT NULL DEFAULT 0;  -- 1: 班级排名为计算得出
+ALTER TABLE Scores ADD COLUMN GradeRankDerived INTEGER NOT NULL DEFAULT 0;  -- 1: 年级排名为计算得出
+
+-- ============================================
+-- 2. 限时练成绩
+-- ============================================
+ALTER TABLE TimeLimitScores ADD COLUMN ClassRankDerived INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE TimeLimitScores ADD COLUMN GradeRankDerived INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+排名计算
+成绩表中没有班级排名/年级排名列时，导入后按分数计算排名，填入 ClassRank / GradeRank。
+每场考试只执行一条 UPDATE 语句，用窗口函数按科目（班级排名再按班级）分组排序。
+
+- 默认只计算缺少的排名：按该科目全年级（班级排名按该班该科目）的分数排序计算，
+  写入排名为空的成绩；成绩表中提供的排名（包括之前导入的其他班级的成绩表）保留不变
+- 计算出的排名标记为 ClassRankDerived / GradeRankDerived = 1，之后每次计算时重新计算：
+  同一考试分几个没有排名列的文件导入时，先导入的班级的年级排名随后面导入的班级更新
+- overwrite=True 时重新计算所有排名（包括成绩表中提供的排名）
+- 分数为空或学生没有班级的成绩不计算对应的排名
+
+需要 SQLite 3.33 及以上版本（窗口函数和 UPDATE ... FROM）
+"""
+
+from bulk_load import bulk_load
+
+# 并列分数的排名方式: {名称: (窗口函数, 排序)}
+TIE_MODES = {
+    'rank': ('RANK()', 'sc.Score DESC'),                        # 并列占用名次: 1, 1, 3
+    'dense': ('DENSE_RANK()', 'sc.Score DESC'),                 # 并列不占用名次: 1, 1, 2
+    'row': ('ROW_NUMBER()', 'sc.Score DESC, sc.StudentId'),     # 不并列，同分按学生ID排序: 1, 2, 3
+}
+DEFAULT_TIES = 'rank'
+
+# 可以计算排名的成绩表: {名称: (表名, 考试ID列)}
+RANK_TABLES = {
+    'exam': ('Scores', 'ExamId'),
+    'time_limit': ('TimeLimitScores', 'TimeLimitExamId'),
+}
+
+
+def derive_ranks_sql(table, exam_column, ties=DEFAULT_TIES):
+    """计算一场考试排名的 UPDATE 语句（参数: :exam_id, :overwrite）"""
+    rank_func, order_by = TIE_MODES[ties]
+    return f"""
+        UPDATE {table} SET
+            ClassRank = r.ClassRank,
+            GradeRank = r.GradeRank,
+            ClassRankDerived = r.ClassRankDerived,
+            GradeRankDerived = r.GradeRankDerived,
+            UpdatedAt = datetime('now', 'localtime')
+        FROM (
+            SELECT ScoreId,
+                   CASE WHEN DeriveClassRank THEN NewClassRank ELSE OldClassRank END AS ClassRank,
+                   CASE WHEN DeriveClassRank THEN 1 ELSE ClassRankDerived END AS ClassRankDerived,
+                   CASE WHEN DeriveGradeRank THEN NewGradeRank ELSE OldGradeRank END AS GradeRank,
+                   CASE WHEN DeriveGradeRank THEN 1 ELSE GradeRankDerived END AS GradeRankDerived
+            FROM (
+                SELECT *,
+                       (:overwrite OR OldClassRank IS NULL OR ClassRankDerived) AND NewClassRank IS NOT NULL
+                           AS DeriveClassRank,
+                       :overwrite OR OldGradeRank IS NULL OR GradeRankDerived AS DeriveGradeRank
+                FROM (
+                    SELECT sc.ScoreId, sc.ClassRank AS OldClassRank, sc.GradeRank AS OldGradeRank,
+                           sc.ClassRankDerived, sc.GradeRankDerived,
+                           CASE WHEN st.ClassName IS NOT NULL THEN
+                               {rank_func} OVER (PARTITION BY sc.{exam_column}, sc.SubjectId, st.ClassName
+                                                 ORDER BY {order_by})
+                           END AS NewClassRank,
+                           {rank_func} OVER (PARTITION BY sc.{exam_column}, sc.SubjectId
+                                             ORDER BY {order_by}) AS NewGradeRank
+                    FROM {table} sc
+                    JOIN Students st ON st.StudentId = sc.StudentId
+                    WHERE sc.{exam_column} = :exam_id AND sc.Score IS NOT NULL
+                )
+            )
+        ) r
+        WHERE {table}.ScoreId = r.ScoreId
+          AND ({table}.ClassRank IS NOT r.ClassRank OR {table}.GradeRank IS NOT r.GradeRank
+               OR {table}.ClassRankDerived IS NOT r.ClassRankDerived
+               OR {table}.GradeRankDerived IS NOT r.GradeRankDerived)
+    """
+
+
+def derive_exam_ranks(conn, exam_id, ties=DEFAULT_TIES, overwrite=False, kind='exam'):
+    """计算一场考试的班级排名和年级排名（不提交事务）
+
+    ties: 并列分数的排名方式，见 TIE_MODES
+    overwrite: 为True时重新计算所有排名，否则只计算为空的排名和之前计算出的排名
+    kind: 'exam' 普通考试（Scores）/ 'time_limit' 限时练（TimeLimitScores）
+    返回排名被修改的成绩条数
+    """
+    if ties not in TIE_MODES:
+        raise ValueError(f"无效的并列排名方式: {ties}（可选: {', '.join(TIE_MODES)}）")
+    table, exam_column = RANK_TABLES[kind]
+    cursor = conn.cursor()
+    with bulk_load(conn):
+        cursor.execute(derive_ranks_sql(table, exam_column, ties), {'exam_id': exam_id, 'overwrite': int(overwrite)})
+    return cursor.rowcount
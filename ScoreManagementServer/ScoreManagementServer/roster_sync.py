@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+花名册同步
+把整张学生花名册与 Students 表在内存中比较，得出新增学生、学号变更、学号冲突时废弃旧学号、
+班级变更几类变化，再用少量批量语句一次写入，并输出结构化的变更报告。
+逐行的匹配规则与原 update_students_info 完全一致（按姓名查找学生，班级名自动匹配标准班级名）。
+"""
+
+from bulk_load import bulk_load
+from bulk_writer import BulkWriter
+from class_name_index import ClassNameIndex
+from class_subject_stats import refresh_stats_for_students
+from import_log import NORMAL, VERBOSE
+from student_index import StudentIndex
+from student_number_history import CHANGED, INVALIDATED, record_retired_numbers
+
+INSERT_STUDENT_SQL = """
+    INSERT INTO Students (StudentNumber, StudentName, ClassName)
+    VALUES (?, ?, ?)
+"""
+
+UPDATE_STUDENT_SQL = """
+    UPDATE Students SET
+        StudentNumber = ?,
+        ClassName = ?,
+        UpdatedAt = datetime('now', 'localtime')
+    WHERE StudentId = ?
+"""
+
+# 变更类型
+INSERT = 'insert'            # 新增学生
+NUMBER = 'number'            # 学号补充/变更
+CLASS = 'class'              # 班级补充/变更
+INVALIDATE = 'invalidate'    # 学号被其他学生使用，废弃旧学号
+UNCHANGED = 'unchanged'      # 信息无变化
+NO_NUMBER = 'no_number'      # 花名册中学号为空
+
+
+def detect_roster_columns(headers):
+    """花名册表头 → {'学号'/'姓名'/'班级'/'性别': 列序号}"""
+    col_map = {}
+    for idx, header in enumerate(headers):
+        if header:
+            if '学号' in header or '考号' in header:
+                col_map['学号'] = idx
+            elif '姓名' in header:
+                col_map['姓名'] = idx
+            elif '班级' in header:
+                col_map['班级'] = idx
+            elif '性别' in header:
+                col_map['性别'] = idx
+    return col_map
+
+
+class RosterChangeReport:
+    """花名册同步的变更报告
+
+    changes 按花名册行的处理顺序记录每一项变化，每项为字典:
+        {'type': 变更类型, 'name': 姓名, ...各类型自己的字段}
+    - insert:     number / class_name / input_class
+    - number:     old / new
+    - class:      old / new / input_class
+    - invalidate: number / student_id（被清空学号的学生）
+    - unchanged / no_number: 只有 name
+    errors 为写入失败的学生 [(姓名, 异常信息)]，计入 failed，不计入新增/更新
+    """
+
+    def __init__(self):
+        self.changes = []
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors = []
+
+    def add(self, change_type, name, **fields):
+        fields['type'] = change_type
+        fields['name'] = name
+        self.changes.append(fields)
+
+    def of_type(self, change_type):
+        return [c for c in self.changes if c['type'] == change_type]
+
+    def counts(self):
+        """各类变更的数量 + 新增/更新/跳过/失败 汇总"""
+        counts = {t: 0 for t in (INSERT, NUMBER, CLASS, INVALIDATE, UNCHANGED, NO_NUMBER)}
+        for change in self.changes:
+            counts[change['type']] += 1
+        counts.update(inserted=self.inserted, updated=self.updated, skipped=self.skipped, failed=self.failed)
+        return counts
+
+    def log_changes(self, log):
+        """按处理顺序把每一项变化记入导入日志（import_log.ImportLog）
+
+        信息无变化的行只在 verbose 级别输出到控制台
+        """
+        for change in self.changes:
+            fields = {key: value for key, value in change.items() if key not in ('type', 'name')}
+            log.add(change['type'], format_change(change), VERBOSE if change['type'] == UNCHANGED else NORMAL,
+                    name=change['name'], **fields)
+        for name, error in self.errors:
+            log.add('error', f"❌ 写入失败: {name} | {error}", NORMAL, name=name, error=error)
+
+    def print_summary(self):
+        print(f"\n✅ 处理完成:")
+        print(f"  新增学生: {self.inserted} 条")
+        print(f"  更新学生: {self.updated} 条")
+        print(f"  跳过: {self.skipped} 条")
+        print(f"  失败: {self.failed} 条")
+
+
+def format_change(change):
+    """一项变化对应的输出文字"""
+    name = change['name']
+    change_type = change['type']
+
+    if change_type == NO_NUMBER:
+        return f"⚠️  跳过: {name} | 学号为空"
+    if change_type == UNCHANGED:
+        return f"⏭️  跳过: {name} | 信息无变化"
+    if change_type == INVALIDATE:
+        return f"⚠️  废弃学号: {name} | 学号 {change['number']} 已被清空"
+    if change_type == NUMBER:
+        if not change['old'] or change['old'].strip() == "":
+            return f"✅ 补充: {name} | 学号: 空 → {change['new']}"
+        return f"✅ 更新: {name} | 学号: {change['old']} → {change['new']}"
+    if change_type == CLASS:
+        old, new, input_class = change['old'], change['new'], change['input_class']
+        if not old or old.strip() == "":
+            return f"✅ 补充: {name} | 班级: 空 → {new} (自动匹配: {input_class})"
+        if input_class and input_class != new:
+            return f"✅ 更新: {name} | 班级: {old or '空'} → {new} (自动匹配: {input_class})"
+        return f"✅ 更新: {name} | 班级: {old or '空'} → {new}"
+    if change_type == INSERT:
+        class_name, input_class = change['class_name'], change['input_class']
+        if input_class and class_name and input_class != class_name:
+            return f"➕ 新增: {name} | 学号: {change['number']} | 班级: {class_name} (自动匹配: {input_class})"
+        return f"➕ 新增: {name} | 学号: {change['number']} | 班级: {class_name if class_name else '未设置'}"
+    return None
+
+
+class RosterSync:
+    """花名册同步
+
+    用法:
+        sync = RosterSync(conn)
+        for name, number, class_name in 花名册行:
+            sync.add_row(name, number, class_name)
+        sync.apply()        # 批量写入，不提交
+        conn.commit()
+        sync.report.log_changes(log); log.flush(); sync.report.print_summary()
+
+    - add_row 只修改内存中的学生/班级索引并记录变化，不访问数据库；
+      同一学生在花名册中出现多次时，后面的行看到的是前面的行修改后的结果（与逐行更新一致）
+    - apply 只写入最终结果：先清空所有要变更的学号（避免学号唯一约束冲突），
+      再批量更新学号/班级，最后批量插入新学生；停用的旧学号记入学号历史表；
+      调班学生有成绩的考试重建班级统计
+    - 学号/班级更新和新学生插入用 BulkWriter 分批写入，写入失败的学生单独回滚，记入报告的 errors
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.students = StudentIndex(conn)
+        self.classes = ClassNameIndex(conn)
+        self.report = RosterChangeReport()
+        self._original = {}     # {StudentId: (学号, 班级)}，首次修改前的值
+        self._new_ids = []      # 新增学生在内存中的临时ID（负数），按新增顺序
+        self._next_new_id = -1
+
+    def _remember(self, student):
+        student_id = student['StudentId']
+        if student_id > 0 and student_id not in self._original:
+            self._original[student_id] = (student['StudentNumber'], student['ClassName'])
+
+    def _invalidate_number(self, student):
+        """学号被其他学生使用，清空该学生的学号"""
+        self._remember(student)
+        self.report.add(INVALIDATE, student['StudentName'], number=student['StudentNumber'],
+                        student_id=student['StudentId'])
+        self.students.update(student['StudentId'], StudentNumber=None)
+
+    def add_row(self, student_name, student_number, input_class_name):
+        """比较花名册中的一行"""
+        report = self.report
+
+        if not student_name or student_name == "None":
+            return
+
+        if not student_number or student_number == "None":
+            report.add(NO_NUMBER, student_name)
+            report.skipped += 1
+            return
+
+        # 如果有班级信息，匹配数据库中的标准班级名
+        matched_class = self.classes.match(input_class_name) if input_class_name else None
+
+        # 根据姓名查找学生
+        same_name = self.students.find_by_name(student_name)
+        existing = same_name[0] if same_name else None
+
+        if not existing:
+            # 学号已被其他学生使用时废弃旧学号，再新增学生
+            number_record = self.students.find_by_number(student_number)
+            if number_record:
+                self._invalidate_number(number_record)
+
+            student_id = self._next_new_id
+            self._next_new_id -= 1
+            self._new_ids.append(student_id)
+            self.students.add(student_id, student_number, student_name, matched_class)
+            self.classes.add(matched_class)
+            report.add(INSERT, student_name, number=student_number, class_name=matched_class,
+                       input_class=input_class_name)
+            report.inserted += 1
+            return
+
+        student_id = existing['StudentId']
+        old_number = existing['StudentNumber']
+        old_class = existing['ClassName']
+        has_change = False
+
+        # 学号为空或不同：更新学号，新学号被其他学生使用时废弃对方的学号
+        old_number_empty = not old_number or old_number.strip() == ""
+        if old_number_empty or student_number != old_number:
+            conflict_record = self.students.find_by_number(student_number)
+            if conflict_record and conflict_record['StudentId'] != student_id:
+                self._invalidate_number(conflict_record)
+
+            self._remember(existing)
+            self.students.update(student_id, StudentNumber=student_number)
+            report.add(NUMBER, student_name, old=old_number, new=student_number, student_id=student_id)
+            has_change = True
+
+        # 班级为空或不同：更新班级
+        old_class_empty = not old_class or old_class.strip() == ""
+        if matched_class and (old_class_empty or matched_class != old_class):
+            self._remember(existing)
+            self.students.update(student_id, ClassName=matched_class)
+            self.classes.move(old_class, matched_class)
+            report.add(CLASS, student_name, old=old_class, new=matched_class, input_class=input_class_name,
+                       student_id=student_id)
+            has_change = True
+
+        if has_change:
+            report.updated += 1
+        else:
+            report.add(UNCHANGED, student_name)
+            report.skipped += 1
+
+    def apply(self):
+        """把内存中的最终结果批量写入数据库（不提交）"""
+        cursor = self.conn.cursor()
+
+        changed = []
+        renumbered = []
+        retired = []
+        moved = []
+        for student_id, (old_number, old_class) in self._original.items():
+            student = self.students.by_id[student_id]
+            if student['StudentNumber'] == old_number and student['ClassName'] == old_class:
+                continue
+            changed.append((student['StudentNumber'], student['ClassName'], student_id))
+            if student['ClassName'] != old_class:
+                moved.append(student_id)
+            if student['StudentNumber'] != old_number and old_number is not None:
+                renumbered.append((student_id,))
+                if old_number.strip():
+                    retired.append((student_id, old_number, CHANGED if student['StudentNumber'] else INVALIDATED))
+
+        # 1. 先清空要变更的学号，学号在学生之间交换或转移时不会违反唯一约束
+        # 2. 写入最终的学号和班级（批量写入模式，时间戳由第2步写入）
+        updates = BulkWriter(self.conn, UPDATE_STUDENT_SQL)
+        with bulk_load(self.conn):
+            cursor.executemany("UPDATE Students SET StudentNumber = NULL WHERE StudentId = ?", renumbered)
+            record_retired_numbers(self.conn, retired)
+
+            for number, class_name, student_id in changed:
+                updates.add((number, class_name, student_id), student_id)
+            updates.flush()
+
+        # 3. 插入新学生（写入花名册处理结束时的最终学号和班级）
+        inserts = BulkWriter(self.conn, INSERT_STUDENT_SQL)
+        for student_id in self._new_ids:
+            student = self.students.by_id[student_id]
+            inserts.add((student['StudentNumber'], student['StudentName'], student['ClassName']), student_id)
+        inserts.flush()
+
+        self._record_errors(updates, inserts)
+
+        # 4. 调班学生有成绩的考试重建班级统计
+        refresh_stats_for_students(self.conn, moved)
+
+        return updates.success, inserts.success
+
+    def _record_errors(self, updates, inserts):
+        """写入失败的学生记入报告：计入失败，不再计入新增/更新"""
+        report = self.report
+        updated_ids = {c['student_id'] for c in report.changes if c['type'] in (NUMBER, CLASS)}
+        for student_id, error in updates.errors + inserts.errors:
+            report.errors.append((self.students.by_id[student_id]['StudentName'], error))
+            report.failed += 1
+            if student_id < 0:
+                report.inserted -= 1
+            elif student_id in updated_ids:
+                report.updated -= 1
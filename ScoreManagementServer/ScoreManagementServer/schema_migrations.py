@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+数据库迁移
+数据库结构由 migrations 目录中按编号排序的SQL脚本定义（0001_baseline.sql, 0002_time_limit.sql ...），
+PRAGMA user_version 记录已经执行到的编号。
+- 打开数据库时只读取一次 user_version，已是最新版本时不做任何结构检查
+- 否则按顺序执行尚未执行的脚本：每个脚本连同新的版本号用 executescript 在一个事务中提交，
+  触发器的 BEGIN ... END 不会被拆开
+- 没有版本号的旧数据库（user_version 为0但已经有表）先整理为与新建数据库相同的结构：
+  表定义与迁移脚本不同的表按迁移脚本重建（保留数据和两边都有的列），删除旧的视图、触发器和
+  迁移脚本中没有的索引，再执行全部迁移脚本。因此新建的数据库和升级的旧数据库结构完全相同
+  （只按前 LEGACY_MIGRATIONS 个脚本整理，之后修改已有表的脚本不需要能重复执行）
+
+新增表或修改结构时只需添加下一个编号的脚本，不要修改已经发布的脚本。
+"""
+
+import math
+import os
+import re
+import sqlite3
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_FILE_PATTERN = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+# 旧数据库整理时重建表使用的临时表名后缀
+LEGACY_SUFFIX = '__legacy'
+
+# 旧数据库按前几个脚本的结构整理：这些脚本只用 CREATE ... IF NOT EXISTS，整理后可以再执行一遍；
+# 之后的脚本（如 ALTER TABLE ADD COLUMN）不能重复执行，整理后按顺序执行
+LEGACY_MIGRATIONS = 6
+
+_migrations = None
+
+
+def _sqrt(value):
+    return math.sqrt(value) if value is not None and value >= 0 else None
+
+
+# 迁移脚本和统计刷新中使用的函数（部分SQLite版本没有内置数学函数）
+SQL_FUNCTIONS = (
+    ('sqrt', 1, _sqrt),
+)
+
+
+def register_functions(conn):
+    """在连接上注册 SQL_FUNCTIONS"""
+    for name, arg_count, func in SQL_FUNCTIONS:
+        conn.create_function(name, arg_count, func, deterministic=True)
+
+
+def list_migrations():
+    """迁移脚本 [(编号, 名称, 路径)]，按编号排序；编号必须从1开始连续"""
+    global _migrations
+    if _migrations is None:
+        migrations = []
+        for file_name in os.listdir(MIGRATIONS_DIR):
+            match = MIGRATION_FILE_PATTERN.match(file_name)
+            if match:
+                migrations.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, file_name)))
+        migrations.sort()
+        for expected, (version, name, _) in enumerate(migrations, 1):
+            if version != expected:
+                raise ValueError(f"迁移脚本编号不连续: 缺少第 {expected} 号（下一个脚本: {name}）")
+        _migrations = migrations
+    return _migrations
+
+
+def latest_version():
+    """最新的数据库结构版本"""
+    return len(list_migrations())
+
+
+def schema_version(conn):
+    """数据库当前的结构版本（PRAGMA user_version）"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def read_schema(conn):
+    """数据库中的表、索引、视图、触发器 {(类型, 名称): SQL}（不含SQLite内部对象和自动索引）"""
+    cursor = conn.execute("""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'
+    """)
+    return {(object_type, name): sql for object_type, name, sql in cursor.fetchall()}
+
+
+def reference_schema(upto=None):
+    """在内存数据库中执行全部迁移脚本（upto 不为空时只执行前 upto 个）得到的标准结构"""
+    conn = sqlite3.connect(':memory:')
+    register_functions(conn)
+    try:
+        for version, name, path in list_migrations()[:upto]:
+            run_migration(conn, version, path)
+        return read_schema(conn)
+    finally:
+        conn.close()
+
+
+def run_migration(conn, version, path):
+    """在一个事务中执行一个迁移脚本并更新版本号，失败时回滚"""
+    with open(path, 'r', encoding='utf-8') as f:
+        script = f.read()
+    try:
+        conn.executescript(f"BEGIN;\n{script}\n;\nPRAGMA user_version = {version};\nCOMMIT;")
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+
+
+def _table_columns(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")').fetchall()]
+
+
+def _rebuild_table(conn, table, create_sql):
+    """按标准定义重建一个表，复制两边都有的列，保留自增序号"""
+    legacy = table + LEGACY_SUFFIX
+    conn.execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+    conn.execute(create_sql)
+
+    columns = [column for column in _table_columns(conn, table) if column in _table_columns(conn, legacy)]
+    column_list = ', '.join(f'"{column}"' for column in columns)
+    conn.execute(f'INSERT INTO "{table}" ({column_list}) SELECT {column_list} FROM "{legacy}"')
+
+    has_sequence = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_sequence'"
+    ).fetchone()
+    if has_sequence:
+        conn.execute("""
+            UPDATE sqlite_sequence
+            SET seq = MAX(seq, COALESCE((SELECT seq FROM sqlite_sequence WHERE name = ?), 0))
+            WHERE name = ?
+        """, (legacy, table))
+    conn.execute(f'DROP TABLE "{legacy}"')
+
+
+def adopt_legacy_database(conn):
+    """把没有版本号的旧数据库整理为前 LEGACY_MIGRATIONS 个迁移脚本定义的结构（之后再执行全部迁移脚本）
+
+    返回被重建的表名列表
+    """
+    reference = reference_schema(LEGACY_MIGRATIONS)
+    existing = read_schema(conn)
+    rebuilt = []
+
+    # 重建表时关闭外键检查，并且不改写其他表中对被重命名表的引用
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+    conn.execute("PRAGMA legacy_alter_table = ON")
+    try:
+        conn.execute("BEGIN")
+
+        # 视图和触发器由迁移脚本重新创建
+        for (object_type, name) in existing:
+            if object_type in ('view', 'trigger'):
+                conn.execute(f'DROP {object_type.upper()} IF EXISTS "{name}"')
+
+        for (object_type, name), sql in existing.items():
+            if object_type == 'table' and (object_type, name) in reference and sql != reference[(object_type, name)]:
+                _rebuild_table(conn, name, reference[(object_type, name)])
+                rebuilt.append(name)
+
+        # 迁移脚本中没有或定义不同的索引（重建的表上的索引已随旧表删除）
+        for (object_type, name), sql in read_schema(conn).items():
+            if object_type == 'index' and reference.get((object_type, name)) != sql:
+                conn.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute("PRAGMA legacy_alter_table = OFF")
+        conn.execute(f"PRAGMA foreign_keys = {foreign_keys}")
+
+    violations = conn.execute("PRAGMA foreign_key_check").fetchall()
+    if violations:
+        print(f"⚠️  数据库中有 {len(violations)} 条记录引用了不存在的数据（外键检查），请检查")
+    return rebuilt
+
+
+def migrate(conn, verbose=True):
+    """把数据库升级到最新结构，返回升级后的版本号（已是最新版本时只读取一次 user_version）"""
+    register_functions(conn)
+    version = schema_version(conn)
+    migrations = list_migrations()
+    if version >= len(migrations):
+        if version > len(migrations) and verbose:
+            print(f"⚠️  数据库结构版本({version})比程序支持的版本({len(migrations)})新，请更新程序")
+        return version
+
+    if conn.in_transaction:
+        conn.commit()
+
+    if version == 0 and read_schema(conn):
+        rebuilt = adopt_legacy_database(conn)
+        if verbose:
+            print(f"🔧 已整理旧数据库结构" + (f"，重建的表: {', '.join(rebuilt)}" if rebuilt else ""))
+
+    for number, name, path in migrations[version:]:
+        run_migration(conn, number, path)
+        if verbose:
+            print(f"🔄 数据库结构已升级到版本 {number}: {name}")
+    return len(migrations)
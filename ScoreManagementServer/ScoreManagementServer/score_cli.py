@@ -0,0 +1,606 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+成绩管理命令行工具（非交互，适合脚本和夜间批处理）
+用法: python score_cli.py [--db 数据库] [--backend auto|fast|openpyxl] 命令 参数...
+
+命令:
+  import-students    导入学生信息表（可一次导入多个文件）
+  update-students    按姓名更新学生信息（可一次处理多个文件）
+  create-exam        创建考试，输出考试ID
+  import-scores      把多个成绩表（每个工作簿的所有sheet）导入同一场考试
+  import-folder      批量导入文件夹中的成绩表（多进程解析）
+  import-season      按考试映射文件一次导入多场考试（多进程解析，同一事务提交）
+  import-time-limit  导入限时练成绩（可一次导入多个文件）
+  derive-ranks       按分数计算考试的班级排名和年级排名（可指定多场考试）
+  refresh-summaries  重新计算成绩趋势表和班级统计表（修改考试日期等导入以外的变化后使用）
+  stats              数据库统计
+  query-student      按学号或姓名查询学生成绩（可一次查询多人）
+  score-trend        学生各科成绩/年级排名趋势（文字）
+  rank-trend         班级排名趋势分析（可指定多个班级、多个科目）
+  time-limit-progress 班级限时练进步情况（可指定多个班级）
+  batch              依次执行任务文件中的命令（每行一条命令，# 开头为注释）
+
+import-students / import-scores / import-time-limit 支持 --dry-run（只输出变更计划，不写入数据库）
+和 --validate（变更计划中没有无法导入的数据时才写入）。
+
+一次运行中的所有命令共用同一个数据库连接和导入日志（--log-level 控制逐行输出，--log-file 写出明细）；
+任一文件或目标处理失败时继续处理其余部分，最后以非0退出码结束。
+"""
+
+import os
+import sys
+import shlex
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+
+from db_connection import connect, READ, BULK_WRITE
+from import_log import ImportLog, VERBOSITY_LEVELS, DEFAULT_VERBOSITY
+from import_progress import CHUNK_ROWS
+from rank_derivation import TIE_MODES, DEFAULT_TIES
+from xlsx_reader import BACKENDS, DEFAULT_BACKEND
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "StudentData.db")
+
+# 限时练相关脚本位于子目录
+TIME_LIMIT_DIR = os.path.join(BASE_DIR, "ScoreManagementServer")
+
+# 只查询数据库的命令，使用查询连接配置（其余命令使用批量写入配置）
+READ_COMMANDS = ('stats', 'query-student', 'score-trend', 'rank-trend', 'time-limit-progress')
+
+
+def connect_db(db_path, profile=BULK_WRITE):
+    """连接数据库（查询函数按列名取值，使用 sqlite3.Row；连接配置见 db_connection）"""
+    return connect(db_path, profile, row_factory=sqlite3.Row)
+
+
+def import_time_limit_module(name):
+    """导入子目录中的限时练脚本"""
+    if TIME_LIMIT_DIR not in sys.path:
+        sys.path.insert(0, TIME_LIMIT_DIR)
+    return __import__(name)
+
+
+def import_excel_tool(args):
+    """导入 excel_to_sqlite_v2，Excel读取后端使用命令行指定的值"""
+    import excel_to_sqlite_v2
+    excel_to_sqlite_v2.READER_BACKEND = args.backend
+    return excel_to_sqlite_v2
+
+
+def resolve_subject(conn, text):
+    """科目ID或科目名称 → (科目ID, 科目名称)，找不到时返回 None"""
+    cursor = conn.cursor()
+    if text.isdigit():
+        cursor.execute("SELECT SubjectId, SubjectName FROM Subjects WHERE SubjectId = ?", (int(text),))
+    else:
+        cursor.execute("SELECT SubjectId, SubjectName FROM Subjects WHERE SubjectName = ?", (text,))
+    row = cursor.fetchone()
+    return (row[0], row[1]) if row else None
+
+
+def find_students(conn, target):
+    """按学号（精确）或姓名（精确）查找学生"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT StudentId, StudentNumber, StudentName, ClassName
+        FROM Students WHERE StudentNumber = ?
+    """, (target,))
+    students = cursor.fetchall()
+    if not students:
+        cursor.execute("""
+            SELECT StudentId, StudentNumber, StudentName, ClassName
+            FROM Students WHERE StudentName = ?
+            ORDER BY StudentNumber
+        """, (target,))
+        students = cursor.fetchall()
+    return students
+
+
+# ---------------------------------------------------------------------------
+# 导入命令
+# ---------------------------------------------------------------------------
+
+def finish_plan(plan, args):
+    """处理预演导入返回的变更计划（import_plan）：--dry-run 时放弃，--validate 时没有问题才写入
+
+    返回 None 表示导入失败或未通过校验
+    """
+    if plan is None:
+        return None
+    if args.dry_run:
+        plan.discard()
+        return plan
+    if not plan.clean:
+        print("❌ 校验未通过: 变更计划中有无法导入的数据，未写入数据库")
+        plan.discard()
+        return None
+    return plan.apply()
+
+
+def cmd_import_students(conn, args):
+    excel_tool = import_excel_tool(args)
+
+    failed = 0
+    for file_path in args.files:
+        print(f"\n📋 导入学生信息: {file_path}")
+        planned = args.dry_run or args.validate
+        result = excel_tool.import_students_file(conn, file_path, args.default_class, args.log, dry_run=planned)
+        if planned:
+            result = finish_plan(result, args)
+        if result is None:
+            failed += 1
+    return failed
+
+
+def cmd_update_students(conn, args):
+    excel_tool = import_excel_tool(args)
+
+    failed = 0
+    for file_path in args.files:
+        print(f"\n📋 更新学生信息: {file_path}")
+        if excel_tool.update_students_file(conn, file_path, args.log) is None:
+            failed += 1
+    return failed
+
+
+def cmd_create_exam(conn, args):
+    from excel_to_sqlite_v2 import create_exam_record
+
+    exam_id = create_exam_record(conn, args.name, args.type, args.date, args.grade, args.term, args.year)
+    print(f"✅ 考试创建成功! 考试ID: {exam_id}")
+    return 0
+
+
+def cmd_import_scores(conn, args):
+    excel_tool = import_excel_tool(args)
+
+    failed = 0
+    for file_path in args.files:
+        print(f"\n📊 导入学生成绩: {file_path}")
+        planned = args.dry_run or args.validate
+        result = excel_tool.import_scores_file(conn, file_path, args.exam_id, args.sheet_class, args.ties, args.log,
+                                               args.chunk_rows, dry_run=planned)
+        if planned:
+            result = finish_plan(result, args)
+        if result is None:
+            failed += 1
+    return failed
+
+
+def cmd_import_folder(conn, args):
+    from folder_import import import_score_folder
+
+    failed = 0
+    for folder in args.folders:
+        print(f"\n📂 批量导入文件夹成绩: {folder}")
+        success, fail = import_score_folder(folder, args.exam_id, args.workers, args.backend, conn=conn,
+                                            sheet_as_class=args.sheet_class, rank_ties=args.ties, log=args.log)
+        if not success and not fail:
+            failed += 1
+    return failed
+
+
+def cmd_import_season(conn, args):
+    from folder_import import import_score_jobs, read_exam_map
+
+    print(f"\n📚 按考试映射文件导入: {args.map_file}")
+    try:
+        jobs = read_exam_map(args.map_file)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    success, fail = import_score_jobs(jobs, args.workers, args.backend, conn=conn,
+                                      sheet_as_class=args.sheet_class, rank_ties=args.ties, log=args.log)
+    return 1 if not success and not fail else 0
+
+
+def cmd_import_time_limit(conn, args):
+    importer = import_time_limit_module('time_limit_exam_importer')
+
+    failed = 0
+    for file_path in args.files:
+        if not os.path.exists(file_path):
+            print(f"❌ 文件不存在: {file_path}")
+            failed += 1
+            continue
+        planned = args.dry_run or args.validate
+        result = importer.import_time_limit_excel(file_path, args.grade, args.commit_mode, args.backend, conn=conn,
+                                                  rank_ties=args.ties, log=args.log, dry_run=planned)
+        if planned:
+            result = finish_plan(result, args)
+        if result is None:
+            failed += 1
+    return failed
+
+
+# ---------------------------------------------------------------------------
+# 查询命令
+# ---------------------------------------------------------------------------
+
+def cmd_derive_ranks(conn, args):
+    from rank_derivation import derive_exam_ranks
+    from score_trend import refresh_score_trends
+    from class_subject_stats import refresh_class_subject_stats
+
+    kind = 'time_limit' if args.time_limit else 'exam'
+    table = 'TimeLimitExams' if args.time_limit else 'Exams'
+    cursor = conn.cursor()
+
+    failed = 0
+    for exam_id in args.exam_ids:
+        cursor.execute(f"SELECT ExamName FROM {table} WHERE ExamId = ?", (exam_id,))
+        exam = cursor.fetchone()
+        if not exam:
+            print(f"❌ 考试不存在: {exam_id}")
+            failed += 1
+            continue
+        ranked = derive_exam_ranks(conn, exam_id, args.ties, args.overwrite, kind)
+        if kind == 'exam':
+            refresh_score_trends(conn, [exam_id])
+            refresh_class_subject_stats(conn, [exam_id])
+        conn.commit()
+        print(f"✅ {exam[0]}（ID: {exam_id}）: 计算排名 {ranked} 条")
+    return failed
+
+
+def cmd_refresh_summaries(conn, args):
+    from score_trend import refresh_score_trends, rebuild_score_trends
+    from class_subject_stats import refresh_class_subject_stats, rebuild_class_subject_stats
+
+    if args.exam_ids:
+        trends = refresh_score_trends(conn, args.exam_ids)
+        stats = refresh_class_subject_stats(conn, args.exam_ids)
+    else:
+        trends = rebuild_score_trends(conn)
+        stats = rebuild_class_subject_stats(conn)
+    conn.commit()
+    print(f"✅ 成绩趋势已更新: {trends} 条, 班级科目统计已更新: {stats} 条")
+    return 0
+
+
+def cmd_stats(conn, args):
+    from excel_to_sqlite_v2 import print_statistics
+
+    print("\n📈 数据库统计")
+    print("-" * 50)
+    print_statistics(conn)
+    return 0
+
+
+def cmd_query_student(conn, args):
+    from excel_to_sqlite_v2 import query_student_by_number
+
+    failed = 0
+    cursor = conn.cursor()
+    for target in args.targets:
+        students = find_students(conn, target)
+        if not students:
+            print(f"❌ 未找到学号或姓名为 {target} 的学生!")
+            failed += 1
+            continue
+        for student in students:
+            query_student_by_number(cursor, student['StudentNumber'])
+    return failed
+
+
+def cmd_score_trend(conn, args):
+    from score_trend_visualizer import get_all_subjects, get_score_trend, print_trend_summary
+
+    subjects = []
+    for text in args.subjects or []:
+        subject = resolve_subject(conn, text)
+        if not subject:
+            print(f"❌ 科目不存在: {text}")
+            return 1
+        subjects.append(subject)
+
+    failed = 0
+    for target in args.targets:
+        students = find_students(conn, target)
+        if not students:
+            print(f"❌ 未找到学号或姓名为 {target} 的学生!")
+            failed += 1
+            continue
+        for student in students:
+            print(f"\n👤 {student['StudentName']} (学号: {student['StudentNumber']}, "
+                  f"班级: {student['ClassName'] or '未设置'})")
+            student_subjects = subjects or [(s['SubjectId'], s['SubjectName'])
+                                            for s in get_all_subjects(conn, student['StudentId'])]
+            for subject_id, subject_name in student_subjects:
+                print_trend_summary(get_score_trend(conn, student['StudentId'], subject_id), subject_name)
+    return failed
+
+
+def rank_trend_date_range(conn, args, subject_id):
+    """根据 --recent / --term / --start / --end 计算时间范围"""
+    if args.recent:
+        from class_rank_visualizer import get_recent_exams
+
+        recent_exams = get_recent_exams(conn, subject_id, args.recent)
+        if len(recent_exams) >= 2:
+            exam_dates = [e['ExamDate'] for e in recent_exams]
+            return min(exam_dates), max(exam_dates)
+        print(f"  ⚠️ 考试次数不足2次，使用全部数据")
+        return None, None
+    if args.term:
+        end_date = datetime.now().strftime('%Y-%m-%d')
+        start_date = (datetime.now() - timedelta(days=180)).strftime('%Y-%m-%d')
+        return start_date, end_date
+    return args.start, args.end
+
+
+def cmd_rank_trend(conn, args):
+    from class_rank_visualizer import (
+        get_all_classes, get_all_subjects_with_scores, get_class_rank_trend, get_class_rank_sums,
+        print_class_rank_summary, print_class_rank_sum_trend, generate_excel_report,
+    )
+
+    class_names = args.classes or [c['ClassName'] for c in get_all_classes(conn)]
+    if not class_names:
+        print("❌ 数据库中没有班级信息")
+        return 1
+
+    subjects = []
+    for text in args.subjects or []:
+        subject = resolve_subject(conn, text)
+        if not subject:
+            print(f"❌ 科目不存在: {text}")
+            return 1
+        subjects.append(subject)
+
+    failed = 0
+    for class_name in class_names:
+        class_subjects = subjects or [(s['SubjectId'], s['SubjectName'])
+                                      for s in get_all_subjects_with_scores(conn, class_name)]
+        if not class_subjects:
+            print(f"⚠️  {class_name}没有成绩记录")
+            failed += 1
+            continue
+
+        for subject_id, subject_name in class_subjects:
+            start_date, end_date = rank_trend_date_range(conn, args, subject_id)
+
+            if args.sum:
+                rank_sums = get_class_rank_sums(conn, class_name, subject_id, start_date, end_date)
+                print_class_rank_sum_trend(rank_sums, class_name, subject_name)
+                continue
+
+            scores = get_class_rank_trend(conn, class_name, subject_id, start_date, end_date, args.rank_type)
+            if not scores:
+                print(f"⚠️  {class_name}没有{subject_name}成绩记录")
+                continue
+
+            improvements, declines, no_change = print_class_rank_summary(
+                scores, class_name, subject_name, args.threshold, args.rank_type)
+
+            if args.excel and (improvements or declines):
+                sorted_scores = sorted(scores, key=lambda x: datetime.strptime(x['ExamDate'], '%Y-%m-%d'))
+                generate_excel_report(improvements, declines, class_name,
+                                      sorted_scores[0]['ExamName'], sorted_scores[-1]['ExamName'], subject_name)
+    return failed
+
+
+def cmd_time_limit_progress(conn, args):
+    query = import_time_limit_module('time_limit_exam_query')
+
+    class_names = args.classes
+    if not class_names:
+        from class_rank_visualizer import get_all_classes
+        class_names = [c['ClassName'] for c in get_all_classes(conn)]
+
+    for class_name in class_names:
+        query.print_class_time_limit_progress(conn, class_name, args.exam_count)
+    return 0
+
+
+def cmd_batch(conn, args):
+    """依次执行任务文件中的每一行命令"""
+    parser = build_parser()
+    failed = 0
+    for job_file in args.job_files:
+        if not os.path.exists(job_file):
+            print(f"❌ 任务文件不存在: {job_file}")
+            failed += 1
+            continue
+
+        with open(job_file, encoding='utf-8-sig') as f:
+            lines = f.readlines()
+
+        for line_no, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            print(f"\n{'=' * 60}")
+            print(f"▶ {os.path.basename(job_file)} 第{line_no}行: {line}")
+            print(f"{'=' * 60}")
+
+            try:
+                job_args = parser.parse_args(split_command_line(line))
+            except SystemExit:
+                print(f"❌ 无效的命令: {line}")
+                failed += 1
+                continue
+
+            if job_args.func is cmd_batch:
+                print("❌ 任务文件中不能再嵌套 batch 命令")
+                failed += 1
+                continue
+
+            # 任务文件中的命令共用本次运行的导入日志
+            job_args.log = args.log
+
+            failed += run_command(conn, job_args)
+    return failed
+
+
+def split_command_line(line):
+    """拆分一行命令；保留Windows路径中的反斜杠，去掉参数两侧的引号"""
+    tokens = []
+    for token in shlex.split(line, posix=False):
+        if len(token) >= 2 and token[0] == token[-1] and token[0] in '"\'':
+            token = token[1:-1]
+        tokens.append(token)
+    return tokens
+
+
+def run_command(conn, args):
+    """执行一条命令，返回失败的文件/目标数；意外错误时回滚并计为失败"""
+    try:
+        return args.func(conn, args)
+    except Exception as e:
+        conn.rollback()
+        print(f"\n❌ 命令执行失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+def add_plan_arguments(p):
+    """预演导入参数（见 finish_plan）"""
+    group = p.add_mutually_exclusive_group()
+    group.add_argument('--dry-run', action='store_true', help="只输出变更计划（新增/更新/无法导入的行），不写入数据库")
+    group.add_argument('--validate', action='store_true', help="先得出变更计划，没有无法导入的数据时才写入")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="成绩管理命令行工具（非交互，适合批处理）")
+    parser.add_argument('--db', default=DB_PATH, help="数据库文件路径")
+    parser.add_argument('--backend', choices=BACKENDS, default=DEFAULT_BACKEND, help="Excel读取后端")
+    parser.add_argument('--ties', choices=TIE_MODES, default=DEFAULT_TIES,
+                        help="按分数计算排名时的并列方式: rank 1,1,3 / dense 1,1,2 / row 1,2,3")
+    parser.add_argument('--log-level', choices=VERBOSITY_LEVELS, default=DEFAULT_VERBOSITY,
+                        help="导入时控制台输出的详细程度: quiet 只输出汇总 / normal / verbose 输出所有记录")
+    parser.add_argument('--log-file', help="运行结束时写出导入日志明细（.json 或 .csv）")
+    subparsers = parser.add_subparsers(dest='command', required=True, metavar='命令')
+
+    p = subparsers.add_parser('import-students', help="导入学生信息表")
+    p.add_argument('files', nargs='+', help="学生信息Excel文件（xlsx/csv/tsv）")
+    p.add_argument('--class', dest='default_class', default=None, help="表中没有班级列时使用的默认班级")
+    add_plan_arguments(p)
+    p.set_defaults(func=cmd_import_students)
+
+    p = subparsers.add_parser('update-students', help="按姓名更新学生信息")
+    p.add_argument('files', nargs='+', help="学生信息Excel文件（xlsx/csv/tsv）")
+    p.set_defaults(func=cmd_update_students)
+
+    p = subparsers.add_parser('create-exam', help="创建考试")
+    p.add_argument('--name', required=True, help="考试名称，如 2024年秋季期中考试")
+    p.add_argument('--type', required=True, help="考试类型：月考/期中考/期末考/模拟考/联考")
+    p.add_argument('--date', required=True, help="考试日期，如 2024-11-15")
+    p.add_argument('--grade', required=True, help="年级：高一/高二/高三")
+    p.add_argument('--term', choices=('上学期', '下学期'), default=None, help="学期")
+    p.add_argument('--year', default=None, help="学年，如 2024-2025")
+    p.set_defaults(func=cmd_create_exam)
+
+    p = subparsers.add_parser('import-scores', help="导入成绩表到同一场考试")
+    p.add_argument('exam_id', type=int, help="考试ID")
+    p.add_argument('files', nargs='+', help="成绩Excel文件（xlsx/csv/tsv）")
+    p.add_argument('--sheet-class', action='store_true', help="sheet名作为没有班级信息的行的班级")
+    p.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                   help=f"每多少行提交一次并记录断点（默认{CHUNK_ROWS}），中断后重新导入时从断点继续")
+    add_plan_arguments(p)
+    p.set_defaults(func=cmd_import_scores)
+
+    p = subparsers.add_parser('import-folder', help="批量导入文件夹中的成绩表")
+    p.add_argument('exam_id', type=int, help="考试ID")
+    p.add_argument('folders', nargs='+', help="成绩表所在文件夹")
+    p.add_argument('-j', '--workers', type=int, default=None, help="解析进程数（默认CPU核数）")
+    p.add_argument('--sheet-class', action='store_true', help="sheet名作为没有班级信息的行的班级")
+    p.set_defaults(func=cmd_import_folder)
+
+    p = subparsers.add_parser('import-season', help="按考试映射文件一次导入多场考试")
+    p.add_argument('map_file', help="考试映射文件，每行: 考试ID,文件或文件夹[,sheet名]")
+    p.add_argument('-j', '--workers', type=int, default=None, help="解析进程数（默认CPU核数）")
+    p.add_argument('--sheet-class', action='store_true', help="sheet名作为没有班级信息的行的班级")
+    p.set_defaults(func=cmd_import_season)
+
+    p = subparsers.add_parser('import-time-limit', help="导入限时练成绩")
+    p.add_argument('files', nargs='+', help="限时练Excel文件（xlsx，或每个班级一个csv/tsv；文件名中包含考试名称、科目和日期）")
+    p.add_argument('--grade', default='高一', help="年级（默认：高一）")
+    p.add_argument('--commit-mode', choices=('sheet', 'file'), default='sheet',
+                   help="每个sheet提交一次，或整个文件一次提交")
+    add_plan_arguments(p)
+    p.set_defaults(func=cmd_import_time_limit)
+
+    p = subparsers.add_parser('derive-ranks', help="按分数计算班级排名和年级排名")
+    p.add_argument('exam_ids', type=int, nargs='+', help="考试ID")
+    p.add_argument('--time-limit', action='store_true', help="考试ID为限时练考试ID")
+    p.add_argument('--overwrite', action='store_true', help="重新计算所有排名（默认只填写缺少的排名）")
+    p.set_defaults(func=cmd_derive_ranks)
+
+    p = subparsers.add_parser('refresh-summaries', help="重新计算成绩趋势表和班级统计表")
+    p.add_argument('exam_ids', type=int, nargs='*', help="考试ID（默认重建全部考试）")
+    p.set_defaults(func=cmd_refresh_summaries)
+
+    p = subparsers.add_parser('stats', help="数据库统计")
+    p.set_defaults(func=cmd_stats)
+
+    p = subparsers.add_parser('query-student', help="查询学生成绩")
+    p.add_argument('targets', nargs='+', help="学号或姓名")
+    p.set_defaults(func=cmd_query_student)
+
+    p = subparsers.add_parser('score-trend', help="学生成绩趋势（文字）")
+    p.add_argument('targets', nargs='+', help="学号或姓名")
+    p.add_argument('-s', '--subject', dest='subjects', action='append', help="科目ID或名称（可重复，默认全部）")
+    p.set_defaults(func=cmd_score_trend)
+
+    p = subparsers.add_parser('rank-trend', help="班级排名趋势分析")
+    p.add_argument('classes', nargs='*', help="班级名称（默认全部班级）")
+    p.add_argument('-s', '--subject', dest='subjects', action='append', help="科目ID或名称（可重复，默认全部）")
+    p.add_argument('--rank-type', choices=('grade', 'class'), default='grade', help="年级排名或班级排名")
+    p.add_argument('--threshold', type=int, default=5, help="退步显示阈值（默认5名）")
+    p.add_argument('--sum', action='store_true', help="改为分析班级学科排名总和变化")
+    p.add_argument('--excel', action='store_true', help="生成Excel报告")
+    range_group = p.add_mutually_exclusive_group()
+    range_group.add_argument('--recent', type=int, default=None, help="只分析最近N次考试")
+    range_group.add_argument('--term', action='store_true', help="只分析本学期（最近6个月）")
+    p.add_argument('--start', default=None, help="开始日期 YYYY-MM-DD")
+    p.add_argument('--end', default=None, help="结束日期 YYYY-MM-DD")
+    p.set_defaults(func=cmd_rank_trend)
+
+    p = subparsers.add_parser('time-limit-progress', help="班级限时练进步情况")
+    p.add_argument('classes', nargs='*', help="班级名称（默认全部班级）")
+    p.add_argument('-n', '--exam-count', type=int, default=3, help="最近几次考试（默认3）")
+    p.set_defaults(func=cmd_time_limit_progress)
+
+    p = subparsers.add_parser('batch', help="执行任务文件中的命令")
+    p.add_argument('job_files', nargs='+', help="任务文件（每行一条命令）")
+    p.set_defaults(func=cmd_batch)
+
+    return parser
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ 数据库文件不存在: {args.db}")
+        return 1
+
+    # 一次运行中的所有导入命令把逐行信息记入同一个导入日志
+    args.log = ImportLog(args.log_level)
+    conn = connect_db(args.db, READ if args.command in READ_COMMANDS else BULK_WRITE)
+    try:
+        failed = run_command(conn, args)
+    finally:
+        conn.close()
+
+    if args.log_file:
+        args.log.print_summary()
+        args.log.write_detail(args.log_file)
+    elif args.log_level == 'quiet':
+        args.log.print_summary()
+
+    if failed:
+        print(f"\n⚠️  有 {failed} 个文件/目标处理失败")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
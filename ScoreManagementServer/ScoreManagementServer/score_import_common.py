@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+成绩表解析公共模块
+表头检测、单元格读取和成绩行解析，
+供 excel_to_sqlite_v2 与批量导入工具（含多进程解析）共用
+"""
+
+from collections import OrderedDict
+
+# 科目映射表 - 使用科目名作为key，数据库SubjectId作为value
+SUBJECT_IDS = {
+    '语文': 1,
+    '数学': 2,
+    '英语': 3,
+    '物理': 4,
+    '化学': 5,
+    '生物': 6,
+    '政治': 7,
+    '历史': 8,
+    '地理': 9,
+    '总分': 10  # SubjectId为10时表示总分
+}
+
+
+def read_headers(ws):
+    """读取第一行表头，返回去除首尾空格的字符串列表"""
+    header_row = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
+    return [str(value).strip() if value else "" for value in header_row]
+
+
+def cell_value(row, idx):
+    """读取行中指定列的值，列不存在时返回None"""
+    if idx is None or idx >= len(row):
+        return None
+    return row[idx]
+
+
+def cell_text(row, idx):
+    """读取行中指定列的文本（去除首尾空格），列不存在或为空时返回空字符串"""
+    value = cell_value(row, idx)
+    return str(value).strip() if value else ""
+
+
+# ============================================
+# 表头检测规则表（模块加载时生成一次）
+# ============================================
+
+# 参与检测的学科（按检测顺序）
+SUBJECT_NAMES = ('语文', '数学', '英语', '物理', '化学', '生物', '政治', '历史', '地理')
+
+# 学号 / 姓名 / 班级列关键字
+STUDENT_NUMBER_KEYS = ('学号', '考号')
+STUDENT_NAME_KEYS = ('姓名',)
+CLASS_NAME_KEYS = ('班级',)
+
+# 总分分数列：以"总分"开头，或包含"总分分数"/"总分成绩"（不含名次/排名）
+TOTAL_SCORE_KEYS = ('总分分数', '总分成绩')
+RANK_KEYS = ('名次', '排名')
+# 带"总分"前缀的排名列
+TOTAL_GRADE_RANK_KEYS = ('总分校名次', '总分班级排名', '总分级排名', '总分年级排名',
+                         '总分年级名次', '总分校排名', '总分校次')
+TOTAL_CLASS_RANK_KEYS = ('总分班名次', '总分班级名次', '总分班级排名', '总分班次')
+# 总分列之后查找的通用排名列
+TOTAL_NEARBY_CLASS_RANK_KEYS = ('班级名次', '班级排名', '班名次', '班次')
+TOTAL_NEARBY_GRADE_RANK_KEYS = ('年级名次', '年级排名', '学校名次', '校名次', '校次', '校排名')
+
+# 学科成绩列之后查找的通用排名列
+GENERIC_CLASS_RANK_KEYS = ('班次', '班级排名', '班级名次')
+GENERIC_GRADE_RANK_KEYS = ('年级排名', '年级名次', '校名次', '校次')
+
+# 各学科的检测规则: (学科名, 成绩列关键字, 班级排名关键字, 年级排名关键字)
+SUBJECT_RULES = tuple(
+    (subject,
+     (f'{subject}成绩', f'{subject}分数'),
+     (f'{subject}班名次', f'{subject}班级名次', f'{subject}班级排名'),
+     (f'{subject}年级名次', f'{subject}年级排名', f'{subject}校名次', f'{subject}校次'))
+    for subject in SUBJECT_NAMES
+)
+
+# 表头布局缓存: {表头元组: 列映射}，同一种导出格式只检测一次
+LAYOUT_CACHE_SIZE = 64
+_layout_cache = OrderedDict()
+
+
+def _contains_any(header, keys):
+    for key in keys:
+        if key in header:
+            return True
+    return False
+
+
+def _find_first(headers, keys):
+    for idx, header in enumerate(headers):
+        if header and _contains_any(header, keys):
+            return idx
+    return None
+
+
+def detect_sheet_columns(headers):
+    """
+    智能检测Excel表的列位置
+    优先级：
+    1. 检测学号列（包含"学号"或"考号"二字）
+    2. 如果没有学号，检测姓名列（包含"姓名"二字）
+    3. 检测学科成绩列（学科名或学科名+成绩/分数）
+    4. 检测排名列（成绩列附近查找"班级排名"/"班次"/"年级排名"）
+
+    检测结果按表头内容缓存，相同表头的sheet/文件直接复用
+    """
+    key = tuple(headers)
+    col_map = _layout_cache.get(key)
+    if col_map is None:
+        col_map = _detect_columns(key)
+        _layout_cache[key] = col_map
+        if len(_layout_cache) > LAYOUT_CACHE_SIZE:
+            _layout_cache.popitem(last=False)
+    else:
+        _layout_cache.move_to_end(key)
+    return dict(col_map)
+
+
+def clear_layout_cache():
+    """清空表头布局缓存"""
+    _layout_cache.clear()
+
+
+def _detect_columns(headers):
+    """按规则表检测列位置（不使用缓存）"""
+    # 列索引映射（从0开始）
+    col_map = {}
+    header_count = len(headers)
+
+    # 1. 优先检测学号列；2. 如果没找到学号，检测姓名列
+    idx = _find_first(headers, STUDENT_NUMBER_KEYS)
+    if idx is not None:
+        col_map['学号'] = idx
+    else:
+        idx = _find_first(headers, STUDENT_NAME_KEYS)
+        if idx is not None:
+            col_map['姓名'] = idx
+
+    # 3. 检测班级列
+    idx = _find_first(headers, CLASS_NAME_KEYS)
+    if idx is not None:
+        col_map['班级'] = idx
+
+    # 4. 检测总分相关列（同类列取最后一个）
+    for idx, header in enumerate(headers):
+        if not header:
+            continue
+        if header.startswith('总分') or _contains_any(header, TOTAL_SCORE_KEYS):
+            # 确保不是排名列
+            if not _contains_any(header, RANK_KEYS):
+                col_map['总分_score'] = idx
+        elif _contains_any(header, TOTAL_GRADE_RANK_KEYS):
+            col_map['总分_grade_rank'] = idx
+        elif _contains_any(header, TOTAL_CLASS_RANK_KEYS):
+            col_map['总分_class_rank'] = idx
+
+    # 5. 检测总分的通用排名列（不带"总分"前缀的情况）
+    # 如果找到了总分分数列，在它后面5列内查找班级排名和年级排名
+    if '总分_score' in col_map:
+        total_score_col = col_map['总分_score']
+        for idx in range(total_score_col + 1, min(total_score_col + 6, header_count)):
+            header = headers[idx]
+            if not header:
+                continue
+            if _contains_any(header, TOTAL_NEARBY_CLASS_RANK_KEYS):
+                col_map.setdefault('总分_class_rank', idx)
+            elif _contains_any(header, TOTAL_NEARBY_GRADE_RANK_KEYS):
+                col_map.setdefault('总分_grade_rank', idx)
+
+    # 6. 检测各学科成绩和排名列
+    # 已分配给学科的年级排名列，通用排名列不重复分配
+    assigned_grade_cols = set()
+    for subject_name, score_keys, class_rank_keys, grade_rank_keys in SUBJECT_RULES:
+        # 成绩列：支持 "学科名", "学科名成绩", "学科名分数"
+        score_col = None
+        for idx, header in enumerate(headers):
+            if header and (header == subject_name or _contains_any(header, score_keys)):
+                score_col = idx
+                break
+        if score_col is None:
+            continue
+        col_map[f'{subject_name}_score'] = score_col
+
+        # 班级排名列：成绩列后2列内，优先查找带学科前缀的，没有再查找通用的"班次"、"班级排名"等
+        class_window = range(score_col + 1, min(score_col + 3, header_count))
+        class_rank_col = None
+        for keys in (class_rank_keys, GENERIC_CLASS_RANK_KEYS):
+            for idx in class_window:
+                header = headers[idx]
+                if header and _contains_any(header, keys):
+                    class_rank_col = idx
+                    break
+            if class_rank_col is not None:
+                col_map[f'{subject_name}_class_rank'] = class_rank_col
+                break
+
+        # 年级/学校排名列：成绩列后4列内，先查找带学科前缀的，
+        # 再查找未被其他学科占用的通用"年级排名"、"年级名次"、"校名次"、"校次"（找到时覆盖前者）
+        grade_window = range(score_col + 1, min(score_col + 5, header_count))
+        grade_rank_col = None
+        for idx in grade_window:
+            header = headers[idx]
+            if header and _contains_any(header, grade_rank_keys):
+                grade_rank_col = idx
+                break
+
+        for idx in grade_window:
+            header = headers[idx]
+            if (header and _contains_any(header, GENERIC_GRADE_RANK_KEYS) and
+                    idx not in assigned_grade_cols and idx != grade_rank_col):
+                grade_rank_col = idx
+                break
+
+        if grade_rank_col is not None:
+            col_map[f'{subject_name}_grade_rank'] = grade_rank_col
+            assigned_grade_cols.add(grade_rank_col)
+
+    return col_map
+
+
+def parse_score_row(row, col_map):
+    """解析一行成绩数据
+
+    返回 (学号, 姓名, 班级, 成绩列表)，成绩列表每项为
+    (科目名, SubjectId, 成绩, 班级排名, 年级排名)，只包含有成绩的科目
+    """
+    student_number = cell_text(row, col_map.get('学号'))
+    student_name = cell_text(row, col_map.get('姓名'))
+    class_name = cell_text(row, col_map.get('班级'))
+
+    scores = []
+    # 读取各科成绩（包括总分，SubjectId=10）
+    for subject_name, subject_id in SUBJECT_IDS.items():
+        # 只处理Excel中有对应列的科目
+        if f'{subject_name}_score' not in col_map:
+            continue
+
+        # 读取成绩
+        score_value = cell_value(row, col_map.get(f'{subject_name}_score'))
+        score = None
+        if score_value:
+            try:
+                score = float(score_value)
+            except:
+                pass
+
+        # 读取班级排名
+        class_rank = None
+        class_rank_col = col_map.get(f'{subject_name}_class_rank')
+        if class_rank_col is not None:
+            class_rank_value = cell_value(row, class_rank_col)
+            if class_rank_value:
+                try:
+                    class_rank = int(float(class_rank_value))
+                except:
+                    pass
+
+        # 读取年级排名
+        grade_rank = None
+        grade_rank_col = col_map.get(f'{subject_name}_grade_rank')
+        if grade_rank_col is not None:
+            grade_rank_value = cell_value(row, grade_rank_col)
+            if grade_rank_value:
+                try:
+                    grade_rank = int(float(grade_rank_value))
+                except:
+                    pass
+
+        if score is not None:
+            scores.append((subject_name, subject_id, score, class_rank, grade_rank))
+
+    return student_number, student_name, class_name, scores
+
+
+def ensure_total_subject(conn):
+    """检查总分科目是否存在，不存在则创建（SubjectId固定为10）"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT SubjectId FROM Subjects WHERE SubjectId = ?", (10,))
+    total_subject = cursor.fetchone()
+    if not total_subject:
+        print("\n⚠️  数据库中不存在'总分'科目（SubjectId=10），正在添加...")
+        cursor.execute("INSERT INTO Subjects (SubjectId, SubjectName, SubjectCode) VALUES (10, '总分', 'TOTAL')")
+        conn.commit()
+        print(f"✅ 已添加'总分'科目 (SubjectId: 10)")
+    else:
+        # 检查科目名称是否正确
+        cursor.execute("SELECT SubjectName FROM Subjects WHERE SubjectId = ?", (10,))
+        subject_name = cursor.fetchone()
+        if subject_name and subject_name[0] != '总分':
+            print(f"⚠️  SubjectId=10的科目名称是'{subject_name[0]}'，正在更新为'总分'...")
+            cursor.execute("UPDATE Subjects SET SubjectName = '总分' WHERE SubjectId = ?", (10,))
+            conn.commit()
+            print(f"✅ 已更新为'总分'")
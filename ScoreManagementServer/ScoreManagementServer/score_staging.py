@@ -0,0 +1,550 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+成绩暂存合并
+导入时先把解析好的原始行批量写入临时暂存表（TEMP TABLE），
+再用少量集合式SQL完成学生匹配、成绩校验和合并写入 Scores / TimeLimitScores，
+逐行判断的逻辑全部交给SQLite执行。
+暂存表同时记录每一行的处理结果，被拒绝的行及原因可在提交前查询（审计）。
+"""
+
+from bulk_load import bulk_load
+from bulk_writer import BulkWriter
+from import_log import NORMAL
+from import_manifest import row_hash
+from student_number_history import historical_student_sql, holder_at_date_sql
+
+# ============================================
+# 普通考试成绩（Scores）
+# ============================================
+
+# StagingScores: 每个Excel数据行一条
+#   MatchBy: '学号' / '姓名' / NULL（该文件既没有学号列也没有姓名列）
+#   Status : pending（待匹配）/ matched（已匹配）/ unchanged（与上次导入相同）/ rejected（已拒绝）
+#   Reason : 拒绝原因，或匹配时的提示信息
+# StagingScoreItems: 每行每个有成绩的科目一条
+#   Action : insert / update / unchanged / rejected / skipped（所在行被拒绝）
+SCORE_STAGING_SCHEMA = """
+CREATE TEMP TABLE IF NOT EXISTS StagingScores (
+    StagingId INTEGER PRIMARY KEY,
+    Source TEXT NOT NULL,
+    RowNo INTEGER NOT NULL,
+    MatchBy TEXT,
+    StudentNumber TEXT,
+    StudentName TEXT,
+    ClassName TEXT,
+    RowHash TEXT,
+    ManifestId INTEGER,
+    StudentId INTEGER,
+    MatchCount INTEGER,
+    Status TEXT NOT NULL DEFAULT 'pending',
+    Reason TEXT
+);
+
+CREATE TEMP TABLE IF NOT EXISTS StagingScoreItems (
+    StagingId INTEGER NOT NULL,
+    SubjectId INTEGER NOT NULL,
+    SubjectName TEXT,
+    Score REAL,
+    ClassRank INTEGER,
+    GradeRank INTEGER,
+    StudentId INTEGER,
+    Action TEXT,
+    Reason TEXT
+);
+
+CREATE INDEX IF NOT EXISTS temp.idx_staging_items_key ON StagingScoreItems(StudentId, SubjectId);
+CREATE INDEX IF NOT EXISTS temp.idx_staging_items_row ON StagingScoreItems(StagingId);
+"""
+
+INSERT_STAGING_ROW_SQL = """
+    INSERT INTO StagingScores (StagingId, Source, RowNo, MatchBy, StudentNumber, StudentName, ClassName, RowHash, ManifestId)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_STAGING_ITEM_SQL = """
+    INSERT INTO StagingScoreItems (StagingId, SubjectId, SubjectName, Score, ClassRank, GradeRank)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+# 考试日期（按学号历史匹配学生）
+EXAM_DATE_SQL = '(SELECT ExamDate FROM Exams WHERE ExamId = :exam_id)'
+
+# 学生匹配：优先使用学号（考试日期早于学号停用日期时按学号历史）；
+# 没有学号列时按姓名匹配（有班级信息时优先匹配同班级的学生）
+RESOLVE_STUDENTS_SQL = [
+    # 既没有学号列也没有姓名列
+    """
+    UPDATE StagingScores SET Status = 'rejected', Reason = 'Excel中既没有学号列也没有姓名列,跳过'
+    WHERE Status = 'pending' AND MatchBy IS NULL
+    """,
+    # 按学号匹配
+    """
+    UPDATE StagingScores SET Status = 'rejected', Reason = '学号为空,跳过'
+    WHERE Status = 'pending' AND MatchBy = '学号' AND (StudentNumber = '' OR StudentNumber = 'None')
+    """,
+    # 考试日期早于学号停用日期：按学号历史匹配考试当时使用该学号的学生（学号之后可能已分配给其他学生）
+    f"""
+    UPDATE StagingScores SET
+        StudentId = ({holder_at_date_sql('StagingScores.StudentNumber', EXAM_DATE_SQL)}),
+        Reason = '学号 ''' || StudentNumber || ''' '
+                 || CASE WHEN StudentNumber IN (SELECT StudentNumber FROM Students WHERE StudentNumber IS NOT NULL)
+                         THEN '在考试后分配给了其他学生' ELSE '已停用' END
+                 || ',按学号历史匹配考试时使用该学号的学生'
+    WHERE Status = 'pending' AND MatchBy = '学号'
+      AND StudentNumber IN (SELECT StudentNumber FROM StudentNumberHistory)
+      AND ({holder_at_date_sql('StagingScores.StudentNumber', EXAM_DATE_SQL)}) IS NOT NULL
+    """,
+    """
+    UPDATE StagingScores SET StudentId = (
+        SELECT s.StudentId FROM Students s WHERE s.StudentNumber = StagingScores.StudentNumber
+    )
+    WHERE Status = 'pending' AND MatchBy = '学号' AND StudentId IS NULL
+    """,
+    # 当前没有学生使用的学号：按学号历史匹配最后使用该学号的学生（考试晚于停用日期或日期未知）
+    f"""
+    UPDATE StagingScores SET
+        StudentId = ({historical_student_sql('StagingScores.StudentNumber', EXAM_DATE_SQL)}),
+        Reason = '学号 ''' || StudentNumber || ''' 已停用,按学号历史匹配'
+    WHERE Status = 'pending' AND MatchBy = '学号' AND StudentId IS NULL
+      AND StudentNumber IN (SELECT StudentNumber FROM StudentNumberHistory)
+    """,
+    """
+    UPDATE StagingScores SET Status = 'rejected', Reason = '学号 ''' || StudentNumber || ''' 不存在,跳过'
+    WHERE Status = 'pending' AND MatchBy = '学号' AND StudentId IS NULL
+    """,
+    # 按姓名匹配：有班级信息时优先匹配同班学生，同班没找到再去掉班级限制；同名取StudentId最小的
+    """
+    UPDATE StagingScores SET Status = 'rejected', Reason = '姓名为空,跳过'
+    WHERE Status = 'pending' AND MatchBy = '姓名' AND (StudentName = '' OR StudentName = 'None')
+    """,
+    """
+    UPDATE StagingScores SET
+        StudentId = (SELECT MIN(s.StudentId) FROM Students s
+                     WHERE s.StudentName = StagingScores.StudentName AND s.ClassName = StagingScores.ClassName),
+        MatchCount = (SELECT COUNT(*) FROM Students s
+                      WHERE s.StudentName = StagingScores.StudentName AND s.ClassName = StagingScores.ClassName)
+    WHERE Status = 'pending' AND MatchBy = '姓名' AND ClassName != ''
+    """,
+    """
+    UPDATE StagingScores SET
+        StudentId = (SELECT MIN(s.StudentId) FROM Students s WHERE s.StudentName = StagingScores.StudentName),
+        MatchCount = (SELECT COUNT(*) FROM Students s WHERE s.StudentName = StagingScores.StudentName)
+    WHERE Status = 'pending' AND MatchBy = '姓名' AND StudentId IS NULL
+    """,
+    """
+    UPDATE StagingScores SET Status = 'rejected',
+        Reason = '未找到姓名为 ''' || StudentName || ''' 的学生'
+                 || CASE WHEN ClassName != '' THEN '(班级:' || ClassName || ')' ELSE '' END || ',跳过'
+    WHERE Status = 'pending' AND MatchBy = '姓名' AND StudentId IS NULL
+    """,
+    """
+    UPDATE StagingScores SET Reason = '姓名为 ''' || StudentName || ''' 的学生有' || MatchCount || '个,使用第一个'
+    WHERE Status = 'pending' AND MatchBy = '姓名' AND MatchCount > 1
+    """,
+    """
+    UPDATE StagingScores SET Status = 'matched' WHERE Status = 'pending'
+    """,
+]
+
+
+def _same_item_sql(stored, staged):
+    """SQL条件：暂存的成绩 staged 与已有成绩 stored 相同
+
+    暂存的排名为空（成绩表没有排名列）时不比较该排名：已有的排名（之前提供的或导入后计算的）保留，不算作改变
+    """
+    return (f"({stored}.Score IS {staged}.Score"
+            f" AND ({staged}.ClassRank IS NULL OR {stored}.ClassRank IS {staged}.ClassRank)"
+            f" AND ({staged}.GradeRank IS NULL OR {stored}.GradeRank IS {staged}.GradeRank))")
+
+
+# 行哈希与上次导入相同、并且该行的每科成绩在 Scores 中仍是这些值的行整行跳过
+# （上次导入后成绩被删除或修改过的行照常比较和写入）
+SKIP_UNCHANGED_ROWS_SQL = f"""
+    UPDATE StagingScores SET Status = 'unchanged'
+    WHERE Status = 'matched' AND ManifestId IS NOT NULL
+      AND RowHash = (SELECT m.RowHash FROM ImportRowManifest m
+                     WHERE m.ManifestId = StagingScores.ManifestId AND m.StudentId = StagingScores.StudentId)
+      AND NOT EXISTS (
+          SELECT 1 FROM StagingScoreItems i
+          LEFT JOIN Scores s ON s.ExamId = :exam_id AND s.StudentId = StagingScores.StudentId
+                            AND s.SubjectId = i.SubjectId
+          WHERE i.StagingId = StagingScores.StagingId
+            AND (s.ScoreId IS NULL OR NOT {_same_item_sql('s', 'i')})
+      )
+"""
+
+# 成绩记录继承所在行的学生和状态
+ATTACH_ITEMS_SQL = """
+    UPDATE StagingScoreItems SET
+        StudentId = (SELECT r.StudentId FROM StagingScores r WHERE r.StagingId = StagingScoreItems.StagingId),
+        Action = (SELECT CASE r.Status WHEN 'unchanged' THEN 'unchanged' WHEN 'rejected' THEN 'skipped' END
+                  FROM StagingScores r WHERE r.StagingId = StagingScoreItems.StagingId)
+    WHERE Action IS NULL
+"""
+
+# 成绩校验
+VALIDATE_ITEMS_SQL = [
+    """
+    UPDATE StagingScoreItems SET Action = 'rejected', Reason = '科目不存在'
+    WHERE Action IS NULL AND SubjectId NOT IN (SELECT SubjectId FROM Subjects)
+    """,
+    """
+    UPDATE StagingScoreItems SET Action = 'rejected', Reason = '成绩为负数'
+    WHERE Action IS NULL AND Score < 0
+    """,
+]
+
+# 与现有成绩比较：不存在为新增，值相同为未变化，否则为更新
+CLASSIFY_ITEMS_SQL = f"""
+    UPDATE StagingScoreItems SET Action = COALESCE(
+        (SELECT CASE WHEN {_same_item_sql('s', 'StagingScoreItems')} THEN 'unchanged' ELSE 'update' END
+         FROM Scores s
+         WHERE s.ExamId = ? AND s.StudentId = StagingScoreItems.StudentId
+           AND s.SubjectId = StagingScoreItems.SubjectId),
+        'insert')
+    WHERE Action IS NULL
+"""
+
+# 同一学生同一科目在暂存表中出现多次时（如多个文件），后面需要写入的记录改为与前一条比较
+CLASSIFY_REPEATED_ITEMS_SQL = f"""
+    UPDATE StagingScoreItems SET Action = (
+        SELECT CASE WHEN {_same_item_sql('p', 'StagingScoreItems')} THEN 'unchanged' ELSE 'update' END
+        FROM StagingScoreItems p
+        WHERE p.StudentId = StagingScoreItems.StudentId AND p.SubjectId = StagingScoreItems.SubjectId
+          AND p.rowid < StagingScoreItems.rowid AND p.Action IN ('insert', 'update', 'unchanged')
+        ORDER BY p.rowid DESC LIMIT 1
+    )
+    WHERE Action IN ('insert', 'update')
+      AND EXISTS (SELECT 1 FROM StagingScoreItems p
+                  WHERE p.StudentId = StagingScoreItems.StudentId AND p.SubjectId = StagingScoreItems.SubjectId
+                    AND p.rowid < StagingScoreItems.rowid AND p.Action IN ('insert', 'update', 'unchanged'))
+"""
+
+# 合并写入（同一学生同一科目出现多次时以后面的为准）
+# 写入的排名都来自成绩表，清除计算排名标记；成绩表没有排名列时排名为空，由 rank_derivation 重新计算
+MERGE_SCORES_SQL = """
+    INSERT INTO Scores (ExamId, StudentId, SubjectId, Score, ClassRank, GradeRank)
+    SELECT ?, StudentId, SubjectId, Score, ClassRank, GradeRank
+    FROM StagingScoreItems
+    WHERE Action IN ('insert', 'update')
+    ORDER BY rowid
+    ON CONFLICT(ExamId, StudentId, SubjectId) DO UPDATE SET
+        Score = excluded.Score,
+        ClassRank = excluded.ClassRank,
+        GradeRank = excluded.GradeRank,
+        ClassRankDerived = 0,
+        GradeRankDerived = 0,
+        UpdatedAt = datetime('now', 'localtime')
+"""
+
+
+def _create_staging_tables(conn, schema, tables):
+    """创建临时暂存表并清空上次留下的数据（不提交事务）"""
+    cursor = conn.cursor()
+    for stmt in schema.split(';'):
+        if stmt.strip():
+            cursor.execute(stmt)
+    for table in tables:
+        cursor.execute(f"DELETE FROM temp.{table}")
+
+
+class ScoreStaging:
+    """普通考试成绩暂存表
+
+    用法：
+        staging = ScoreStaging(conn)
+        for row_no, row in ...:
+            staging.add_row(source, row_no, col_map, parse_score_row(row, col_map), manifest_id)
+        staging.merge(exam_id)
+        for source, row_no, message in staging.messages(): ...
+        conn.commit()
+
+    - add_row 只做批量写入暂存表，不查询数据库
+    - merge 依次执行：学生匹配 → 跳过未变化的行 → 成绩校验 → 与现有成绩比较 → 合并写入
+    - merge = plan + apply：plan 只在暂存表中得出变更计划（可用 changes / messages / summary 查看），
+      apply 再把计划写入 Scores，预演导入时两步之间不需要重新解析Excel
+    - 不负责提交事务，由调用方统一 commit
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        _create_staging_tables(conn, SCORE_STAGING_SCHEMA, ('StagingScores', 'StagingScoreItems'))
+        self.rows = BulkWriter(conn, INSERT_STAGING_ROW_SQL)
+        self.items = BulkWriter(conn, INSERT_STAGING_ITEM_SQL)
+        self.next_id = 1
+        self.merged = 0
+
+    def add_row(self, source, row_no, col_map, parsed_row, manifest_id=None):
+        """暂存一行（parsed_row 为 parse_score_row 的返回值）"""
+        student_number, student_name, class_name, scores = parsed_row
+        if '学号' in col_map:
+            match_by = '学号'
+        elif '姓名' in col_map:
+            match_by = '姓名'
+        else:
+            match_by = None
+
+        staging_id = self.next_id
+        self.next_id += 1
+        self.rows.add((staging_id, source, row_no, match_by, student_number, student_name, class_name,
+                       row_hash(scores), manifest_id))
+        for subject_name, subject_id, score, class_rank, grade_rank in scores:
+            self.items.add((staging_id, subject_id, subject_name, score, class_rank, grade_rank))
+
+    def merge(self, exam_id):
+        """匹配学生、校验并合并写入 Scores，返回写入（新增+更新）的记录数"""
+        self.plan(exam_id)
+        return self.apply(exam_id)
+
+    def plan(self, exam_id):
+        """匹配学生、校验并与现有成绩比较，只修改暂存表（得出变更计划，不写入 Scores）"""
+        self.rows.flush()
+        self.items.flush()
+
+        cursor = self.conn.cursor()
+        for sql in RESOLVE_STUDENTS_SQL:
+            cursor.execute(sql, {'exam_id': exam_id})
+        cursor.execute(SKIP_UNCHANGED_ROWS_SQL, {'exam_id': exam_id})
+        cursor.execute(ATTACH_ITEMS_SQL)
+        for sql in VALIDATE_ITEMS_SQL:
+            cursor.execute(sql)
+        cursor.execute(CLASSIFY_ITEMS_SQL, (exam_id,))
+        cursor.execute(CLASSIFY_REPEATED_ITEMS_SQL)
+
+    def apply(self, exam_id):
+        """把 plan 得出的新增和更新写入 Scores，返回写入的记录数"""
+        cursor = self.conn.cursor()
+        with bulk_load(self.conn):
+            cursor.execute(MERGE_SCORES_SQL, (exam_id,))
+        self.merged = cursor.rowcount
+        return self.merged
+
+    def changes(self, exam_id):
+        """plan 得出的新增和更新，按行顺序返回
+        [(Source, RowNo, 学号, 姓名, 科目, 'insert'/'update', 原成绩, 新成绩)]"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT r.Source, r.RowNo, st.StudentNumber, st.StudentName, i.SubjectName, i.Action,
+                   (SELECT s.Score FROM Scores s
+                    WHERE s.ExamId = ? AND s.StudentId = i.StudentId AND s.SubjectId = i.SubjectId),
+                   i.Score
+            FROM StagingScoreItems i
+            JOIN StagingScores r ON r.StagingId = i.StagingId
+            JOIN Students st ON st.StudentId = i.StudentId
+            WHERE i.Action IN ('insert', 'update')
+            ORDER BY i.rowid
+        """, (exam_id,))
+        return cursor.fetchall()
+
+    def messages(self):
+        """被拒绝的行和匹配提示，按行顺序返回 [(Source, RowNo, 信息)]"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT Source, RowNo, Reason FROM StagingScores
+            WHERE Reason IS NOT NULL
+            ORDER BY StagingId
+        """)
+        return cursor.fetchall()
+
+    def rejected_items(self):
+        """校验未通过的成绩记录 [(Source, 学生信息, 科目名, 原因)]"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT r.Source,
+                   CASE r.MatchBy WHEN '学号' THEN '学号' || r.StudentNumber ELSE '姓名''' || r.StudentName || '''' END,
+                   i.SubjectName, i.Reason
+            FROM StagingScoreItems i JOIN StagingScores r ON r.StagingId = i.StagingId
+            WHERE i.Action = 'rejected'
+            ORDER BY i.rowid
+        """)
+        return cursor.fetchall()
+
+    def log_messages(self, log, with_source=True):
+        """把 messages 和 rejected_items 记入导入日志（import_log.ImportLog）"""
+        for source, row_no, message in self.messages():
+            log.add('skip', f"⚠️  {source + ' ' if with_source else ''}第{row_no}行: {message}", NORMAL,
+                    source=source, row=row_no)
+        for source, student_info, subject_name, reason in self.rejected_items():
+            log.add('rejected', f"❌ {source + ' ' if with_source else ''}{student_info} 科目 {subject_name}: {reason}",
+                    NORMAL, source=source, student=student_info, subject=subject_name, reason=reason)
+
+    def summary(self):
+        """按来源统计: {Source: {rows, matched, skipped, inserted, updated, unchanged, rejected}}"""
+        cursor = self.conn.cursor()
+        result = {}
+        cursor.execute("""
+            SELECT Source, COUNT(*), SUM(Status = 'rejected')
+            FROM StagingScores GROUP BY Source
+        """)
+        for source, rows, skipped in cursor.fetchall():
+            result[source] = {'rows': rows, 'matched': rows - skipped, 'skipped': skipped,
+                              'inserted': 0, 'updated': 0, 'unchanged': 0, 'rejected': 0}
+
+        cursor.execute("""
+            SELECT r.Source, i.Action, COUNT(*)
+            FROM StagingScoreItems i JOIN StagingScores r ON r.StagingId = i.StagingId
+            WHERE i.Action IN ('insert', 'update', 'unchanged', 'rejected')
+            GROUP BY r.Source, i.Action
+        """)
+        keys = {'insert': 'inserted', 'update': 'updated', 'unchanged': 'unchanged', 'rejected': 'rejected'}
+        for source, action, count in cursor.fetchall():
+            result[source][keys[action]] = count
+        return result
+
+
+# ============================================
+# 限时练成绩（TimeLimitScores）
+# ============================================
+
+# StagingTimeLimitScores: 每个Excel数据行一条，Source 为sheet名（班级）
+#   Status: pending / matched / rejected
+TIME_LIMIT_STAGING_SCHEMA = """
+CREATE TEMP TABLE IF NOT EXISTS StagingTimeLimitScores (
+    StagingId INTEGER PRIMARY KEY,
+    Source TEXT NOT NULL,
+    RowNo INTEGER NOT NULL,
+    StudentNumber TEXT,
+    StudentName TEXT,
+    ClassName TEXT,
+    Score REAL,
+    IsAbsent INTEGER DEFAULT 0,
+    ClassRank INTEGER,
+    GradeRank INTEGER,
+    StudentId INTEGER,
+    Status TEXT NOT NULL DEFAULT 'pending',
+    Reason TEXT
+);
+"""
+
+INSERT_TIME_LIMIT_ROW_SQL = """
+    INSERT INTO StagingTimeLimitScores (Source, RowNo, StudentNumber, StudentName, ClassName,
+                                        Score, IsAbsent, ClassRank, GradeRank, Status, Reason)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+TIME_LIMIT_EXAM_DATE_SQL = '(SELECT ExamDate FROM TimeLimitExams WHERE ExamId = :exam_id)'
+
+# 学生匹配：优先学号（考试日期早于学号停用日期时按学号历史），其次姓名+班级（sheet名）；找不到学生优先于缺考
+RESOLVE_TIME_LIMIT_SQL = [
+    # 考试日期早于学号停用日期：按学号历史匹配考试当时使用该学号的学生
+    f"""
+    UPDATE StagingTimeLimitScores SET StudentId = ({holder_at_date_sql(
+        'StagingTimeLimitScores.StudentNumber', TIME_LIMIT_EXAM_DATE_SQL)})
+    WHERE Source = :source AND Status = 'pending'
+      AND StudentNumber IN (SELECT StudentNumber FROM StudentNumberHistory)
+    """,
+    """
+    UPDATE StagingTimeLimitScores SET StudentId = (
+        SELECT s.StudentId FROM Students s WHERE s.StudentNumber = StagingTimeLimitScores.StudentNumber
+    )
+    WHERE Source = :source AND Status = 'pending' AND StudentId IS NULL AND StudentNumber IS NOT NULL
+    """,
+    # 当前没有学生使用的学号：按学号历史匹配最后使用该学号的学生（考试晚于停用日期或日期未知）
+    f"""
+    UPDATE StagingTimeLimitScores SET StudentId = ({historical_student_sql(
+        'StagingTimeLimitScores.StudentNumber', TIME_LIMIT_EXAM_DATE_SQL)})
+    WHERE Source = :source AND Status = 'pending' AND StudentId IS NULL
+      AND StudentNumber IN (SELECT StudentNumber FROM StudentNumberHistory)
+    """,
+    """
+    UPDATE StagingTimeLimitScores SET StudentId = (
+        SELECT MIN(s.StudentId) FROM Students s
+        WHERE s.StudentName = StagingTimeLimitScores.StudentName AND s.ClassName = StagingTimeLimitScores.ClassName
+    )
+    WHERE Source = :source AND Status = 'pending' AND StudentId IS NULL AND StudentName IS NOT NULL
+    """,
+    """
+    UPDATE StagingTimeLimitScores SET Status = 'rejected',
+        Reason = '找不到学生: ' || COALESCE(StudentName, '未知') || '(' || COALESCE(StudentNumber, '无学号') || ')'
+    WHERE Source = :source AND Status = 'pending' AND StudentId IS NULL
+    """,
+    """
+    UPDATE StagingTimeLimitScores SET Status = 'rejected',
+        Reason = COALESCE(StudentName, '未知') || '(' || COALESCE(StudentNumber, '无学号') || '): 缺考'
+    WHERE Source = :source AND Status = 'pending' AND IsAbsent = 1
+    """,
+    """
+    UPDATE StagingTimeLimitScores SET Status = 'matched'
+    WHERE Source = :source AND Status = 'pending'
+    """,
+]
+
+MERGE_TIME_LIMIT_SQL = """
+    INSERT INTO TimeLimitScores (TimeLimitExamId, StudentId, SubjectId, Score, ClassRank, GradeRank)
+    SELECT ?, StudentId, ?, Score, ClassRank, GradeRank
+    FROM StagingTimeLimitScores
+    WHERE Source = ? AND Status = 'matched'
+    ORDER BY StagingId
+    ON CONFLICT(TimeLimitExamId, StudentId, SubjectId) DO UPDATE SET
+        Score = excluded.Score,
+        ClassRank = excluded.ClassRank,
+        GradeRank = excluded.GradeRank,
+        ClassRankDerived = 0,
+        GradeRankDerived = 0,
+        UpdatedAt = datetime('now', 'localtime')
+"""
+
+
+class TimeLimitStaging:
+    """限时练成绩暂存表
+
+    一个工作簿共用一个暂存表，每个sheet（Source）单独匹配和合并；
+    整个工作簿处理完后仍可查询所有sheet被拒绝的行。
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        _create_staging_tables(conn, TIME_LIMIT_STAGING_SCHEMA, ('StagingTimeLimitScores',))
+        self.rows = BulkWriter(conn, INSERT_TIME_LIMIT_ROW_SQL)
+
+    def add_row(self, source, row_no, student_number, student_name, class_name,
+                score, is_absent, class_rank, grade_rank):
+        """暂存一行成绩"""
+        self.rows.add((source, row_no, student_number, student_name, class_name,
+                       score, 1 if is_absent else 0, class_rank, grade_rank, 'pending', None))
+
+    def reject_row(self, source, row_no, reason, student_number=None, student_name=None, class_name=None):
+        """暂存一行解析阶段即被拒绝的数据（只用于审计）"""
+        self.rows.add((source, row_no, student_number, student_name, class_name,
+                       None, 0, None, None, 'rejected', reason))
+
+    def merge(self, source, exam_id, subject_id):
+        """匹配学生并合并写入一个sheet的成绩，返回 (成功条数, 失败条数)"""
+        counts = self.plan(source, exam_id)
+        self.apply(source, exam_id, subject_id)
+        return counts
+
+    def plan(self, source, exam_id):
+        """匹配一个sheet的学生，只修改暂存表（不写入 TimeLimitScores），返回 (可导入条数, 失败条数)"""
+        self.rows.flush()
+
+        cursor = self.conn.cursor()
+        for sql in RESOLVE_TIME_LIMIT_SQL:
+            cursor.execute(sql, {'source': source, 'exam_id': exam_id})
+
+        cursor.execute("""
+            SELECT SUM(Status = 'matched'), SUM(Status = 'rejected')
+            FROM StagingTimeLimitScores WHERE Source = ?
+        """, (source,))
+        success, failed = cursor.fetchone()
+        return success or 0, failed or 0
+
+    def apply(self, source, exam_id, subject_id):
+        """把 plan 匹配成功的行写入 TimeLimitScores"""
+        self.conn.cursor().execute(MERGE_TIME_LIMIT_SQL, (exam_id, subject_id, source))
+
+    def rejected(self, source=None):
+        """被拒绝的行 [(Source, RowNo, 原因)]，按行顺序"""
+        cursor = self.conn.cursor()
+        if source is None:
+            cursor.execute("""
+                SELECT Source, RowNo, Reason FROM StagingTimeLimitScores
+                WHERE Status = 'rejected' ORDER BY StagingId
+            """)
+        else:
+            cursor.execute("""
+                SELECT Source, RowNo, Reason FROM StagingTimeLimitScores
+                WHERE Status = 'rejected' AND Source = ? ORDER BY StagingId
+            """, (source,))
+        return cursor.fetchall()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+学生成绩趋势表
+StudentScoreTrend 为每条成绩记录同一学生同一科目上一次考试（按考试日期、考试ID排序）的成绩和排名，
+以及分数变化、排名变化和趋势，按 (StudentId, SubjectId, ExamDate) 建索引，
+查询某个学生或班级的趋势时直接按索引读取，不再对全部成绩计算窗口函数。
+表由迁移脚本 migrations/0004_student_score_trend.sql 创建并填充。
+
+导入成绩或重新计算排名后，只刷新被修改的考试（不提交事务）:
+    refresh_score_trends(conn, [exam_id])
+- 删除并重新写入该考试的趋势行，上一次考试的成绩从趋势表中按索引查找
+- 每个学生每个科目排在该考试后面的那一行（上一次考试变成了该考试）也重新写入
+"""
+
+# 趋势行的计算：c 为本次成绩 (StudentId, SubjectId, ExamId, ExamDate, Score, ClassRank, GradeRank)，
+# 上一次考试的成绩从趋势表中按 idx_trend_student 取同一学生同一科目排在前面的最后一行
+INSERT_TREND_ROWS_SQL = """
+    INSERT INTO StudentScoreTrend (
+        StudentId, SubjectId, ExamId, ExamDate, Score, ClassRank, GradeRank,
+        PrevExamId, PrevScore, PrevClassRank, PrevGradeRank,
+        ScoreChange, ClassRankChange, GradeRankChange, Trend
+    )
+    SELECT
+        c.StudentId, c.SubjectId, c.ExamId, c.ExamDate, c.Score, c.ClassRank, c.GradeRank,
+        p.ExamId, p.Score, p.ClassRank, p.GradeRank,
+        CASE WHEN p.Score IS NOT NULL THEN c.Score - p.Score END,
+        CASE WHEN p.Score IS NOT NULL THEN p.ClassRank - c.ClassRank END,
+        CASE WHEN p.Score IS NOT NULL THEN p.GradeRank - c.GradeRank END,
+        CASE
+            WHEN p.Score IS NULL THEN NULL
+            WHEN c.Score > p.Score THEN '进步'
+            WHEN c.Score < p.Score THEN '退步'
+            ELSE '持平'
+        END
+    FROM (
+        SELECT s.StudentId, s.SubjectId, s.ExamId, e.ExamDate, s.Score, s.ClassRank, s.GradeRank
+        FROM {source}
+    ) c
+    LEFT JOIN StudentScoreTrend p ON p.rowid = (
+        SELECT q.rowid FROM StudentScoreTrend q
+        WHERE q.StudentId = c.StudentId AND q.SubjectId = c.SubjectId
+          AND (q.ExamDate, q.ExamId) < (c.ExamDate, c.ExamId)
+        ORDER BY q.ExamDate DESC, q.ExamId DESC
+        LIMIT 1
+    )
+"""
+
+# 本次成绩的来源：一场考试的全部成绩 / 需要重新计算的后续行中的一场考试
+EXAM_SCORES_SOURCE = """
+        Scores s
+        JOIN Exams e ON s.ExamId = e.ExamId
+        WHERE s.ExamId = ?
+"""
+FOLLOWING_SCORES_SOURCE = """
+        temp.TrendRefreshFollowing f
+        JOIN Scores s ON s.ExamId = f.ExamId AND s.StudentId = f.StudentId AND s.SubjectId = f.SubjectId
+        JOIN Exams e ON s.ExamId = e.ExamId
+        WHERE f.ExamId = ?
+"""
+
+TREND_REFRESH_SCHEMA = """
+CREATE TEMP TABLE IF NOT EXISTS TrendRefreshKeys (
+    StudentId INTEGER NOT NULL,
+    SubjectId INTEGER NOT NULL,
+    ExamDate TEXT NOT NULL,
+    ExamId INTEGER NOT NULL
+);
+
+CREATE TEMP TABLE IF NOT EXISTS TrendRefreshFollowing (
+    TrendRowId INTEGER PRIMARY KEY,
+    StudentId INTEGER NOT NULL,
+    SubjectId INTEGER NOT NULL,
+    ExamId INTEGER NOT NULL
+)
+"""
+
+
+def _create_refresh_tables(conn):
+    cursor = conn.cursor()
+    for stmt in TREND_REFRESH_SCHEMA.split(';'):
+        if stmt.strip():
+            cursor.execute(stmt)
+
+
+def refresh_score_trends(conn, exam_ids):
+    """刷新若干场考试的趋势行（不提交事务），返回重新写入的行数"""
+    _create_refresh_tables(conn)
+    cursor = conn.cursor()
+    written = 0
+    for exam_id in dict.fromkeys(exam_ids):
+        cursor.execute("DELETE FROM temp.TrendRefreshKeys")
+        cursor.execute("DELETE FROM temp.TrendRefreshFollowing")
+
+        # 该考试在各学生各科目中的旧位置和新位置（考试日期修改后两者不同）
+        cursor.execute("""
+            INSERT INTO temp.TrendRefreshKeys (StudentId, SubjectId, ExamDate, ExamId)
+            SELECT StudentId, SubjectId, ExamDate, ExamId FROM StudentScoreTrend WHERE ExamId = ?
+            UNION
+            SELECT s.StudentId, s.SubjectId, e.ExamDate, e.ExamId
+            FROM Scores s
+            JOIN Exams e ON s.ExamId = e.ExamId
+            WHERE s.ExamId = ?
+        """, (exam_id, exam_id))
+        cursor.execute("DELETE FROM StudentScoreTrend WHERE ExamId = ?", (exam_id,))
+
+        # 排在该考试后面的下一行：它的上一次考试随该考试一起改变，先删除，写入该考试后重新计算
+        cursor.execute("""
+            INSERT OR IGNORE INTO temp.TrendRefreshFollowing (TrendRowId, StudentId, SubjectId, ExamId)
+            SELECT t.rowid, t.StudentId, t.SubjectId, t.ExamId
+            FROM StudentScoreTrend t
+            WHERE t.rowid IN (
+                SELECT (
+                    SELECT q.rowid FROM StudentScoreTrend q
+                    WHERE q.StudentId = k.StudentId AND q.SubjectId = k.SubjectId
+                      AND (q.ExamDate, q.ExamId) > (k.ExamDate, k.ExamId)
+                    ORDER BY q.ExamDate, q.ExamId
+                    LIMIT 1
+                )
+                FROM temp.TrendRefreshKeys k
+            )
+        """)
+        cursor.execute("DELETE FROM StudentScoreTrend WHERE rowid IN (SELECT TrendRowId FROM temp.TrendRefreshFollowing)")
+
+        cursor.execute(INSERT_TREND_ROWS_SQL.format(source=EXAM_SCORES_SOURCE), (exam_id,))
+        written += cursor.rowcount
+
+        # 考试日期修改后，一个学生一个科目可能有两行后续行，且前一行是后一行的上一次考试，
+        # 因此按考试顺序逐场写入
+        cursor.execute("""
+            SELECT DISTINCT f.ExamId, e.ExamDate
+            FROM temp.TrendRefreshFollowing f
+            JOIN Exams e ON f.ExamId = e.ExamId
+            ORDER BY e.ExamDate, f.ExamId
+        """)
+        for following_exam_id, _ in cursor.fetchall():
+            cursor.execute(INSERT_TREND_ROWS_SQL.format(source=FOLLOWING_SCORES_SOURCE), (following_exam_id,))
+            written += cursor.rowcount
+    return written
+
+
+def rebuild_score_trends(conn):
+    """按全部成绩重建趋势表（不提交事务），返回写入的行数
+
+    考试日期被修改等导入以外的变化后使用；各学生各科目按考试日期依次写入，
+    每场考试的趋势行只依赖排在前面的考试
+    """
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM StudentScoreTrend")
+    cursor.execute("SELECT ExamId FROM Exams ORDER BY ExamDate, ExamId")
+    exam_ids = [row[0] for row in cursor.fetchall()]
+    written = 0
+    for exam_id in exam_ids:
+        cursor.execute(INSERT_TREND_ROWS_SQL.format(source=EXAM_SCORES_SOURCE), (exam_id,))
+        written += cursor.rowcount
+    return written
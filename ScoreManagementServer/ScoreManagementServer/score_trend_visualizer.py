@@ -6,18 +6,27 @@
 """
 
 import sqlite3
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
 from datetime import datetime
-import numpy as np
 import os
 
+from db_connection import connect, READ
+
+# 绘图依赖为可选：未安装时仍可使用文字查询（如批处理命令行 score_cli.py）
+try:
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+    import numpy as np
+    HAS_MATPLOTLIB = True
+except ImportError:
+    HAS_MATPLOTLIB = False
+
 # 数据库路径 - 使用相对路径
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'StudentData.db')
 
 # 设置中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'SimSun']
-plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+if HAS_MATPLOTLIB:
+    plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'SimSun']
+    plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
 
 # 科目映射
 SUBJECT_MAPPING = {
@@ -30,8 +39,7 @@ SUBJECT_MAPPING = {
 
 def connect_db():
     """连接数据库"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = connect(DB_PATH, READ, row_factory=sqlite3.Row)
     return conn
 
 
@@ -48,21 +56,21 @@ def search_student(conn, keyword):
 
 
 def get_score_trend(conn, student_id, subject_id):
-    """获取学生某科目的成绩趋势"""
+    """获取学生某科目的成绩趋势（按索引读取成绩趋势表）"""
     cursor = conn.cursor()
     cursor.execute("""
         SELECT
-            e.ExamId,
+            t.ExamId,
             e.ExamName,
-            e.ExamDate,
-            s.Score,
-            s.ClassRank,
-            s.GradeRank,
-            ROW_NUMBER() OVER (ORDER BY e.ExamDate) as ExamSeq
-        FROM Scores s
-        JOIN Exams e ON s.ExamId = e.ExamId
-        WHERE s.StudentId = ? AND s.SubjectId = ?
-        ORDER BY e.ExamDate
+            t.ExamDate,
+            t.Score,
+            t.ClassRank,
+            t.GradeRank,
+            ROW_NUMBER() OVER (ORDER BY t.ExamDate, t.ExamId) as ExamSeq
+        FROM StudentScoreTrend t
+        JOIN Exams e ON t.ExamId = e.ExamId
+        WHERE t.StudentId = ? AND t.SubjectId = ?
+        ORDER BY t.ExamDate, t.ExamId
     """, (student_id, subject_id))
     return cursor.fetchall()
 
@@ -216,6 +224,10 @@ def main():
     print("        成绩趋势可视化工具")
     print("=" * 60)
 
+    if not HAS_MATPLOTLIB:
+        print("❌ 未安装matplotlib，请先安装: pip install matplotlib")
+        return
+
     conn = connect_db()
 
     try:
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+学生身份索引
+导入开始时一次性加载 Students 表，按学号、(姓名, 班级)、姓名建立内存字典，
+替代导入过程中逐行执行的 SELECT 查询
+"""
+
+
+class StudentIndex:
+    """学生内存索引
+
+    每条学生记录为字典: {'StudentId', 'StudentNumber', 'StudentName', 'ClassName'}
+    同名学生按 StudentId 升序排列，与原先 SELECT 的返回顺序一致。
+    导入过程中插入或修改学生后，需调用 add / update 同步索引。
+    """
+
+    def __init__(self, conn):
+        self.by_id = {}
+        self.by_number = {}
+        self.by_name_class = {}
+        self.by_name = {}
+
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT StudentId, StudentNumber, StudentName, ClassName
+            FROM Students
+            ORDER BY StudentId
+        """)
+        for student_id, number, name, class_name in cursor.fetchall():
+            self.add(student_id, number, name, class_name)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def _index(self, student):
+        if student['StudentNumber']:
+            self.by_number[student['StudentNumber']] = student
+
+        name = student['StudentName']
+        _insert_sorted(self.by_name.setdefault(name, []), student)
+        _insert_sorted(self.by_name_class.setdefault((name, student['ClassName']), []), student)
+
+    def _unindex(self, student):
+        number = student['StudentNumber']
+        if number and self.by_number.get(number) is student:
+            del self.by_number[number]
+
+        name = student['StudentName']
+        _remove(self.by_name, name, student)
+        _remove(self.by_name_class, (name, student['ClassName']), student)
+
+    def add(self, student_id, student_number, student_name, class_name):
+        """新增学生（导入过程中插入学生后调用）"""
+        student = {
+            'StudentId': student_id,
+            'StudentNumber': student_number,
+            'StudentName': student_name,
+            'ClassName': class_name,
+        }
+        self.by_id[student_id] = student
+        self._index(student)
+        return student
+
+    def update(self, student_id, **fields):
+        """修改学生信息（导入过程中 UPDATE 学生后调用）
+
+        fields 可包含 StudentNumber / StudentName / ClassName
+        """
+        student = self.by_id.get(student_id)
+        if student is None:
+            return None
+
+        self._unindex(student)
+        student.update(fields)
+        self._index(student)
+        return student
+
+    def find_by_number(self, student_number):
+        """按学号查找，返回学生记录或 None"""
+        if not student_number:
+            return None
+        return self.by_number.get(student_number)
+
+    def find_by_name_in_class(self, student_name, class_name):
+        """按姓名+班级查找，返回学生记录列表"""
+        return list(self.by_name_class.get((student_name, class_name), []))
+
+    def find_by_name(self, student_name, class_name=None):
+        """按姓名查找，返回学生记录列表
+
+        有班级信息时优先匹配同班学生，同班没找到再去掉班级限制
+        """
+        if class_name:
+            students = self.find_by_name_in_class(student_name, class_name)
+            if students:
+                return students
+        return list(self.by_name.get(student_name, []))
+
+
+def _insert_sorted(students, student):
+    """按 StudentId 升序插入"""
+    students.append(student)
+    if len(students) > 1 and students[-2]['StudentId'] > student['StudentId']:
+        students.sort(key=lambda s: s['StudentId'])
+
+
+def _remove(mapping, key, student):
+    students = mapping.get(key)
+    if not students:
+        return
+    for i, s in enumerate(students):
+        if s is student:
+            del students[i]
+            break
+    if not students:
+        del mapping[key]
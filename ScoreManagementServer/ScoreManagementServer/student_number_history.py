@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+学号历史
+学号变更或因冲突被废弃（Students.StudentNumber 置空）时，把旧学号连同使用期限记入 StudentNumberHistory。
+导入使用旧学号的历史成绩表时按历史记录精确匹配到原来的学生（见 score_staging）：
+考试日期早于学号的停用日期时匹配考试当时使用该学号的学生（即使学号已分配给其他学生），
+否则匹配当前使用该学号的学生，当前没有学生使用的学号再按历史记录匹配。
+学号历史表由迁移脚本 migrations/0003_import_bookkeeping.sql 创建。
+"""
+
+# 停用原因
+CHANGED = 'changed'          # 学生换了新学号
+INVALIDATED = 'invalidated'  # 学号被分配给其他学生，原学生的学号被清空
+
+
+def record_retired_numbers(conn, retired):
+    """记录停用的学号（不提交事务）
+
+    retired: [(StudentId, 旧学号, 停用原因)]
+    使用期限: 从该学生上一次停用学号的日期（即开始使用这个学号的日期，没有记录时为空）到今天
+    """
+    conn.cursor().executemany("""
+        INSERT INTO StudentNumberHistory (StudentId, StudentNumber, EffectiveFrom, EffectiveTo, Reason)
+        VALUES (?, ?, (SELECT MAX(h.EffectiveTo) FROM StudentNumberHistory h WHERE h.StudentId = ?),
+                date('now', 'localtime'), ?)
+    """, [(student_id, number, student_id, reason) for student_id, number, reason in retired])
+
+
+def holder_at_date_sql(number_expr, date_expr):
+    """考试当时使用该学号、之后停用了该学号的学生的子查询SQL（考试日期不早于所有停用日期或日期未知时为空）
+
+    学号停用后可能已分配给其他学生，因此匹配学号时先用这个子查询，再匹配当前使用该学号的学生；
+    同一个学号先后被多名学生使用过时取考试之后最早停用的一个
+    """
+    return f"""
+        SELECT h.StudentId FROM StudentNumberHistory h
+        WHERE h.StudentNumber = {number_expr} AND h.EffectiveTo > {date_expr}
+        ORDER BY h.EffectiveTo, h.HistoryId
+        LIMIT 1
+    """
+
+
+def historical_student_sql(number_expr, date_expr):
+    """按历史学号查找学生的子查询SQL
+
+    同一个学号先后被多名学生使用过时：取考试日期当天仍在使用该学号的学生
+    （停用日期不早于考试日期中最早停用的一个）；考试晚于所有停用日期或日期未知时取最后一个使用者
+    """
+    return f"""
+        SELECT h.StudentId FROM StudentNumberHistory h
+        WHERE h.StudentNumber = {number_expr}
+        ORDER BY h.EffectiveTo < {date_expr},
+                 CASE WHEN h.EffectiveTo >= {date_expr} THEN h.EffectiveTo END,
+                 h.EffectiveTo DESC, h.HistoryId DESC
+        LIMIT 1
+    """
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""测试公共设置：公共模块和限时练脚本所在目录加入 sys.path"""
+
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (BASE_DIR, os.path.join(BASE_DIR, 'ScoreManagementServer')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+import openpyxl
+import pytest
+
+from db_connection import connect
+
+# 测试数据库中的班级和每班学生数；学号为 班级序号 + 两位序号，如 101
+CLASSES = ('1班', '2班')
+STUDENTS_PER_CLASS = 6
+
+
+def student_rows():
+    """[(学号, 姓名, 班级)]"""
+    return [(f'{c}{i:02d}', f'学生{c}{i:02d}', class_name)
+            for c, class_name in enumerate(CLASSES, 1) for i in range(STUDENTS_PER_CLASS)]
+
+
+def create_exam_db(db_path):
+    """新建数据库，写入 CLASSES 的学生和一场考试（ExamId = 1），返回连接"""
+    conn = connect(str(db_path))
+    conn.executemany("INSERT INTO Students (StudentNumber, StudentName, ClassName) VALUES (?, ?, ?)",
+                     student_rows())
+    conn.execute("""
+        INSERT INTO Exams (ExamId, ExamName, ExamType, ExamDate, GradeName)
+        VALUES (1, '期中', '期中考', '2024-11-01', '高一')
+    """)
+    conn.commit()
+    return conn
+
+
+@pytest.fixture
+def exam_db(tmp_path):
+    conn = create_exam_db(tmp_path / 'StudentData.db')
+    yield conn
+    conn.close()
+
+
+def write_sheet(path, rows, headers=('学号', '姓名', '班级', '语文', '数学')):
+    """写一个单sheet的工作簿（默认为成绩表的表头），rows 为与 headers 对应的行"""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(list(headers))
+    for row in rows:
+        ws.append(list(row))
+    wb.save(path)
+    return str(path)
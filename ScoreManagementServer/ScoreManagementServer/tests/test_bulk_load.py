@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""批量写入模式：模式内时间戳触发器不执行，模式外单条修改仍由触发器更新时间戳；导入失败后触发器照常执行"""
+
+import pytest
+
+from bulk_load import bulk_load
+
+STAMP = '2000-01-01 00:00:00'
+
+
+def add_score(conn):
+    conn.execute("INSERT INTO Scores (ExamId, StudentId, SubjectId, Score, UpdatedAt) VALUES (1, 1, 1, 90, ?)",
+                 (STAMP,))
+    conn.commit()
+
+
+def updated_at(conn):
+    return conn.execute("SELECT UpdatedAt FROM Scores").fetchone()[0]
+
+
+def bulk_mode(conn):
+    return conn.execute("SELECT COUNT(*) FROM BulkLoadMode").fetchone()[0]
+
+
+def test_trigger_stamps_single_updates(exam_db):
+    add_score(exam_db)
+    exam_db.execute("UPDATE Scores SET Score = 95")
+    assert updated_at(exam_db) != STAMP
+
+
+def test_trigger_is_skipped_in_bulk_mode(exam_db):
+    add_score(exam_db)
+    with bulk_load(exam_db):
+        # 导入语句自己写时间戳，触发器不再覆盖
+        exam_db.execute("UPDATE Scores SET Score = 95, UpdatedAt = ?", (STAMP,))
+        assert bulk_mode(exam_db) == 1
+    assert updated_at(exam_db) == STAMP
+    assert bulk_mode(exam_db) == 0
+
+
+def test_nested_bulk_mode_ends_at_outermost_exit(exam_db):
+    with bulk_load(exam_db):
+        with bulk_load(exam_db):
+            pass
+        assert bulk_mode(exam_db) == 1
+    assert bulk_mode(exam_db) == 0
+
+
+def test_failed_import_leaves_triggers_active(exam_db):
+    add_score(exam_db)
+    with pytest.raises(RuntimeError):
+        with bulk_load(exam_db):
+            raise RuntimeError('模拟导入失败')
+    exam_db.rollback()
+    assert bulk_mode(exam_db) == 0
+    exam_db.execute("UPDATE Scores SET Score = 95")
+    assert updated_at(exam_db) != STAMP
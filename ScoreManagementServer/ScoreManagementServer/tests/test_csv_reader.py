@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""CSV/TSV 读取：编码和分隔符识别、空单元格、短行补齐；CSV成绩表按xlsx同样的流程导入"""
+
+import pytest
+
+import excel_to_sqlite_v2
+from conftest import student_rows
+from xlsx_reader import open_workbook
+
+ROWS = [['学号', '姓名', '语文'], ['0101', '张三', '95'], ['0102', '李四', ''], ['0103', '王五']]
+
+
+def write_text(path, rows, delimiter=',', encoding='utf-8'):
+    path.write_bytes('\r\n'.join(delimiter.join(row) for row in rows).encode(encoding))
+    return str(path)
+
+
+@pytest.mark.parametrize('name, delimiter, encoding, expected_encoding', [
+    ('scores.csv', ',', 'utf-8', 'utf-8'),
+    ('scores.csv', ',', 'utf-8-sig', 'utf-8-sig'),
+    ('scores.csv', ';', 'gbk', 'gb18030'),
+    ('scores.tsv', '\t', 'utf-8', 'utf-8'),
+])
+def test_reads_rows(tmp_path, name, delimiter, encoding, expected_encoding):
+    path = write_text(tmp_path / name, ROWS, delimiter, encoding)
+    wb = open_workbook(path, 'openpyxl')     # CSV 不论选择哪个后端都用 csv 模块读取
+    try:
+        assert wb.backend == 'csv'
+        assert (wb.encoding, wb.delimiter) == (expected_encoding, delimiter)
+        assert wb.sheetnames == ['scores']
+        ws = wb.active
+        assert ws.max_row == len(ROWS)
+        # 空单元格读作 None，短行补齐到表头列数，学号保留前导0
+        assert list(ws.iter_rows(min_row=2, values_only=True)) == [
+            ('0101', '张三', '95'), ('0102', '李四', None), ('0103', '王五', None),
+        ]
+        assert list(ws.iter_rows(min_row=2, max_row=2, values_only=True)) == [('0101', '张三', '95')]
+    finally:
+        wb.close()
+
+
+def test_imports_gbk_score_file(tmp_path, exam_db):
+    rows = [['学号', '姓名', '班级', '语文', '数学']] + [
+        [number, name, class_name, str(100 + i), str(90 + i)]
+        for i, (number, name, class_name) in enumerate(student_rows())]
+    path = write_text(tmp_path / 'scores.csv', rows, encoding='gbk')
+
+    students = len(student_rows())
+    assert excel_to_sqlite_v2.import_scores_file(exam_db, path, 1) == (2 * students, 0)
+    assert exam_db.execute("""
+        SELECT s.Score FROM Scores s JOIN Students st ON st.StudentId = s.StudentId
+        WHERE st.StudentNumber = ? AND s.SubjectId = 1
+    """, (student_rows()[-1][0],)).fetchone() == (100.0 + students - 1,)
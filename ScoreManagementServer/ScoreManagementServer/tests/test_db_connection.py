@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""db_connection: 查询连接也会把旧数据库升级到最新结构"""
+
+import shutil
+import sqlite3
+
+from conftest import BASE_DIR
+from db_connection import connect, READ
+from schema_migrations import latest_version, schema_version
+
+
+def test_read_profile_migrates_version_0_database(tmp_path):
+    db_path = str(tmp_path / 'StudentData.db')
+    shutil.copy(f'{BASE_DIR}/StudentData.db', db_path)
+    with sqlite3.connect(db_path) as conn:
+        assert schema_version(conn) == 0
+
+    conn = connect(db_path, READ)
+    try:
+        assert schema_version(conn) == latest_version()
+        # 迁移后新增的汇总表可以直接查询
+        conn.execute("SELECT COUNT(*) FROM ExamClassSubjectStats").fetchone()
+        conn.execute("SELECT COUNT(*) FROM StudentScoreTrend").fetchone()
+    finally:
+        conn.close()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""批量导入：每个sheet解析完即写入暂存表；多场考试、多进程解析"""
+
+import folder_import
+from conftest import CLASSES, student_rows, write_sheet
+
+
+def write_class_sheets(folder, score=100):
+    """每个班一个成绩表，返回文件列表"""
+    folder.mkdir(exist_ok=True)
+    return [write_sheet(folder / f'{class_name}.xlsx',
+                        [(number, name, class_name, score + i, score - i)
+                         for i, (number, name, _) in enumerate(row for row in student_rows() if row[2] == class_name)])
+            for class_name in CLASSES]
+
+
+def add_exam(conn, exam_id):
+    conn.execute("""
+        INSERT INTO Exams (ExamId, ExamName, ExamType, ExamDate, GradeName)
+        VALUES (?, '月考', '月考', '2024-12-01', '高一')
+    """, (exam_id,))
+    conn.commit()
+
+
+def test_sheets_are_staged_as_they_are_parsed(tmp_path, exam_db, monkeypatch):
+    write_class_sheets(tmp_path / 'scores')
+    events = []
+    parse = folder_import.parse_score_workbook
+    stage = folder_import.stage_parsed_workbook
+
+    def parse_logged(*args):
+        events.append('parse')
+        return parse(*args)
+
+    def stage_logged(*args):
+        events.append('stage')
+        return stage(*args)
+
+    monkeypatch.setattr(folder_import, 'parse_score_workbook', parse_logged)
+    monkeypatch.setattr(folder_import, 'stage_parsed_workbook', stage_logged)
+    folder_import.import_score_folder(str(tmp_path / 'scores'), 1, workers=1, conn=exam_db)
+    assert events == ['parse', 'stage'] * len(CLASSES)
+
+
+def test_multiple_exams_with_worker_processes(tmp_path, exam_db):
+    add_exam(exam_db, 2)
+    first = tmp_path / 'first'
+    write_class_sheets(first, 100)
+    second = write_class_sheets(tmp_path / 'second', 80)
+    jobs = [(1, str(first), None), (2, second[0], None), (2, second[1], None)]
+
+    students = len(student_rows())
+    assert folder_import.import_score_jobs(jobs, workers=2, conn=exam_db) == (2 * 2 * students, 0)
+    assert exam_db.execute("""
+        SELECT ExamId, COUNT(*), MAX(Score) FROM Scores WHERE SubjectId != 10 GROUP BY ExamId
+    """).fetchall() == [(1, 2 * students, 105.0), (2, 2 * students, 85.0)]
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""导入清单：分块导入中断后从断点继续，清单仍覆盖整个sheet；数据库中成绩已改变的行不按清单跳过"""
+
+import openpyxl
+
+import excel_to_sqlite_v2
+import folder_import
+import import_manifest
+import import_progress
+from conftest import CLASSES, create_exam_db, student_rows, write_sheet
+from score_staging import ScoreStaging
+
+
+def score_rows():
+    return [(number, name, class_name, 100 + i, 90 + i)
+            for i, (number, name, class_name) in enumerate(student_rows())]
+
+
+def manifest(conn):
+    """(RowCount, 行哈希条数, SheetHash)"""
+    row_count, sheet_hash = conn.execute("SELECT RowCount, SheetHash FROM ImportManifest").fetchone()
+    rows = conn.execute("SELECT COUNT(*) FROM ImportRowManifest").fetchone()[0]
+    return row_count, rows, sheet_hash
+
+
+def test_resumed_import_keeps_manifest_of_committed_chunks(tmp_path, exam_db, monkeypatch):
+    path = write_sheet(tmp_path / 'scores.xlsx', score_rows())
+    total = len(score_rows())
+    merge = ScoreStaging.merge
+    merges = []
+
+    def merge_failing_second_chunk(self, exam_id):
+        merges.append(exam_id)
+        if len(merges) == 2:
+            raise RuntimeError('模拟导入中断')
+        return merge(self, exam_id)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ScoreStaging, 'merge', merge_failing_second_chunk)
+        assert excel_to_sqlite_v2.import_scores_file(exam_db, path, 1, chunk_rows=5) is None
+
+    # 从断点继续导入剩余的行（每行两科）
+    assert excel_to_sqlite_v2.import_scores_file(exam_db, path, 1, chunk_rows=5) == (2 * (total - 5), 0)
+    row_count, rows, sheet_hash = manifest(exam_db)
+    assert row_count == rows == total
+
+    # 与一次导入完成的清单相同
+    other = create_exam_db(tmp_path / 'other.db')
+    try:
+        excel_to_sqlite_v2.import_scores_file(other, path, 1, chunk_rows=5)
+        assert manifest(other) == (total, total, sheet_hash)
+    finally:
+        other.close()
+
+    # 再次导入同一文件时所有行都按行哈希整行跳过
+    unchanged = []
+
+    def merge_counting_unchanged(self, exam_id):
+        merge(self, exam_id)
+        unchanged.append(exam_db.execute("SELECT COUNT(*) FROM StagingScores WHERE Status = 'unchanged'").fetchone()[0])
+
+    monkeypatch.setattr(ScoreStaging, 'merge', merge_counting_unchanged)
+    excel_to_sqlite_v2.import_scores_file(exam_db, path, 1, chunk_rows=5)
+    assert sum(unchanged) == total
+
+
+def scores(conn):
+    return conn.execute("SELECT StudentId, SubjectId, Score FROM Scores ORDER BY StudentId, SubjectId").fetchall()
+
+
+def test_unchanged_file_rewrites_deleted_scores(tmp_path, exam_db):
+    path = write_sheet(tmp_path / 'scores.xlsx', score_rows())
+    excel_to_sqlite_v2.import_scores_file(exam_db, path, 1)
+    imported = scores(exam_db)
+
+    # 清单与文件相同，但成绩已被删除：整行跳过会丢失这些成绩
+    exam_db.execute("DELETE FROM Scores")
+    exam_db.commit()
+    assert excel_to_sqlite_v2.import_scores_file(exam_db, path, 1) == (len(imported), 0)
+    assert scores(exam_db) == imported
+
+
+def test_reimport_after_other_file_restores_scores(tmp_path, exam_db):
+    first = write_sheet(tmp_path / 'scores.xlsx', score_rows())
+    excel_to_sqlite_v2.import_scores_file(exam_db, first, 1)
+    imported = scores(exam_db)
+
+    # 另一个文件（不同的清单）改了成绩，再导入第一个文件时成绩要改回来
+    edited = [(number, name, class_name, chinese - 50, math)
+              for number, name, class_name, chinese, math in score_rows()]
+    excel_to_sqlite_v2.import_scores_file(exam_db, write_sheet(tmp_path / 'edited.xlsx', edited), 1)
+    assert scores(exam_db) != imported
+
+    excel_to_sqlite_v2.import_scores_file(exam_db, first, 1)
+    assert scores(exam_db) == imported
+
+
+def write_two_sheets(path):
+    """两个班各一个sheet的工作簿"""
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for class_name in CLASSES:
+        ws = wb.create_sheet(class_name)
+        ws.append(['学号', '姓名', '班级', '语文', '数学'])
+        for row in score_rows():
+            if row[2] == class_name:
+                ws.append(list(row))
+    wb.save(path)
+    return str(path)
+
+
+def count_file_hashes(monkeypatch, *modules):
+    calls = []
+    file_hash = import_manifest.file_hash
+
+    def counting_hash(path):
+        calls.append(path)
+        return file_hash(path)
+
+    for module in modules:
+        monkeypatch.setattr(module, 'file_hash', counting_hash)
+    return calls
+
+
+def test_workbook_is_hashed_once(tmp_path, exam_db, monkeypatch):
+    path = write_two_sheets(tmp_path / 'scores.xlsx')
+
+    calls = count_file_hashes(monkeypatch, import_manifest, import_progress)
+    excel_to_sqlite_v2.import_scores_file(exam_db, path, 1)
+    assert calls == [path]
+
+    calls = count_file_hashes(monkeypatch, import_manifest, folder_import)
+    folder_import.import_score_folder(str(tmp_path), 1, workers=1, conn=exam_db)
+    assert calls == [path]
+    assert exam_db.execute("SELECT COUNT(*) FROM ImportManifest").fetchone()[0] == len(CLASSES)
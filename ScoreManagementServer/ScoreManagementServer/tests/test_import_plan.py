@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""学生信息导入：无法导入的行单独计入失败，其余行照常写入"""
+
+import excel_to_sqlite_v2
+from conftest import write_sheet
+from import_plan import StudentImportPlan
+
+HEADERS = ('学号', '姓名', '班级')
+
+
+def student_numbers(conn):
+    return {number for (number,) in conn.execute("SELECT StudentNumber FROM Students")}
+
+
+def test_plan_rejects_rows_without_number_or_name(exam_db):
+    plan = StudentImportPlan(exam_db)
+    assert plan.add_row('901', '新生甲', '1班')
+    assert not plan.add_row('902', None, '1班')
+    assert not plan.clean
+    assert plan.write() == (1, 0, 1)
+    assert '901' in student_numbers(exam_db)
+
+
+def test_failed_row_does_not_roll_back_file(tmp_path, exam_db):
+    # 模拟一行写入时违反约束
+    exam_db.execute("""
+        CREATE TRIGGER reject_student BEFORE INSERT ON Students WHEN NEW.StudentNumber = '902'
+        BEGIN SELECT RAISE(ABORT, '模拟写入失败'); END
+    """)
+    exam_db.commit()
+    path = write_sheet(tmp_path / 'students.xlsx', [
+        ('901', '新生甲', '1班'),
+        ('902', '新生乙', '1班'),
+        ('903', '新生丙', '2班'),
+        ('100', '学生100', '2班'),          # 已有学生，调到2班
+    ], headers=HEADERS)
+
+    assert excel_to_sqlite_v2.import_students_file(exam_db, path) == (2, 1, 1)
+    numbers = student_numbers(exam_db)
+    assert {'901', '903'} <= numbers and '902' not in numbers
+    assert exam_db.execute("SELECT ClassName FROM Students WHERE StudentNumber = '100'").fetchone()[0] == '2班'
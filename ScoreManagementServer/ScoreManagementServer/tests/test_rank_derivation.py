@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""排名计算：之后导入的没有排名列的成绩表不覆盖之前成绩表提供的排名，但重新计算之前计算出的排名；
+计算出的排名不算作成绩改变"""
+
+import excel_to_sqlite_v2
+from conftest import CLASSES, student_rows, write_sheet
+from score_staging import ScoreStaging
+
+CHINESE = 1
+
+
+def ranks(conn, class_name):
+    return conn.execute("""
+        SELECT st.StudentNumber, s.ClassRank, s.GradeRank
+        FROM Scores s JOIN Students st ON st.StudentId = s.StudentId
+        WHERE s.ExamId = 1 AND s.SubjectId = ? AND st.ClassName = ?
+        ORDER BY st.StudentNumber
+    """, (CHINESE, class_name)).fetchall()
+
+
+def test_supplied_ranks_survive_rankless_import(tmp_path, exam_db):
+    first, second = ([row for row in student_rows() if row[2] == class_name] for class_name in CLASSES)
+
+    # 1班的成绩表提供排名（与按分数计算的结果不同）
+    supplied = [(number, name, class_name, 100 + i, i + 1, 50 + i)
+                for i, (number, name, class_name) in enumerate(first)]
+    path = write_sheet(tmp_path / '1班.xlsx', supplied,
+                                headers=('学号', '姓名', '班级', '语文', '班级排名', '年级排名'))
+    excel_to_sqlite_v2.import_scores_file(exam_db, path, 1)
+    expected = [(number, class_rank, grade_rank) for number, _, _, _, class_rank, grade_rank in supplied]
+    assert ranks(exam_db, CLASSES[0]) == expected
+
+    # 2班的成绩表没有排名列：只为2班计算排名
+    rankless = [(number, name, class_name, 120 + i) for i, (number, name, class_name) in enumerate(second)]
+    path = write_sheet(tmp_path / '2班.xlsx', rankless, headers=('学号', '姓名', '班级', '语文'))
+    excel_to_sqlite_v2.import_scores_file(exam_db, path, 1)
+
+    assert ranks(exam_db, CLASSES[0]) == expected
+    count = len(second)
+    assert ranks(exam_db, CLASSES[1]) == [(number, count - i, count - i) for i, (number, _, _) in enumerate(second)]
+
+
+def test_rankless_rows_match_derived_ranks(tmp_path, exam_db):
+    rows = [(number, name, class_name, 100 + i) for i, (number, name, class_name) in enumerate(student_rows())]
+    path = write_sheet(tmp_path / 'scores.xlsx', rows, headers=('学号', '姓名', '班级', '语文'))
+    excel_to_sqlite_v2.import_scores_file(exam_db, path, 1)
+    assert all(class_rank and grade_rank for _, class_rank, grade_rank in ranks(exam_db, CLASSES[0]))
+
+    # 同样没有排名列的成绩与已有成绩比较时不比较计算出的排名
+    staging = ScoreStaging(exam_db)
+    for row_no, (number, name, class_name, score) in enumerate(rows, 1):
+        staging.add_row('scores.xlsx', row_no, {'学号': 0}, (number, name, class_name, [('语文', CHINESE, score, None, None)]))
+    assert staging.merge(1) == 0
+    stats = staging.summary()['scores.xlsx']
+    assert (stats['updated'], stats['unchanged']) == (0, len(rows))
+
+
+def test_derived_ranks_are_recomputed(tmp_path, exam_db):
+    # 两个班分别导入没有排名列的成绩表，2班分数都高于1班
+    for c, class_name in enumerate(CLASSES):
+        rows = [(number, name, class_name, 60 + 20 * c + i)
+                for i, (number, name, _) in enumerate(row for row in student_rows() if row[2] == class_name)]
+        path = write_sheet(tmp_path / f'{class_name}.xlsx', rows, headers=('学号', '姓名', '班级', '语文'))
+        excel_to_sqlite_v2.import_scores_file(exam_db, path, 1)
+
+    # 先导入的1班的年级排名按两个班重新计算
+    count = len(student_rows()) // len(CLASSES)
+    first = ranks(exam_db, CLASSES[0])
+    assert [grade_rank for _, _, grade_rank in first] == [2 * count - i for i in range(count)]
+    assert [class_rank for _, class_rank, _ in first] == [count - i for i in range(count)]
+    assert [grade_rank for _, _, grade_rank in ranks(exam_db, CLASSES[1])] == [count - i for i in range(count)]
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""花名册同步：学号/班级变更、学号转移给新学生、停用学号记入历史；写入失败的学生计入失败"""
+
+import excel_to_sqlite_v2
+from conftest import write_sheet
+
+ROSTER_HEADERS = ('学号', '姓名', '班级')
+
+
+def student(conn, name):
+    return conn.execute("SELECT StudentNumber, ClassName FROM Students WHERE StudentName = ?", (name,)).fetchone()
+
+
+def test_roster_changes(tmp_path, exam_db):
+    path = write_sheet(tmp_path / 'roster.xlsx', [
+        ('101', '学生101', '2班'),    # 调班
+        ('199', '学生102', '1班'),    # 换学号
+        ('102', '新同学', '1班'),     # 新学生使用学生102的旧学号
+        ('103', '学生103', '1班'),    # 无变化
+    ], headers=ROSTER_HEADERS)
+
+    assert excel_to_sqlite_v2.update_students_file(exam_db, path) == (1, 2, 1, 0)
+    assert student(exam_db, '学生101') == ('101', '2班')
+    assert student(exam_db, '学生102') == ('199', '1班')
+    assert student(exam_db, '新同学') == ('102', '1班')
+    assert exam_db.execute("""
+        SELECT st.StudentName, h.Reason FROM StudentNumberHistory h JOIN Students st ON st.StudentId = h.StudentId
+        WHERE h.StudentNumber = '102'
+    """).fetchall() == [('学生102', 'changed')]
+
+
+def test_failed_student_is_counted(tmp_path, exam_db):
+    exam_db.execute("""
+        CREATE TEMP TRIGGER fail_insert BEFORE INSERT ON Students WHEN NEW.StudentName = '写入失败'
+        BEGIN SELECT RAISE(ABORT, '模拟写入失败'); END
+    """)
+    path = write_sheet(tmp_path / 'roster.xlsx', [
+        ('301', '写入失败', '1班'),
+        ('302', '新同学', '1班'),
+    ], headers=ROSTER_HEADERS)
+
+    # 失败的学生单独回滚，其余学生照常写入
+    assert excel_to_sqlite_v2.update_students_file(exam_db, path) == (1, 0, 0, 1)
+    assert student(exam_db, '写入失败') is None
+    assert student(exam_db, '新同学') == ('302', '1班')
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""数据库迁移：旧数据库（无版本号）和中间版本的数据库升级后与新建数据库结构相同，数据保留"""
+
+import shutil
+import sqlite3
+
+import pytest
+
+from conftest import BASE_DIR
+from db_connection import connect
+from schema_migrations import (
+    LEGACY_MIGRATIONS, latest_version, list_migrations, migrate, read_schema, register_functions,
+    run_migration, schema_version,
+)
+
+LEGACY_TABLES = ('Students', 'Exams', 'Subjects', 'Scores', 'TimeLimitExams', 'TimeLimitScores')
+
+
+def fresh_schema(tmp_path):
+    conn = connect(str(tmp_path / 'fresh.db'))
+    try:
+        return read_schema(conn)
+    finally:
+        conn.close()
+
+
+def row_counts(conn):
+    return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in LEGACY_TABLES}
+
+
+def test_legacy_database_matches_fresh_schema(tmp_path):
+    db_path = str(tmp_path / 'StudentData.db')
+    shutil.copy(f'{BASE_DIR}/StudentData.db', db_path)
+    with sqlite3.connect(db_path) as conn:
+        assert schema_version(conn) == 0
+        counts = row_counts(conn)
+    conn.close()
+
+    conn = connect(db_path)
+    try:
+        assert schema_version(conn) == latest_version()
+        assert read_schema(conn) == fresh_schema(tmp_path)
+        assert row_counts(conn) == counts
+        assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+    finally:
+        conn.close()
+
+
+def test_intermediate_version_upgrades_to_fresh_schema(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'old.db'))
+    register_functions(conn)
+    for version, name, path in list_migrations()[:LEGACY_MIGRATIONS]:
+        run_migration(conn, version, path)
+
+    try:
+        assert migrate(conn, verbose=False) == latest_version()
+        assert read_schema(conn) == fresh_schema(tmp_path)
+        # 已是最新版本时不再执行任何脚本
+        assert migrate(conn, verbose=False) == latest_version()
+    finally:
+        conn.close()
+
+
+def test_failed_migration_rolls_back(tmp_path):
+    script = tmp_path / '0099_broken.sql'
+    script.write_text("CREATE TABLE Partial (Id INTEGER);\nINSERT INTO Missing VALUES (1);\n", encoding='utf-8')
+    conn = sqlite3.connect(':memory:')
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            run_migration(conn, 99, str(script))
+        assert schema_version(conn) == 0
+        assert read_schema(conn) == {}
+    finally:
+        conn.close()
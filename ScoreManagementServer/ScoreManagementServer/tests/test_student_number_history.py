@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""学号历史：学号停用后分配给其他学生时，停用前的考试成绩仍匹配到原来的学生"""
+
+import excel_to_sqlite_v2
+from conftest import write_sheet
+from score_staging import TimeLimitStaging
+
+NUMBER = '101'
+
+
+def reassign_number(conn, retired_on='2025-01-01'):
+    """学号 NUMBER 在 retired_on 停用并分配给新学生，返回 (原学生ID, 新学生ID)"""
+    old_id = conn.execute("SELECT StudentId FROM Students WHERE StudentNumber = ?", (NUMBER,)).fetchone()[0]
+    conn.execute("UPDATE Students SET StudentNumber = NULL WHERE StudentId = ?", (old_id,))
+    conn.execute("""
+        INSERT INTO StudentNumberHistory (StudentId, StudentNumber, EffectiveTo, Reason)
+        VALUES (?, ?, ?, 'invalidated')
+    """, (old_id, NUMBER, retired_on))
+    new_id = conn.execute("INSERT INTO Students (StudentNumber, StudentName, ClassName) VALUES (?, '新同学', '1班')",
+                          (NUMBER,)).lastrowid
+    conn.execute("""
+        INSERT INTO Exams (ExamId, ExamName, ExamType, ExamDate, GradeName)
+        VALUES (2, '期末', '期末考', '2025-03-01', '高一')
+    """)
+    conn.commit()
+    return old_id, new_id
+
+
+def import_number(conn, tmp_path, exam_id):
+    path = write_sheet(tmp_path / f'exam{exam_id}.xlsx', [(NUMBER, '', '1班', 90, 80)])
+    excel_to_sqlite_v2.import_scores_file(conn, path, exam_id)
+    return {row[0] for row in conn.execute("SELECT StudentId FROM Scores WHERE ExamId = ?", (exam_id,))}
+
+
+def test_exam_before_retirement_matches_former_holder(tmp_path, exam_db):
+    old_id, new_id = reassign_number(exam_db)
+    # 考试（2024-11-01）早于学号停用日期：成绩属于当时使用该学号的学生
+    assert import_number(exam_db, tmp_path, 1) == {old_id}
+    # 停用之后的考试匹配当前使用该学号的学生
+    assert import_number(exam_db, tmp_path, 2) == {new_id}
+
+
+def test_retired_number_matches_last_holder(tmp_path, exam_db):
+    old_id, new_id = reassign_number(exam_db)
+    exam_db.execute("DELETE FROM Students WHERE StudentId = ?", (new_id,))
+    exam_db.commit()
+    # 学号没有学生使用时，停用之后的考试按历史匹配最后使用该学号的学生
+    assert import_number(exam_db, tmp_path, 2) == {old_id}
+
+
+def test_time_limit_exam_before_retirement_matches_former_holder(exam_db):
+    old_id, new_id = reassign_number(exam_db)
+    for exam_date in ('2024-12-16', '2025-03-16'):
+        exam_db.execute("""
+            INSERT INTO TimeLimitExams (ExamName, ExamDate, SubjectName, SubjectId, GradeName)
+            VALUES ('物理限时练', ?, '物理', 5, '高一')
+        """, (exam_date,))
+
+    matched = []
+    for exam_id in (1, 2):
+        staging = TimeLimitStaging(exam_db)
+        staging.add_row('1班', 1, NUMBER, None, '1班', 90, False, None, None)
+        assert staging.plan('1班', exam_id) == (1, 0)
+        matched.append(exam_db.execute("SELECT StudentId FROM StagingTimeLimitScores").fetchone()[0])
+    assert matched == [old_id, new_id]
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""限时练导入：回滚的sheet不记为已完成；没有 <dimension> 的工作簿按实际读取的行记录断点；时间戳使用本地时间"""
+
+import re
+import sqlite3
+import time
+import zipfile
+
+import openpyxl
+import pytest
+
+import time_limit_exam_importer as importer
+from db_connection import connect
+from score_staging import TimeLimitStaging
+
+FILE_NAME = '3.高一一级部物理限时练12.16-成绩排名-学生明细.xlsx'
+CLASSES = ('1班', '2班')
+STUDENTS_PER_CLASS = 3
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = connect(str(tmp_path / 'StudentData.db'), row_factory=sqlite3.Row)
+    conn.executemany("INSERT INTO Students (StudentNumber, StudentName, ClassName) VALUES (?, ?, ?)", [
+        (f'{c}{i}', f'学生{c}{i}', class_name)
+        for c, class_name in enumerate(CLASSES, 1) for i in range(STUDENTS_PER_CLASS)
+    ])
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def write_workbook(path, strip_dimension=False):
+    """每个班级一个sheet：第1行标题，第2、3行表头，第4行起为数据"""
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for c, class_name in enumerate(CLASSES, 1):
+        ws = wb.create_sheet(class_name)
+        ws.append(['物理限时练'])
+        ws.append(['学号', '姓名', '物理', None, None])
+        ws.append([None, None, '成绩', '班级排名', '年级排名'])
+        for i in range(STUDENTS_PER_CLASS):
+            ws.append([f'{c}{i}', f'学生{c}{i}', 60 + i, STUDENTS_PER_CLASS - i, c * 10 + i])
+    wb.save(path)
+
+    if strip_dimension:
+        with zipfile.ZipFile(path) as src:
+            items = [(info, src.read(info)) for info in src.infolist()]
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as dst:
+            for info, data in items:
+                if info.filename.startswith('xl/worksheets/'):
+                    data = re.sub(rb'<dimension ref="[^"]*"\s*/>', b'', data)
+                dst.writestr(info, data)
+    return str(path)
+
+
+def abort_after_sheets(monkeypatch):
+    """所有sheet处理完后中断导入，断点保留在数据库中"""
+    def fail(*args, **kwargs):
+        raise RuntimeError('模拟导入中断')
+    monkeypatch.setattr(importer, 'derive_exam_ranks', fail)
+
+
+def progress(conn):
+    return {row['SheetName']: (row['LastRow'], row['Status'])
+            for row in conn.execute("SELECT SheetName, LastRow, Status FROM ImportProgress")}
+
+
+def time_limit_scores(conn):
+    return conn.execute("SELECT COUNT(*) FROM TimeLimitScores").fetchone()[0]
+
+
+def test_rolled_back_sheet_is_not_marked_done(tmp_path, conn, monkeypatch):
+    path = write_workbook(tmp_path / FILE_NAME)
+    merge = TimeLimitStaging.merge
+
+    def merge_failing_second_sheet(self, source, exam_id, subject_id):
+        if source == '2班':
+            raise RuntimeError('模拟sheet出错')
+        return merge(self, source, exam_id, subject_id)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(TimeLimitStaging, 'merge', merge_failing_second_sheet)
+        abort_after_sheets(patch)
+        assert importer.import_time_limit_excel(path, conn=conn) is None
+
+    assert progress(conn) == {'1班': (3 + STUDENTS_PER_CLASS, 'done')}
+    assert time_limit_scores(conn) == STUDENTS_PER_CLASS
+
+    # 继续导入时跳过已完成的sheet，重新处理回滚的sheet
+    assert importer.import_time_limit_excel(path, conn=conn) == (STUDENTS_PER_CLASS, 0)
+    assert time_limit_scores(conn) == len(CLASSES) * STUDENTS_PER_CLASS
+    assert progress(conn) == {}
+
+
+def test_checkpoint_without_dimension_records_rows_read(tmp_path, conn, monkeypatch):
+    path = write_workbook(tmp_path / FILE_NAME, strip_dimension=True)
+    wb = importer.open_workbook(path, 'fast')
+    assert wb['1班'].max_row is None
+    wb.close()
+
+    abort_after_sheets(monkeypatch)
+    assert importer.import_time_limit_excel(path, backend='fast', conn=conn) is None
+    assert progress(conn) == {class_name: (3 + STUDENTS_PER_CLASS, 'done') for class_name in CLASSES}
+
+
+@pytest.mark.skipif(not hasattr(time, 'tzset'), reason='time.tzset 只在 Unix 上可用')
+def test_reimport_stamps_local_time(tmp_path, conn, monkeypatch):
+    # 本地时间与UTC不同的时区
+    monkeypatch.setenv('TZ', 'Asia/Shanghai')
+    time.tzset()
+    try:
+        path = write_workbook(tmp_path / FILE_NAME)
+        importer.import_time_limit_excel(path, conn=conn)
+        conn.execute("UPDATE TimeLimitScores SET UpdatedAt = NULL")
+        conn.commit()
+
+        # 重新导入时更新已有成绩（UPSERT）：时间戳与其他表相同，使用本地时间
+        local_now = "SELECT datetime('now', 'localtime')"
+        before = conn.execute(local_now).fetchone()[0]
+        importer.import_time_limit_excel(path, conn=conn)
+        after = conn.execute(local_now).fetchone()[0]
+        stamps = [row[0] for row in conn.execute("SELECT UpdatedAt FROM TimeLimitScores")]
+        assert stamps and all(before <= stamp <= after for stamp in stamps)
+    finally:
+        monkeypatch.undo()
+        time.tzset()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""限时练自动导入：文件写完（大小和修改时间稳定）才导入；同一内容的文件只导入一次"""
+
+import os
+import shutil
+
+import time_limit_watcher as watcher
+from test_time_limit_import import FILE_NAME, conn, write_workbook  # noqa: F401 (conn 为 fixture)
+from xlsx_reader import DEFAULT_BACKEND
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_scan_waits_until_file_settles(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(watcher.time, 'monotonic', clock)
+    path = tmp_path / 'scores.xlsx'
+    path.write_bytes(b'x' * 10)
+    (tmp_path / '~$scores.xlsx').write_bytes(b'lock')
+    (tmp_path / 'notes.txt').write_bytes(b'text')
+
+    folder = watcher.FolderWatcher(str(tmp_path), settle=5)
+    assert folder.scan() == []          # 第一次出现，开始计时
+    clock.now = 3
+    assert folder.scan() == []          # 未到稳定时间
+    clock.now = 6
+    assert folder.scan() == [str(path)]
+    clock.now = 7
+    assert folder.scan() == []          # 已交给导入线程
+
+    # 文件被覆盖（大小变化）后重新计时，稳定后再次返回
+    path.write_bytes(b'x' * 20)
+    clock.now = 8
+    assert folder.scan() == []
+    clock.now = 14
+    assert folder.scan() == [str(path)]
+
+    # 文件删除后不再跟踪
+    os.remove(path)
+    assert folder.scan() == [] and not folder.pending and not folder.handled
+
+
+def test_same_content_is_imported_once(tmp_path, conn):
+    path = write_workbook(tmp_path / FILE_NAME)
+    assert watcher.ingest_file(conn, path, '高一', 'sheet', DEFAULT_BACKEND) == 'success'
+    scores = conn.execute("SELECT COUNT(*) FROM TimeLimitScores").fetchone()[0]
+    assert scores
+
+    # 改名后重新复制进来的同一文件按内容哈希跳过
+    copy = shutil.copy(path, tmp_path / ('副本' + FILE_NAME))
+    assert watcher.ingest_file(conn, copy, '高一', 'sheet', DEFAULT_BACKEND) == 'success'
+    assert conn.execute("SELECT COUNT(*) FROM TimeLimitScores").fetchone()[0] == scores
+    assert conn.execute("SELECT COUNT(*) FROM TimeLimitImportLog").fetchone()[0] == 1
+
+
+def test_unparsable_name_is_skipped(tmp_path, conn):
+    path = write_workbook(tmp_path / 'scores.xlsx')
+    assert watcher.ingest_file(conn, path, '高一', 'sheet', DEFAULT_BACKEND) == 'skipped'
+    assert [row['Status'] for row in conn.execute("SELECT Status FROM TimeLimitImportLog")] == ['skipped']
+    assert conn.execute("SELECT COUNT(*) FROM TimeLimitScores").fetchone()[0] == 0
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""导入出错时也关闭工作簿（Windows上未关闭的文件无法移动或删除）"""
+
+import excel_to_sqlite_v2
+from conftest import student_rows, write_sheet
+from score_staging import ScoreStaging
+
+
+def test_failed_import_closes_workbook(tmp_path, exam_db, monkeypatch):
+    path = write_sheet(tmp_path / 'scores.xlsx', [row + (100, 90) for row in student_rows()])
+    opened = []
+    open_workbook = excel_to_sqlite_v2.open_workbook
+
+    def open_and_track(*args):
+        wb = open_workbook(*args)
+        opened.append(wb)
+        return wb
+
+    def fail(self, exam_id):
+        raise RuntimeError('模拟导入出错')
+
+    monkeypatch.setattr(excel_to_sqlite_v2, 'open_workbook', open_and_track)
+    monkeypatch.setattr(ScoreStaging, 'merge', fail)
+    assert excel_to_sqlite_v2.import_scores_file(exam_db, path, 1) is None
+
+    assert len(opened) == 1
+    assert opened[0]._zip.fp is None
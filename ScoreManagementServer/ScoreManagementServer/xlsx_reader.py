@@ -0,0 +1,487 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Excel读取后端
+为各导入工具提供统一的工作簿读取接口，可选两种后端：
+- 'fast'    : 纯标准库实现，直接读取xlsx压缩包并增量解析XML，只产出值元组
+- 'openpyxl': 使用openpyxl只读模式
+'auto' 优先使用 'fast'，无法解析时回退到 openpyxl
+CSV/TSV 文件（.csv / .tsv）不论选择哪个后端都用标准库 csv 模块流式读取，视为只有一个sheet的工作簿，
+自动识别编码（UTF-8 带或不带BOM / GBK）和分隔符，解析速度比xlsx快得多
+
+统一接口（与openpyxl只读模式的用法一致）：
+    wb = open_workbook(path)
+    wb.sheetnames / wb[sheet_name] / wb.active / wb.close()
+    ws.title / ws.max_row / ws.max_column
+    ws.iter_rows(min_row=1, max_row=None, values_only=True)  -> 每行一个值元组
+"""
+
+import os
+import re
+import csv
+import codecs
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+
+try:
+    import openpyxl
+    HAS_OPENPYXL = True
+except ImportError:
+    HAS_OPENPYXL = False
+
+BACKENDS = ('auto', 'fast', 'openpyxl')
+DEFAULT_BACKEND = 'auto'
+
+# 按文本表格读取的文件扩展名，以及各导入工具可以导入的所有文件扩展名
+CSV_EXTENSIONS = ('.csv', '.tsv')
+WORKBOOK_EXTENSIONS = ('.xlsx',) + CSV_EXTENSIONS
+
+# CSV文件可能的分隔符（.tsv 固定为制表符）
+CSV_DELIMITERS = (',', '\t', ';')
+
+# XML命名空间
+NS_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+NS_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+TAG_V = f'{NS_MAIN}v'
+TAG_IS = f'{NS_MAIN}is'
+
+# Excel内置的日期/时间格式编号
+BUILTIN_DATE_FORMATS = set(range(14, 23)) | set(range(27, 37)) | {45, 46, 47} | set(range(50, 59))
+
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+
+def open_workbook(path, backend=DEFAULT_BACKEND):
+    """打开工作簿，返回统一接口的工作簿对象"""
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的读取后端: {backend}（可选: {', '.join(BACKENDS)}）")
+
+    if is_csv_file(path):
+        return CsvWorkbook(path)
+
+    if backend == 'openpyxl':
+        return OpenpyxlWorkbook(path)
+
+    if backend == 'fast':
+        return FastWorkbook(path)
+
+    # auto: 优先使用快速后端，解析失败时回退到openpyxl
+    try:
+        return FastWorkbook(path)
+    except Exception:
+        if not HAS_OPENPYXL:
+            raise
+        return OpenpyxlWorkbook(path)
+
+
+# ============================================
+# openpyxl 后端
+# ============================================
+
+class OpenpyxlWorkbook:
+    """openpyxl只读模式的包装"""
+
+    backend = 'openpyxl'
+
+    def __init__(self, path):
+        if not HAS_OPENPYXL:
+            raise ImportError("缺少openpyxl库，请运行: pip install openpyxl")
+        self._wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+
+    @property
+    def sheetnames(self):
+        return self._wb.sheetnames
+
+    @property
+    def active(self):
+        return OpenpyxlSheet(self._wb.active)
+
+    def __getitem__(self, sheet_name):
+        return OpenpyxlSheet(self._wb[sheet_name])
+
+    def close(self):
+        self._wb.close()
+
+
+class OpenpyxlSheet:
+    """openpyxl只读工作表的包装，只提供值元组"""
+
+    def __init__(self, ws):
+        self._ws = ws
+        self.title = ws.title
+
+    @property
+    def max_row(self):
+        return self._ws.max_row
+
+    @property
+    def max_column(self):
+        return self._ws.max_column
+
+    def iter_rows(self, min_row=1, max_row=None, values_only=True):
+        return self._ws.iter_rows(min_row=min_row, max_row=max_row, values_only=True)
+
+
+# ============================================
+# CSV/TSV
+# ============================================
+
+def is_csv_file(path):
+    """是否按文本表格（CSV/TSV）读取"""
+    return os.path.splitext(path)[1].lower() in CSV_EXTENSIONS
+
+
+def detect_encoding(path, sample_size=65536):
+    """识别文本表格的编码：带BOM的UTF-8/UTF-16、UTF-8，否则按GBK（gb18030，兼容GBK）读取"""
+    with open(path, 'rb') as f:
+        sample = f.read(sample_size)
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        # 增量解码：样本末尾被截断的多字节字符不算错误
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'gb18030'
+
+
+def detect_delimiter(path, first_line):
+    """.tsv 使用制表符，否则取表头行中出现次数最多的分隔符（默认逗号）"""
+    if os.path.splitext(path)[1].lower() == '.tsv':
+        return '\t'
+    counts = {delimiter: first_line.count(delimiter) for delimiter in CSV_DELIMITERS}
+    delimiter = max(CSV_DELIMITERS, key=lambda d: counts[d])
+    return delimiter if counts[delimiter] else ','
+
+
+class CsvWorkbook:
+    """CSV/TSV 文件，作为只有一个sheet（名称为文件名去掉扩展名）的工作簿"""
+
+    backend = 'csv'
+
+    def __init__(self, path):
+        self._path = path
+        self.encoding = detect_encoding(path)
+        with open(path, encoding=self.encoding, newline='') as f:
+            self.delimiter = detect_delimiter(path, f.readline())
+        self._sheet = CsvSheet(self, os.path.splitext(os.path.basename(path))[0])
+
+    @property
+    def sheetnames(self):
+        return [self._sheet.title]
+
+    @property
+    def active(self):
+        return self._sheet
+
+    def __getitem__(self, sheet_name):
+        if sheet_name != self._sheet.title:
+            raise KeyError(f"工作表不存在: {sheet_name}")
+        return self._sheet
+
+    def close(self):
+        pass
+
+    def _reader(self, f):
+        return csv.reader(f, delimiter=self.delimiter)
+
+
+class CsvSheet:
+    """CSV/TSV 的工作表，逐行流式读取
+
+    空单元格读作 None（与xlsx中的空单元格一致），其余单元格保留原文本，
+    由导入工具按需转换为数字（学号等以0开头的文本不会丢失前导0）
+    """
+
+    def __init__(self, workbook, title):
+        self._wb = workbook
+        self.title = title
+        self._max_row = None
+        with self._open() as f:
+            self.max_column = len(next(workbook._reader(f), []))
+
+    def _open(self):
+        return open(self._wb._path, encoding=self._wb.encoding, newline='')
+
+    @property
+    def max_row(self):
+        """总行数（首次访问时扫描一遍文件）"""
+        if self._max_row is None:
+            with self._open() as f:
+                self._max_row = sum(1 for _ in self._wb._reader(f))
+        return self._max_row
+
+    def iter_rows(self, min_row=1, max_row=None, values_only=True):
+        """逐行产出值元组（行号从1开始），短行补齐到表头列数"""
+        width = self.max_column
+        with self._open() as f:
+            for row_idx, row in enumerate(self._wb._reader(f), 1):
+                if max_row is not None and row_idx > max_row:
+                    break
+                if row_idx < min_row:
+                    continue
+                values = [value if value != '' else None for value in row]
+                if len(values) < width:
+                    values.extend([None] * (width - len(values)))
+                yield tuple(values)
+
+
+# ============================================
+# 纯标准库快速后端
+# ============================================
+
+class FastWorkbook:
+    """直接读取xlsx压缩包的工作簿
+
+    打开时只解析 workbook.xml、关系表、样式表和共享字符串表（共享字符串只解析一次），
+    工作表数据在 iter_rows 时按行增量解析，不为单元格创建对象。
+    """
+
+    backend = 'fast'
+
+    def __init__(self, path):
+        self._zip = zipfile.ZipFile(path)
+        try:
+            self._sheets, self._active_index = self._read_workbook()
+            self._shared_strings = self._read_shared_strings()
+            self._date_styles = self._read_date_styles()
+        except Exception:
+            self._zip.close()
+            raise
+
+    @property
+    def sheetnames(self):
+        return [name for name, _ in self._sheets]
+
+    @property
+    def active(self):
+        index = self._active_index if self._active_index < len(self._sheets) else 0
+        return self[self._sheets[index][0]]
+
+    def __getitem__(self, sheet_name):
+        for name, target in self._sheets:
+            if name == sheet_name:
+                return FastSheet(self, name, target)
+        raise KeyError(f"工作表不存在: {sheet_name}")
+
+    def close(self):
+        self._zip.close()
+
+    def _read_rels(self, rels_path):
+        """读取关系表，返回 {Id: (Type, Target)}"""
+        rels = {}
+        if rels_path not in self._zip.namelist():
+            return rels
+        root = ET.fromstring(self._zip.read(rels_path))
+        for rel in root.iter(f'{NS_PKG_REL}Relationship'):
+            rels[rel.get('Id')] = (rel.get('Type', ''), rel.get('Target', ''))
+        return rels
+
+    @staticmethod
+    def _resolve_target(target):
+        """关系表中的路径转换为压缩包内路径"""
+        if target.startswith('/'):
+            return target.lstrip('/')
+        return posixpath.normpath(posixpath.join('xl', target))
+
+    def _read_workbook(self):
+        root = ET.fromstring(self._zip.read('xl/workbook.xml'))
+        rels = self._read_rels('xl/_rels/workbook.xml.rels')
+
+        sheets = []
+        for sheet in root.iter(f'{NS_MAIN}sheet'):
+            rel_id = sheet.get(f'{NS_REL}id')
+            _, target = rels.get(rel_id, ('', ''))
+            sheets.append((sheet.get('name'), self._resolve_target(target)))
+
+        active_index = 0
+        view = root.find(f'{NS_MAIN}bookViews/{NS_MAIN}workbookView')
+        if view is not None and view.get('activeTab'):
+            active_index = int(view.get('activeTab'))
+
+        self._rels = rels
+        return sheets, active_index
+
+    def _find_part(self, rel_type_suffix, default_path):
+        for rel_type, target in self._rels.values():
+            if rel_type.endswith(rel_type_suffix):
+                return self._resolve_target(target)
+        return default_path
+
+    def _read_shared_strings(self):
+        path = self._find_part('/sharedStrings', 'xl/sharedStrings.xml')
+        if path not in self._zip.namelist():
+            return []
+
+        strings = []
+        with self._zip.open(path) as f:
+            for event, elem in ET.iterparse(f, events=('end',)):
+                if elem.tag == f'{NS_MAIN}si':
+                    strings.append(_element_text(elem))
+                    elem.clear()
+        return strings
+
+    def _read_date_styles(self):
+        """返回使用日期格式的样式索引集合"""
+        path = self._find_part('/styles', 'xl/styles.xml')
+        if path not in self._zip.namelist():
+            return set()
+
+        root = ET.fromstring(self._zip.read(path))
+
+        custom_formats = {}
+        for fmt in root.iter(f'{NS_MAIN}numFmt'):
+            custom_formats[int(fmt.get('numFmtId'))] = fmt.get('formatCode', '')
+
+        date_styles = set()
+        cell_xfs = root.find(f'{NS_MAIN}cellXfs')
+        if cell_xfs is None:
+            return date_styles
+
+        for index, xf in enumerate(cell_xfs.findall(f'{NS_MAIN}xf')):
+            fmt_id = int(xf.get('numFmtId', 0))
+            if fmt_id in BUILTIN_DATE_FORMATS:
+                date_styles.add(index)
+            elif fmt_id in custom_formats and _is_date_format(custom_formats[fmt_id]):
+                date_styles.add(index)
+        return date_styles
+
+
+class FastSheet:
+    """快速后端的工作表，按行增量解析"""
+
+    def __init__(self, workbook, title, path):
+        self._wb = workbook
+        self._path = path
+        self.title = title
+        self.max_row, self.max_column = self._read_dimension()
+
+    def _read_dimension(self):
+        """从 <dimension ref="A1:H200"/> 读取行列数（只读取文件开头部分）"""
+        with self._wb._zip.open(self._path) as f:
+            head = f.read(4096).decode('utf-8', errors='ignore')
+        match = re.search(r'<(?:\w+:)?dimension ref="([A-Z]+\d+:)?([A-Z]+)(\d+)"', head)
+        if not match:
+            return None, None
+        return int(match.group(3)), _column_index(match.group(2))
+
+    def iter_rows(self, min_row=1, max_row=None, values_only=True):
+        """逐行产出值元组（行号从1开始，空行产出空元组）"""
+        shared_strings = self._wb._shared_strings
+        date_styles = self._wb._date_styles
+        width = self.max_column or 0
+        expected_row = 1
+        column_cache = {}
+        row_tag = f'{NS_MAIN}row'
+
+        with self._wb._zip.open(self._path) as f:
+            for event, elem in ET.iterparse(f, events=('end',)):
+                if elem.tag != row_tag:
+                    continue
+
+                row_idx = int(elem.get('r', expected_row))
+                if max_row is not None and row_idx > max_row:
+                    elem.clear()
+                    break
+
+                # 补齐中间缺失的空行
+                while expected_row < row_idx:
+                    if expected_row >= min_row:
+                        yield (None,) * width
+                    expected_row += 1
+                expected_row = row_idx + 1
+
+                if row_idx < min_row:
+                    elem.clear()
+                    continue
+
+                values = []
+                for cell in elem:
+                    ref = cell.get('r')
+                    if ref:
+                        letters = ref.rstrip('0123456789')
+                        col_idx = column_cache.get(letters)
+                        if col_idx is None:
+                            col_idx = column_cache[letters] = _column_index(letters)
+                        if col_idx > len(values) + 1:
+                            values.extend([None] * (col_idx - len(values) - 1))
+                    values.append(_cell_value(cell, shared_strings, date_styles))
+
+                elem.clear()
+
+                if len(values) < width:
+                    values.extend([None] * (width - len(values)))
+                yield tuple(values)
+
+
+def _element_text(elem):
+    """拼接 <si>/<is> 中所有文本（忽略注音 <rPh>）"""
+    text = elem.find(f'{NS_MAIN}t')
+    if text is not None and len(elem) == 1:
+        return text.text or ''
+    parts = []
+    for run in elem.findall(f'{NS_MAIN}r'):
+        t = run.find(f'{NS_MAIN}t')
+        if t is not None and t.text:
+            parts.append(t.text)
+    if text is not None and text.text:
+        parts.insert(0, text.text)
+    return ''.join(parts)
+
+
+def _cell_value(cell, shared_strings, date_styles):
+    """把 <c> 元素转换为Python值，规则与openpyxl一致"""
+    cell_type = cell.get('t', 'n')
+
+    if cell_type == 'inlineStr':
+        inline = cell.find(TAG_IS)
+        return _element_text(inline) if inline is not None else None
+
+    v = cell.find(TAG_V)
+    if v is None or v.text is None:
+        return None
+    value = v.text
+
+    if cell_type == 's':
+        return shared_strings[int(value)]
+    if cell_type == 'b':
+        return bool(int(value))
+    if cell_type in ('str', 'e'):
+        return value
+    if cell_type == 'd':
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return value
+
+    # 数字
+    if '.' in value or 'E' in value or 'e' in value:
+        number = float(value)
+    else:
+        number = int(value)
+
+    style = cell.get('s')
+    if style is not None and int(style) in date_styles:
+        return EXCEL_EPOCH + timedelta(days=number)
+    return number
+
+
+def _column_index(letters):
+    """列字母转列号：A -> 1, AA -> 27"""
+    index = 0
+    for ch in letters:
+        index = index * 26 + (ord(ch) - ord('A') + 1)
+    return index
+
+
+def _is_date_format(format_code):
+    """判断自定义数字格式是否为日期/时间格式"""
+    # 去掉引号内的文本、转义字符和 [颜色]/[条件] 段
+    code = re.sub(r'"[^"]*"|\\.|\[[^\]]*\]', '', format_code)
+    code = code.split(';')[0].lower()
+    return any(ch in code for ch in 'dmyhs')